@@ -0,0 +1,20 @@
+"""Gunicorn settings loaded automatically from the working directory.
+
+Worker count, bind address and timeouts stay in GUNICORN_CMD_ARGS (see the
+Dockerfile). This file only sets up Prometheus multiprocess mode so /metrics
+on any worker reports the whole instance.
+"""
+import os
+import shutil
+
+# Must be set before any worker imports prometheus_client
+multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -12,6 +12,11 @@ from routes.reconciliation import router as reconciliation_router
 from routes.health_metrics import router as health_router
 from routes.health import router as basic_health_router
 from routes.metrics import router as metrics_router
+from routes.jobs import router as jobs_router
+from services import render_pool, jobs
+from services.email_transport import close_transports
+from services.rate_limit import rate_limit_middleware, close_limiter
+from database import async_engine
 from prometheus_fastapi_instrumentator import Instrumentator
 import sentry_sdk
 from sentry_sdk.integrations.starlette import StarletteIntegration
@@ -41,55 +46,7 @@ app = FastAPI(
 logger = logging.getLogger(__name__)
 security = HTTPBearer(auto_error=False)
 
-# Rate limiting storage (in production, use Redis)
-import redis
-from collections import defaultdict
-
-# Configure Redis client
-try:
-    redis_host = os.getenv("REDIS_HOST", "localhost")
-    redis_port = int(os.getenv("REDIS_PORT", 6379))
-    
-    redis_client = redis.Redis(
-        host=redis_host, 
-        port=redis_port, 
-        db=0,
-        decode_responses=True
-    )
-    redis_client.ping()
-    logger.info(f"Successfully connected to Redis at {redis_host}:{redis_port}")
-except redis.exceptions.ConnectionError as e:
-    logger.error(f"Could not connect to Redis: {e}")
-    redis_client = None
-
-# Rate limiting middleware
-async def rate_limit_middleware(request: Request, call_next):
-    if not redis_client:
-        # Fallback to allow request if Redis is not available
-        logger.warning("Redis not available, rate limiting is disabled.")
-        return await call_next(request)
-
-    client_ip = request.client.host
-    rate_limit_key = f"rate_limit:{client_ip}"
-    
-    try:
-        # Use a pipeline to ensure atomic operations
-        pipeline = redis_client.pipeline()
-        pipeline.incr(rate_limit_key, 1)
-        pipeline.expire(rate_limit_key, 60)
-        request_count, _ = pipeline.execute()
-
-        if int(request_count) > 60:
-            raise HTTPException(status_code=429, detail="Rate limit exceeded")
-            
-    except redis.exceptions.RedisError as e:
-        logger.error(f"Redis error during rate limiting: {e}")
-        # Fail open: If Redis fails, allow the request to pass
-        return await call_next(request)
-
-    response = await call_next(request)
-    return response
-
+# Rate limiting middleware (per-route limits, see services/rate_limit.py)
 app.middleware("http")(rate_limit_middleware)
 
 # CORS middleware - Environment specific configuration
@@ -146,10 +103,16 @@ async def startup_event():
     logger.info("SparkCreatives API starting up")
     logger.info(f"Environment: {os.getenv('ENV', 'development')}")
     logger.info(f"Email provider: {os.getenv('EMAIL_PROVIDER', 'sendgrid')}")
+    jobs.start_local_worker()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("SparkCreatives API shutting down")
+    jobs.stop_local_worker()
+    render_pool.shutdown()
+    await close_transports()
+    await close_limiter()
+    await async_engine.dispose()
 
 app.include_router(health_router, tags=["health"])
 app.include_router(basic_health_router)
@@ -159,11 +122,12 @@ api_v1.include_router(receipts_router, tags=["receipts"])
 api_v1.include_router(statements_router, tags=["statements"])
 api_v1.include_router(reconciliation_router, tags=["reconciliation"])
 api_v1.include_router(metrics_router, tags=["metrics"])
+api_v1.include_router(jobs_router, tags=["jobs"])
 app.include_router(api_v1)
 
-# Expose Prometheus metrics at /metrics (guarded by env)
+# HTTP request metrics (guarded by env); /metrics in routes/health_metrics serves them to scrapers
 if os.getenv("ENABLE_METRICS", "true").lower() == "true":
-    Instrumentator().instrument(app).expose(app, endpoint="/metrics", include_in_schema=False)
+    Instrumentator().instrument(app)
 
 # Sentry initialization (if DSN provided)
 SENTRY_DSN = os.getenv("SENTRY_DSN", "")
@@ -0,0 +1,59 @@
+"""Initial schema, as created by Base.metadata.create_all before migrations existed
+
+Databases created by scripts/migrate_csv_to_db.py already have these
+tables; mark them with `alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "donors",
+        sa.Column("donor_id", sa.String(), primary_key=True),
+        sa.Column("primary_contact_name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String()),
+        sa.Column("street_address", sa.String()),
+        sa.Column("city", sa.String()),
+        sa.Column("state", sa.String()),
+        sa.Column("zip_code", sa.String()),
+        sa.Column("country", sa.String()),
+        sa.Column("donor_type", sa.String()),
+        sa.Column("first_donation_date", sa.Date()),
+    )
+    op.create_table(
+        "donations",
+        sa.Column("donation_id", sa.String(), primary_key=True),
+        sa.Column("donor_id", sa.String(), sa.ForeignKey("donors.donor_id"), nullable=False),
+        sa.Column("receipt_id", sa.String(), nullable=False),
+        sa.Column("received_at", sa.DateTime(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("designation", sa.String(), nullable=False),
+        sa.Column("restricted", sa.Boolean()),
+        sa.Column("method", sa.String()),
+        sa.Column("source", sa.String()),
+        sa.Column("soft_credit_to", sa.String()),
+        sa.Column("designation_breakdown", sa.String()),
+    )
+    op.create_table(
+        "data_room_documents",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("folder", sa.String(), nullable=False),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default="now()"),
+    )
+
+def downgrade():
+    op.drop_table("data_room_documents")
+    op.drop_table("donations")
+    op.drop_table("donors")
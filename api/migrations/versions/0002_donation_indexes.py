@@ -0,0 +1,33 @@
+"""Indexes for donation lookups by donor, date range, designation and receipt
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Year-end statements: one donor's gifts in a date range, in date order
+    ("ix_donations_donor_id_received_at", ["donor_id", "received_at"]),
+    # Bulk receipts and reconciliation windows over all donors
+    ("ix_donations_received_at", ["received_at"]),
+    ("ix_donations_designation", ["designation"]),
+    ("ix_donations_receipt_id", ["receipt_id"]),
+]
+
+def upgrade():
+    # Build without locking writes on Postgres; CONCURRENTLY cannot run in a transaction
+    postgres = op.get_context().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, "donations", columns, if_not_exists=True,
+                            postgresql_concurrently=postgres)
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="donations")
@@ -0,0 +1,26 @@
+"""Store donation amounts as exact NUMERIC(12,2) instead of double precision
+
+Existing values are rounded to the nearest cent, which is what the float
+to string to Decimal conversion in reconciliation recovered at read time.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("donations") as batch:
+        batch.alter_column("amount", type_=sa.Numeric(12, 2), existing_type=sa.Float(),
+                           existing_nullable=False, postgresql_using="round(amount::numeric, 2)")
+
+def downgrade():
+    with op.batch_alter_table("donations") as batch:
+        batch.alter_column("amount", type_=sa.Float(), existing_type=sa.Numeric(12, 2),
+                           existing_nullable=False, postgresql_using="amount::double precision")
@@ -0,0 +1,25 @@
+"""Keep the Square payment id on donations for ledger matching
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("donations", sa.Column("square_payment_id", sa.String(), nullable=True))
+    postgres = op.get_context().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.create_index("ix_donations_square_payment_id", "donations", ["square_payment_id"],
+                        if_not_exists=True, postgresql_concurrently=postgres)
+
+def downgrade():
+    op.drop_index("ix_donations_square_payment_id", table_name="donations")
+    with op.batch_alter_table("donations") as batch:
+        batch.drop_column("square_payment_id")
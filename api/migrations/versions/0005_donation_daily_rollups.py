@@ -0,0 +1,30 @@
+"""Daily donation rollups per designation, backfilled from donations
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "donation_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("designation", sa.String(), primary_key=True),
+        sa.Column("donation_count", sa.Integer(), nullable=False),
+        sa.Column("amount_cents", sa.BigInteger(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO donation_daily_rollups (day, designation, donation_count, amount_cents) "
+        "SELECT date(received_at), designation, count(*), sum(CAST(round(amount * 100) AS BIGINT)) "
+        "FROM donations GROUP BY date(received_at), designation"
+    )
+
+def downgrade():
+    op.drop_table("donation_daily_rollups")
@@ -0,0 +1,27 @@
+"""Index of archived year-end statement PDFs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "statement_archive",
+        sa.Column("donor_id", sa.String(), primary_key=True),
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("digest", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_key", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("statement_archive")
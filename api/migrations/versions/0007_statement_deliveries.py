@@ -0,0 +1,28 @@
+"""Per-donor year-end statement progress for resumable batch runs
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "statement_deliveries",
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("donor_id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("error", sa.String()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_statement_deliveries_year_updated_at", "statement_deliveries", ["year", "updated_at"])
+
+def downgrade():
+    op.drop_index("ix_statement_deliveries_year_updated_at", table_name="statement_deliveries")
+    op.drop_table("statement_deliveries")
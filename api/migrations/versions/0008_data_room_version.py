@@ -0,0 +1,24 @@
+"""Shared data-room version counter for the cached index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    version = op.create_table(
+        "data_room_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("generation", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(version, [{"id": 1, "generation": 0}])
+
+def downgrade():
+    op.drop_table("data_room_version")
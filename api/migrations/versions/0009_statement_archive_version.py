@@ -0,0 +1,29 @@
+"""Version statement archive entries so stale renders cannot be indexed
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+_ENTRY_COLUMNS = [("digest", sa.String()), ("size", sa.BigInteger()), ("content_key", sa.String()),
+                  ("archived_at", sa.DateTime())]
+
+def upgrade():
+    with op.batch_alter_table("statement_archive") as batch:
+        batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+        for name, type_ in _ENTRY_COLUMNS:
+            batch.alter_column(name, existing_type=type_, nullable=True)
+
+def downgrade():
+    op.execute("DELETE FROM statement_archive WHERE digest IS NULL")
+    with op.batch_alter_table("statement_archive") as batch:
+        for name, type_ in _ENTRY_COLUMNS:
+            batch.alter_column(name, existing_type=type_, nullable=False)
+        batch.drop_column("version")
@@ -1,5 +1,5 @@
 
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Boolean, ForeignKey, Date
+from sqlalchemy import create_engine, Column, String, Numeric, DateTime, Boolean, ForeignKey, Date, Index, Integer, BigInteger
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -28,16 +28,74 @@ class Donation(Base):
     donor_id = Column(String, ForeignKey('donors.donor_id'), nullable=False)
     receipt_id = Column(String, nullable=False)
     received_at = Column(DateTime, nullable=False)
-    amount = Column(Float, nullable=False)
+    # Exact dollars and cents; read back as Decimal
+    amount = Column(Numeric(12, 2), nullable=False)
     designation = Column(String, nullable=False)
     restricted = Column(Boolean, default=False)
     method = Column(String)
     source = Column(String)
     soft_credit_to = Column(String)
     designation_breakdown = Column(String)
+    square_payment_id = Column(String)
 
     donor = relationship("Donor", back_populates="donations")
 
+    # Kept in step with migrations/versions
+    __table_args__ = (
+        Index("ix_donations_donor_id_received_at", "donor_id", "received_at"),
+        Index("ix_donations_received_at", "received_at"),
+        Index("ix_donations_designation", "designation"),
+        Index("ix_donations_receipt_id", "receipt_id"),
+        Index("ix_donations_square_payment_id", "square_payment_id"),
+    )
+
+class DonationDailyRollup(Base):
+    """Donation count and cent total per UTC day and designation; see services.rollups."""
+    __tablename__ = 'donation_daily_rollups'
+
+    day = Column(Date, primary_key=True)
+    designation = Column(String, primary_key=True)
+    donation_count = Column(Integer, nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)
+
+class StatementArchiveEntry(Base):
+    """The archived PDF of one donor's year-end statement; see services.statement_archive."""
+    __tablename__ = 'statement_archive'
+
+    donor_id = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    # Bumped by every write that stales the statement; an archive write only lands on the version it read
+    version = Column(Integer, nullable=False, server_default='0')
+    # SHA-256 of the PDF, which is also its name in the archive store; NULL once stale
+    digest = Column(String)
+    size = Column(BigInteger)
+    # statement_cache_key of the content that was rendered
+    content_key = Column(String)
+    archived_at = Column(DateTime)
+
+class StatementDelivery(Base):
+    """Year-end statement progress per donor and year; see services.statement_deliveries."""
+    __tablename__ = 'statement_deliveries'
+
+    year = Column(Integer, primary_key=True)
+    donor_id = Column(String, primary_key=True)
+    # rendered | sent | failed | no_email
+    status = Column(String, nullable=False)
+    error = Column(String)
+    updated_at = Column(DateTime, nullable=False)
+
+    # Kept in step with migrations/versions
+    __table_args__ = (
+        Index("ix_statement_deliveries_year_updated_at", "year", "updated_at"),
+    )
+
+class DataRoomVersion(Base):
+    """Single-row counter bumped by every data-room write; see services.data_room."""
+    __tablename__ = 'data_room_version'
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(BigInteger, nullable=False)
+
 class DataRoomDocument(Base):
     __tablename__ = 'data_room_documents'
 
@@ -0,0 +1,46 @@
+import logging
+import os
+from typing import Optional
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+
+def connect_redis(decode_responses: bool = True) -> Optional[redis.Redis]:
+    """Return a connected Redis client, or None when Redis is unreachable.
+
+    Pass ``decode_responses=False`` for clients that store binary values.
+    """
+    try:
+        client = redis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            decode_responses=decode_responses
+        )
+        client.ping()
+        logger.info(f"Successfully connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
+        return client
+    except redis.exceptions.ConnectionError as e:
+        logger.error(f"Could not connect to Redis: {e}")
+        return None
+
+def connect_async_redis(max_connections: int = 20, timeout: Optional[float] = None) -> aioredis.Redis:
+    """asyncio client over a bounded connection pool.
+
+    Connections are opened lazily, so callers must handle RedisError on use.
+    """
+    pool = aioredis.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=max_connections,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+        decode_responses=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
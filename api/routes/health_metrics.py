@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
 import os
 import time
 import logging
 from datetime import datetime
+from typing import Optional
+from services import telemetry
 
 router = APIRouter()
 
@@ -46,16 +50,22 @@ def health():
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 START = time.time()
-COUNTERS = {"receipts_generated": 0, "emails_sent": 0}
 
 @router.get("/metrics")
-def metrics():
-    """Application metrics endpoint."""
+def metrics(accept: Optional[str] = Header(None)):
+    """Application metrics endpoint.
+
+    Prometheus scrapers (Accept: text/plain or OpenMetrics) get the exposition
+    format covering every worker on this instance; everyone else gets JSON
+    headline counters, fleet-wide when the Redis view is enabled.
+    """
+    if accept and ("text/plain" in accept or "openmetrics" in accept):
+        return Response(telemetry.exposition(), media_type=CONTENT_TYPE_LATEST)
+
     uptime = time.time() - START
-    
     return {
         "timestamp": datetime.utcnow().isoformat(),
         "uptime_seconds": int(uptime),
         "uptime_human": f"{int(uptime // 3600)}h {int((uptime % 3600) // 60)}m {int(uptime % 60)}s",
-        **COUNTERS
+        **telemetry.summary()
     }
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Path
+from services import jobs
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str = Path(..., regex=r'^[a-f0-9]{32}$')):
+    job = jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    progress = job.get("progress") or {}
+    done, total = progress.get("done"), progress.get("total")
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "progress": progress or None,
+        "percent": round(100 * done / total, 1) if done is not None and total else None,
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
@@ -1,64 +1,78 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
-from models import Donation, DataRoomDocument
-from collections import defaultdict
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from services.data_room import index_cache
+from services.etag import etag_matches
+from services.metrics import reviewer_metrics
+from services.metrics_snapshot import METRICS_REFRESH_SECONDS, encode_payload, get_snapshot
 
 router = APIRouter()
 
-@router.get("/metrics/reviewer")
-def get_reviewer_metrics(db: Session = Depends(get_db)):
-    # shippedYTD: Assuming one donation = one shipment for now
-    shipped_ytd = db.query(Donation).count()
-
-    # onTimePct: Static for now
-    on_time_pct = 93
-
-    # beneficiaries: Static for now
-    beneficiaries = 412
-
-    # fundsByDesignation: Queried from the database
-    funds_by_designation = (
-        db.query(Donation.designation, func.sum(Donation.amount))
-        .group_by(Donation.designation)
-        .all()
-    )
-
-    funds_by_designation_list = [
-        {"name": name, "value": value} for name, value in funds_by_designation
-    ]
-
-    # impactStories: Static for now
-    impact_stories = [
-        {"title": "Maria's School Kit", "blurb": "Back to school with everything she needed.", "photo": ""},
-        {"title": "Lopez Sari-Sari", "blurb": "Launched a micro-business with donated goods.", "photo": ""},
-    ]
+# Largest page of data room items per request
+DATA_ROOM_MAX_PAGE = 500
 
-    return {
-        "shippedYTD": shipped_ytd,
-        "onTimePct": on_time_pct,
-        "beneficiaries": beneficiaries,
-        "fundsByDesignation": funds_by_designation_list,
-        "impactStories": impact_stories,
+@router.get("/metrics/reviewer")
+async def get_reviewer_metrics(
+    start: Optional[date] = Query(None, alias="from", description="First day, inclusive (UTC)"),
+    end: Optional[date] = Query(None, alias="to", description="Last day, inclusive (UTC)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Year to date from a periodically refreshed snapshot, or any range summed from daily rollups."""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(400, "'from' must not be after 'to'")
+    if start is None and end is None:
+        body, etag, age = await get_snapshot("reviewer", reviewer_metrics).get()
+    else:
+        body, etag = encode_payload(await reviewer_metrics(db, start, end))
+        age = 0
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={int(METRICS_REFRESH_SECONDS)}",
+        "Age": str(int(age)),
     }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 @router.get("/data-room")
-def get_data_room_index(db: Session = Depends(get_db)):
+async def get_data_room_index(
+    folder: Optional[str] = Query(None, description="Page through one folder"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=DATA_ROOM_MAX_PAGE),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Retrieves a structured list of data room documents from the database.
+    Retrieves a structured list of data room documents, cached until the room changes.
+
+    Without ``folder`` every folder is listed; ``limit`` caps the items shown per
+    folder. With ``folder`` one folder is paged with ``offset`` and ``limit``.
     """
-    documents = db.query(DataRoomDocument).order_by(DataRoomDocument.folder, DataRoomDocument.file_name).all()
-    
-    # Group documents by folder
-    folder_map = defaultdict(list)
-    for doc in documents:
-        folder_map[doc.folder].append(doc.file_name)
-        
-    # Format the output to match the expected structure
-    data_room_index = [
-        {"folder": folder_name, "items": files}
-        for folder_name, files in folder_map.items()
-    ]
-    
-    return data_room_index
+    index = await index_cache.get(db)
+    headers = {"Cache-Control": "private, no-cache"}
+    if folder is None and limit is None:
+        headers["ETag"] = index.etag
+        if etag_matches(if_none_match, index.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(index.body, media_type="application/json", headers=headers)
+
+    headers["ETag"] = etag = index.page_etag(folder, offset, limit)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    def page(name: str, items: list, start: int) -> dict:
+        end = len(items) if limit is None else start + limit
+        return {"folder": name, "items": items[start:end], "total": len(items),
+                "offset": start, "next_offset": end if end < len(items) else None}
+
+    if folder is not None:
+        if folder not in index.folders:
+            raise HTTPException(404, "Folder not found")
+        content = page(folder, index.folders[folder], offset)
+    else:
+        content = [page(name, items, 0) for name, items in index.folders.items()]
+    return JSONResponse(content, headers=headers)
@@ -1,12 +1,21 @@
 import logging
+import os
 import re
-from fastapi import APIRouter, HTTPException, Response, Path, Depends, Header
+from datetime import date
+from fastapi import APIRouter, HTTPException, Response, Path, Query, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
-from services.receipts import find_donation, find_donor, generate_receipt_pdf, line_items_from_row
-from services.emailer import send_email
-from database import get_db
-from models import Donor
+from typing import Optional, List
+from services.receipts import iter_receipt_fields, render_receipts_to_file
+from services import render_pool, receipt_cache, receipts, jobs
+import services.tasks  # registers job handlers
+from services.receipt_delivery import deliver_receipt, DonationNotFound, NoDonorEmail
+from services.etag import make_etag, etag_matches
+from services.pdf_response import pdf_response, render_to_temp_file
+from database import get_db, get_async_db
 from auth import optional_auth, require_api_key
 
 logger = logging.getLogger(__name__)
@@ -14,6 +23,9 @@ logger = logging.getLogger(__name__)
 # Input validation patterns
 DONATION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,50}$')
 
+# Upper bound on receipts in one bulk PDF
+BULK_RECEIPT_LIMIT = int(os.getenv("BULK_RECEIPT_LIMIT", 2000))
+
 def validate_donation_id(donation_id: str) -> str:
     """Validate donation ID format to prevent injection attacks.""" 
     if not DONATION_ID_PATTERN.match(donation_id):
@@ -22,15 +34,14 @@ def validate_donation_id(donation_id: str) -> str:
 
 router = APIRouter()
 
-def _pdf_response(pdf: bytes, filename: str):
-    return Response(content=pdf, media_type="application/pdf",
-                    headers={"Content-Disposition": f'inline; filename="{filename}"'})
-
 @router.get("/donations/{donation_id}/receipt.pdf")
-def get_receipt(
+async def get_receipt(
     donation_id: str = Path(..., description="Unique donation identifier", regex=r'^[A-Za-z0-9_-]{1,50}$'),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     x_api_key: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
     user: Optional[dict] = Depends(optional_auth)
 ):
     """Generate and return a PDF receipt for a donation.""" 
@@ -45,36 +56,29 @@ def get_receipt(
         logger.info(f"Receipt access by user {user.get('user_id')} for donation {donation_id}")
     
     try:
-        dn = find_donation(db, donation_id)
-        if not dn:
+        ctx = await receipts.load_receipt_context_async(db, donation_id)
+        if ctx is None:
             logger.warning(f"Donation not found: {donation_id}")
             raise HTTPException(404, "Donation not found")
-        
-        donor = find_donor(db, dn.donor_id) or Donor(primary_contact_name="Donor", email="")
-        rid = dn.receipt_id or f"RCPT-{donation_id}"
-        
-        try:
-            amount = float(dn.amount or 0)
-            if amount <= 0:
-                logger.warning(f"Invalid donation amount: {amount} for donation {donation_id}")
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error converting donation amount for {donation_id}: {str(e)}")
-            amount = 0.0
-        
-        pdf = generate_receipt_pdf(
-            receipt_id=rid,
-            donor_name=donor.primary_contact_name,
-            donation_amount=amount,
-            donation_date=dn.received_at.strftime("%Y-%m-%d") if dn.received_at else "",
-            designation=dn.designation or "General Fund",
-            restricted=dn.restricted,
-            payment_method=(dn.method or "square").title(),
-            soft_credit_to=dn.soft_credit_to,
-            line_items=line_items_from_row(dn)
-        )
-        
-        logger.info(f"Generated receipt PDF for donation {donation_id}")
-        return _pdf_response(pdf, f"{rid}.pdf")
+
+        fields = ctx.fields
+        if fields["donation_amount"] <= 0:
+            logger.warning(f"Invalid donation amount: {fields['donation_amount']} for donation {donation_id}")
+        rid = fields["receipt_id"]
+
+        key = receipt_cache.receipt_cache_key(fields)
+        # Weak: the key hashes the render's inputs, and each render stamps its own generation time,
+        # so If-Range never resumes a download against it
+        etag = "W/" + make_etag(key)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+        pdf = await run_in_threadpool(receipt_cache.cache_get, key)
+        if pdf is None:
+            pdf = await render_pool.render_receipt_async(**fields)
+            await run_in_threadpool(receipt_cache.cache_put, key, pdf)
+            logger.info(f"Generated receipt PDF for donation {donation_id}")
+        return pdf_response(pdf, f"{rid}.pdf", etag, range_header=range, if_range=if_range)
         
     except HTTPException:
         raise
@@ -83,8 +87,9 @@ def get_receipt(
         raise HTTPException(500, "Error generating receipt")
 
 @router.post("/donations/{donation_id}/receipt")
-def send_receipt(
+async def send_receipt(
     donation_id: str = Path(..., description="Unique donation identifier", regex=r'^[A-Za-z0-9_-]{1,50}$'),
+    background: bool = Query(False, description="Queue the email and return a job id"),
     db: Session = Depends(get_db),
     x_api_key: Optional[str] = Header(None),
     user: Optional[dict] = Depends(optional_auth)
@@ -101,60 +106,70 @@ def send_receipt(
         logger.info(f"Receipt email by user {user.get('user_id')} for donation {donation_id}")
     
     try:
-        dn = find_donation(db, donation_id)
-        if not dn:
-            logger.warning(f"Donation not found for email send: {donation_id}")
-            raise HTTPException(404, "Donation not found")
-        
-        donor = find_donor(db, dn.donor_id) or Donor(primary_contact_name="Donor", email="")
-        donor_email = donor.email.strip() if donor.email else ""
-        if not donor_email:
-            logger.warning(f"No email address for donation {donation_id}")
-            raise HTTPException(400, "No donor email on file")
+        if background:
+            if not await run_in_threadpool(receipts.load_receipt_context, db, donation_id):
+                logger.warning(f"Donation not found for email send: {donation_id}")
+                raise HTTPException(404, "Donation not found")
+            job = jobs.enqueue("receipt_email", {"donation_id": donation_id})
+            return JSONResponse(status_code=202, content={"job_id": job["id"], "status": job["status"]})
 
-        rid = dn.receipt_id or f"RCPT-{donation_id}"
-        
-        try:
-            amount = float(dn.amount or 0)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error converting donation amount for email {donation_id}: {str(e)}")
-            amount = 0.0
-        
-        pdf = generate_receipt_pdf(
-            receipt_id=rid,
-            donor_name=donor.primary_contact_name,
-            donation_amount=amount,
-            donation_date=dn.received_at.strftime("%Y-%m-%d") if dn.received_at else "",
-            designation=dn.designation or "General Fund",
-            restricted=dn.restricted,
-            payment_method=(dn.method or "square").title(),
-            soft_credit_to=dn.soft_credit_to,
-            line_items=line_items_from_row(dn)
-        )
-        
-        email_html = f""" 
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <h2>Thank you for your generous donation!</h2>
-            <p>Dear {donor.primary_contact_name},</p>
-            <p>Thank you for your gift of ${amount:.2f} to {dn.designation or "General Fund"}.</p>
-            <p>Your donation receipt is attached to this email for your tax records.</p>
-            <p>With gratitude,<br>The SparkCreatives Team</p>
-        </body>
-        </html>
-        """ 
-        
-        ok = send_email(donor_email, "Your donation receipt", email_html, pdf, f"{rid}.pdf")
-        
-        if ok:
-            logger.info(f"Receipt email sent successfully for donation {donation_id} to {donor_email}")
-        else:
-            logger.error(f"Failed to send receipt email for donation {donation_id} to {donor_email}")
-        
-        return {"sent": bool(ok), "recipient": donor_email}
-        
+        return await run_in_threadpool(deliver_receipt, db, donation_id)
+
+    except DonationNotFound:
+        raise HTTPException(404, "Donation not found")
+    except NoDonorEmail:
+        raise HTTPException(400, "No donor email on file")
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error sending receipt email for donation {donation_id}: {str(e)}")
         raise HTTPException(500, "Error sending receipt email")
+
+class BulkReceiptRequest(BaseModel):
+    donation_ids: Optional[List[str]] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+@router.post("/donations/receipts.pdf")
+async def get_bulk_receipts(
+    body: BulkReceiptRequest,
+    db: Session = Depends(get_db),
+    x_api_key: Optional[str] = Header(None),
+    user: Optional[dict] = Depends(optional_auth)
+):
+    """Render many donation receipts, selected by id or date range, into one PDF."""
+    if not user and not x_api_key:
+        raise HTTPException(401, "Authentication required - provide API key or valid token")
+
+    if x_api_key:
+        require_api_key(x_api_key)
+    if body.donation_ids is None and body.start is None and body.end is None:
+        raise HTTPException(400, "Provide donation_ids or a start/end date range")
+    if body.donation_ids is not None and len(body.donation_ids) > BULK_RECEIPT_LIMIT:
+        raise HTTPException(413, f"Too many receipts; limit is {BULK_RECEIPT_LIMIT}")
+    for donation_id in body.donation_ids or []:
+        validate_donation_id(donation_id)
+
+    try:
+        if body.start is None and body.end is None:
+            selected = await run_in_threadpool(receipts.receipt_fields_for_ids, db, body.donation_ids)
+        else:
+            selected = await run_in_threadpool(
+                # One past the limit is enough to tell the range is too large
+                lambda: list(iter_receipt_fields(db, body.donation_ids, body.start, body.end,
+                                                 limit=BULK_RECEIPT_LIMIT + 1))
+            )
+        if not selected:
+            raise HTTPException(404, "No donations matched")
+        if len(selected) > BULK_RECEIPT_LIMIT:
+            raise HTTPException(413, f"Too many receipts; limit is {BULK_RECEIPT_LIMIT}")
+
+        path = await render_to_temp_file(render_receipts_to_file, selected)
+        logger.info(f"Generated bulk receipt PDF with {len(selected)} pages")
+
+        return pdf_response(path, "receipts.pdf", delete=True)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating bulk receipts: {str(e)}")
+        raise HTTPException(500, "Error generating receipts")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 import os
 from sqlalchemy.orm import Session
 from services.reconciliation import run_reconciliation, latest_report
@@ -7,9 +7,10 @@ from database import get_db
 router = APIRouter()
 
 @router.post("/reconciliation/run")
-def run_recon(db: Session = Depends(get_db)):
+def run_recon(incremental: bool = Query(False, description="Only aggregate donations after the last report's watermark"),
+              db: Session = Depends(get_db)):
     data_dir = os.getenv("DATA_DIR", "/app/data")
-    return run_reconciliation(db, data_dir)
+    return run_reconciliation(db, data_dir, incremental=incremental)
 
 @router.get("/reconciliation/latest")
 def latest():
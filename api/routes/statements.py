@@ -1,25 +1,80 @@
-from fastapi import APIRouter, HTTPException, Response, Query, Depends
-from sqlalchemy.orm import Session
-from services.statements import get_donor_statement, batch_generate_statements
-from database import get_db
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Response, Query, Depends, Header
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.statements import count_year_statements_async, load_donor_statement_async, render_statement_to_file
+from services.statement_pdf import statement_cache_key
+from services import jobs, statement_archive, statement_deliveries
+from services.etag import make_etag, etag_matches
+from services.pdf_response import pdf_response, render_to_temp_file
+import services.tasks  # registers job handlers
+from database import get_async_db
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
-def _pdf_response(pdf: bytes, filename: str):
-    return Response(content=pdf, media_type="application/pdf",
-                    headers={"Content-Disposition": f'inline; filename="{filename}"'})
+router = APIRouter()
 
 @router.get("/donors/{donor_id}/statement/{year}")
-def get_statement(donor_id: str, year: int, db: Session = Depends(get_db)):
-    donor, pdf = get_donor_statement(db, donor_id, year)
+async def get_statement(
+    donor_id: str,
+    year: int,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+):
+    filename = f"YEAR-{year}-{donor_id}.pdf"
+    # Read before the statement is loaded, so a gift recorded in between keeps this render out of the archive
+    found = await statement_archive.find_archived(db, donor_id, year)
+    if found.path is not None:
+        # Archived PDFs are immutable and named by their hash, so the tag is strong
+        etag = make_etag(found.digest)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+        return pdf_response(found.path, filename, etag, range_header=range, if_range=if_range)
+
+    donor, st = await load_donor_statement_async(db, donor_id, year)
     if not donor:
         raise HTTPException(404, "Donor not found")
-    if not pdf:
+    if not st:
         raise HTTPException(404, f"No donations found for donor {donor_id} in year {year}")
 
-    rid = f"YEAR-{year}-{donor_id}"
-    return _pdf_response(pdf, f"{rid}.pdf")
+    # Weak: a re-render stamps a new generation time, so only the content is the same
+    etag = "W/" + make_etag(statement_cache_key(st))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    path = await render_to_temp_file(render_statement_to_file, st)
+    try:
+        archived = await statement_archive.archive_file_async(db, st, path, found.version)
+    except OSError as e:
+        logger.error(f"Could not archive statement {st.receipt_id}: {e}")
+        archived = None
+    if archived is None:
+        return pdf_response(path, filename, etag, range_header=range, if_range=if_range, delete=True)
+    digest, path = archived
+    return pdf_response(path, filename, make_etag(digest), range_header=range, if_range=if_range)
 
 @router.post("/tasks/year-end-statements")
-def batch_statements_route(year: int = Query(..., description="Year for statements"), db: Session = Depends(get_db)):
-    return batch_generate_statements(db, year)
+async def batch_statements_route(
+    year: int = Query(..., description="Year for statements"),
+    restart: bool = Query(False, description="Forget earlier progress and email every donor again"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Cleared here rather than in the job, so a retried attempt keeps the progress it checkpointed
+    if restart:
+        await statement_deliveries.reset(db, year)
+    # Donors already emailed are skipped, so a retried or resubmitted batch picks up where it stopped
+    job = jobs.enqueue("year_end_statements", {"year": year})
+    return JSONResponse(status_code=202, content={
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/v1/jobs/{job['id']}",
+        "progress_url": f"/api/v1/statements/{year}/progress",
+    })
+
+@router.get("/statements/{year}/progress")
+async def batch_statements_progress(year: int, db: AsyncSession = Depends(get_async_db)):
+    total = await count_year_statements_async(db, year)
+    return await statement_deliveries.progress(db, year, total)
@@ -0,0 +1,55 @@
+"""Micro-benchmark: per-receipt QR cost, PNG round trip vs. memoized vector drawing.
+
+Usage: python scripts/bench_qr.py [receipts]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import qrcode
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+
+from services.qr import draw_qr, qr_runs
+from services.receipts import BASE_VERIFY_URL
+
+def _png_qr(c, url):
+    """The pre-vector path: encode to PNG, then decode it again for drawImage."""
+    img = qrcode.make(url)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    c.drawImage(ImageReader(io.BytesIO(buf.getvalue())), 6.6*inch, 0.9*inch,
+                width=1.1*inch, height=1.1*inch, mask='auto')
+
+def _vector_qr(c, url):
+    draw_qr(c, url, 6.6*inch, 0.9*inch, 1.1*inch)
+
+def bench(draw, urls):
+    start = time.perf_counter()
+    for url in urls:
+        c = canvas.Canvas(io.BytesIO(), pagesize=LETTER)
+        draw(c, url)
+        c.showPage(); c.save()
+    return (time.perf_counter() - start) / len(urls) * 1000
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    urls = [f"{BASE_VERIFY_URL}?rid=RCPT-2025-{i:05d}" for i in range(n)]
+
+    png = bench(_png_qr, urls)
+    qr_runs.cache_clear()
+    vector_cold = bench(_vector_qr, urls)
+    vector_warm = bench(_vector_qr, urls)
+
+    print(f"receipts: {n}")
+    print(f"png round trip        {png:7.3f} ms/receipt")
+    print(f"vector, cold memo     {vector_cold:7.3f} ms/receipt")
+    print(f"vector, re-render     {vector_warm:7.3f} ms/receipt")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Micro-benchmark: per-request overhead of the rate-limit middleware.
+
+Times rate_limit_middleware around a no-op handler and reports p50/p99:
+
+- local:      no Redis, in-process token buckets
+- leased:     Redis round trips simulated with --rtt-ms, permits leased in blocks
+- per-request: the same simulated Redis consulted on every request (the old
+              INCR/EXPIRE shape, minus the event-loop blocking)
+- redis:      a real Redis at REDIS_HOST, when one is reachable
+
+Usage: python scripts/bench_rate_limit.py [--requests N] [--clients N] [--limit N] [--rtt-ms MS]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import redis
+from starlette.requests import Request
+from starlette.responses import Response
+
+from services import rate_limit
+from services.rate_limit import LocalBucketStore, RateLimiter, RedisBucketStore, parse_rules
+
+class _SimulatedRedis:
+    """Shared buckets behind an artificial network round trip."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.buckets = LocalBucketStore()
+        self.calls = 0
+
+    async def take(self, key, rule, want, returned=0):
+        self.calls += 1
+        await asyncio.sleep(self.rtt)
+        return self.buckets.take(key, rule, want, returned)
+
+def _request(client_ip: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/v1/jobs/x", "headers": [],
+                    "query_string": b"", "client": (client_ip, 0), "server": ("bench", 80)})
+
+async def _ok(request):
+    return Response(b"")
+
+async def bench(limiter: RateLimiter, requests: int, clients: int):
+    rate_limit._limiter = limiter
+    samples = []
+    for i in range(requests):
+        req = _request(f"10.0.{(i % clients) // 256}.{(i % clients) % 256}")
+        start = time.perf_counter()
+        await rate_limit.rate_limit_middleware(req, _ok)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+def report(name, result, calls=None):
+    p50, p99 = result
+    extra = f"  ({calls} store calls)" if calls is not None else ""
+    print(f"{name:<12} p50 {p50:8.1f} us   p99 {p99:8.1f} us{extra}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=6000, help="permits per client per minute")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Redis round trip")
+    args = parser.parse_args()
+
+    rules = parse_rules(f"{args.limit}/60", "")
+    print(f"requests: {args.requests}  clients: {args.clients}  rule: {args.limit}/60s  "
+          f"lease: {rules[0].lease_size}  simulated rtt: {args.rtt_ms} ms")
+
+    report("local", await bench(RateLimiter(None, rules), args.requests, args.clients))
+
+    leased = _SimulatedRedis(args.rtt_ms / 1000)
+    report("leased", await bench(RateLimiter(leased, rules), args.requests, args.clients), leased.calls)
+
+    every = _SimulatedRedis(args.rtt_ms / 1000)
+    limiter = RateLimiter(every, rules)
+    # Disable the local fast path: lease one permit that expires immediately
+    rate_limit.RATE_LIMIT_SYNC_INTERVAL, saved = 0.0, rate_limit.RATE_LIMIT_SYNC_INTERVAL
+    rate_limit.RATE_LIMIT_LEASE_FRACTION, saved_fraction = 0.0, rate_limit.RATE_LIMIT_LEASE_FRACTION
+    report("per-request", await bench(limiter, args.requests, args.clients), every.calls)
+    rate_limit.RATE_LIMIT_SYNC_INTERVAL, rate_limit.RATE_LIMIT_LEASE_FRACTION = saved, saved_fraction
+
+    from redis_conn import connect_async_redis
+    client = connect_async_redis(timeout=0.25)
+    try:
+        await client.ping()
+    except (redis.exceptions.RedisError, OSError):
+        print("redis        skipped (no server at REDIS_HOST)")
+    else:
+        report("redis", await bench(RateLimiter(RedisBucketStore(client), rules), args.requests, args.clients))
+    finally:
+        await client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""Benchmark: itemized statement render time and size at growing gift counts.
+
+Usage: python scripts/bench_statements.py [gifts ...]   (default: 10 1000 10000)
+"""
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.statement_pdf import write_statement_pdf
+from services.statements import DonorStatement
+
+DESIGNATIONS = ["General Fund", "Shipping Fund", "School Kits", "Disaster Relief", "Micro-business Grants"]
+
+def make_statement(gifts: int) -> DonorStatement:
+    st = DonorStatement(donor_id="d_bench", donor_name="Alex Rivera", email=None, year=2025)
+    start = datetime(2025, 1, 1)
+    step = timedelta(seconds=365 * 24 * 3600 / max(gifts, 1))
+    for i in range(gifts):
+        st.add(f"g{i:06d}", start + i * step, Decimal(5 + i % 200) + Decimal("0.25"),
+               DESIGNATIONS[i % len(DESIGNATIONS)])
+    return st
+
+def bench(gifts: int, repeat: int = 3):
+    st = make_statement(gifts)
+    best, size, pages = None, 0, 0
+    for _ in range(repeat):
+        out = io.BytesIO()
+        started = time.perf_counter()
+        pages = write_statement_pdf(st, out)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        size = out.tell()
+    return best, pages, size
+
+def main():
+    counts = [int(a) for a in sys.argv[1:]] or [10, 1000, 10000]
+    print(f"{'gifts':>8} {'pages':>6} {'ms':>9} {'us/gift':>8} {'KiB':>8}")
+    for n in counts:
+        seconds, pages, size = bench(n)
+        print(f"{n:>8} {pages:>6} {seconds * 1000:>9.1f} {seconds * 1e6 / max(n, 1):>8.1f} {size / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
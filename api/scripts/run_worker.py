@@ -0,0 +1,48 @@
+"""Background job worker.
+
+Usage: python scripts/run_worker.py [--processes N]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+def _work():
+    from services import jobs, telemetry
+    import services.tasks  # registers job handlers
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    try:
+        jobs.run_worker(stop)
+    finally:
+        # Forked workers exit without atexit hooks; push buffered counters now
+        telemetry.get_fleet().flush()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_WORKER_PROCESSES", 1)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.processes <= 1:
+        _work()
+        return
+    procs = [multiprocessing.Process(target=_work, name=f"job-worker-{i}") for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in procs])
+    for p in procs:
+        p.join()
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from models import Donor, Donation
+from services import rollups, statement_archive
+
+logger = logging.getLogger(__name__)
+
+# Rows converted and upserted per transaction
+BULK_LOAD_BATCH = int(os.getenv("BULK_LOAD_BATCH", 5000))
+# copy (Postgres COPY into a staging table) or insert (INSERT ... ON CONFLICT)
+BULK_LOAD_METHOD = os.getenv("BULK_LOAD_METHOD", "copy").lower()
+# Rejected rows listed individually in a load report
+MAX_REPORTED_ERRORS = 20
+
+def _text(v) -> Optional[str]:
+    v = (v or "").strip()
+    return v or None
+
+def _required(v) -> str:
+    v = (v or "").strip()
+    if not v:
+        raise ValueError("required")
+    return v
+
+def _date(v) -> Optional[date]:
+    v = (v or "").strip()
+    return date.fromisoformat(v) if v else None
+
+def _timestamp(v) -> datetime:
+    ts = datetime.fromisoformat(_required(v).replace("Z", "+00:00"))
+    # Stored as naive UTC
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def _money(v) -> Decimal:
+    try:
+        return Decimal(_required(v).replace(",", "").replace("$", "")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {v!r}")
+
+def _flag(v) -> bool:
+    return (v or "").strip().lower() in ("yes", "y", "true", "1")
+
+@dataclass
+class TableSpec:
+    """How CSV columns map and convert onto one table; upserts key on ``key``."""
+    model: type
+    key: str
+    columns: Dict[str, Callable]
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+DONORS = TableSpec(Donor, "donor_id", {
+    "donor_id": _required,
+    "primary_contact_name": _required,
+    "email": lambda v: (v or "").strip(),
+    "phone": _text,
+    "street_address": _text,
+    "city": _text,
+    "state": _text,
+    "zip_code": _text,
+    "country": _text,
+    "donor_type": _text,
+    "first_donation_date": _date,
+})
+
+DONATIONS = TableSpec(Donation, "donation_id", {
+    "donation_id": _required,
+    "donor_id": _required,
+    "receipt_id": lambda v: (v or "").strip(),
+    "received_at": _timestamp,
+    "amount": _money,
+    "designation": lambda v: (v or "").strip() or "General Fund",
+    "restricted": _flag,
+    "method": _text,
+    "source": _text,
+    "soft_credit_to": _text,
+    "designation_breakdown": _text,
+    "square_payment_id": _text,
+})
+
+def convert_batch(spec: TableSpec, rows: List[Dict], first_line: int) -> Tuple[List[Dict], List[Dict]]:
+    """Convert a batch column by column; returns (records, rejected rows with reasons)."""
+    records: List[Dict] = [{} for _ in rows]
+    bad: Dict[int, str] = {}
+    for column, convert in spec.columns.items():
+        values = [row.get(column) for row in rows]
+        for i, raw in enumerate(values):
+            if i in bad:
+                continue
+            try:
+                records[i][column] = convert(raw)
+            except (ValueError, TypeError) as e:
+                bad[i] = f"{column}: {e}"
+    good = [rec for i, rec in enumerate(records) if i not in bad]
+    errors = [{"line": first_line + i, "error": err} for i, err in sorted(bad.items())]
+    return good, errors
+
+def _insert_upsert(conn: Connection, spec: TableSpec, records: List[Dict]):
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(spec.table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[spec.key],
+        set_={c: stmt.excluded[c] for c in spec.columns if c != spec.key},
+    )
+    conn.execute(stmt, records)
+
+def _copy_upsert(conn: Connection, spec: TableSpec, records: List[Dict]):
+    """COPY the batch into a temp staging table, then upsert it in one statement."""
+    table, columns = spec.table.name, list(spec.columns)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rec in records:
+        writer.writerow(["\\N" if rec[c] is None else rec[c] for c in columns])
+    buf.seek(0)
+
+    cols = ", ".join(columns)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != spec.key)
+    cur = conn.connection.dbapi_connection.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table}_staging "
+                    f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        cur.copy_expert(f"COPY {table}_staging ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {table}_staging "
+                    f"ON CONFLICT ({spec.key}) DO UPDATE SET {updates}")
+    finally:
+        cur.close()
+
+def upsert_batch(conn: Connection, spec: TableSpec, records: List[Dict]):
+    if not records:
+        return
+    # Postgres refuses to update one row twice in a statement; the last CSV row for a key wins
+    records = list({rec[spec.key]: rec for rec in records}.values())
+    if conn.dialect.name == "postgresql" and BULK_LOAD_METHOD == "copy":
+        _copy_upsert(conn, spec, records)
+    else:
+        _insert_upsert(conn, spec, records)
+
+@dataclass
+class LoadStats:
+    table: str
+    loaded: int = 0
+    rejected: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.loaded / self.seconds, 1) if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {"table": self.table, "loaded": self.loaded, "rejected": self.rejected,
+                "resumed_from": self.resumed_from, "seconds": round(self.seconds, 3),
+                "rows_per_sec": self.rows_per_sec, "errors": self.errors}
+
+def _checkpoint_path(csv_path: str) -> str:
+    return f"{csv_path}.checkpoint.json"
+
+def _file_id(csv_path: str) -> Dict:
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+def _read_checkpoint(csv_path: str) -> int:
+    """Data rows already committed from this exact file, or 0."""
+    try:
+        with open(_checkpoint_path(csv_path), "r", encoding="utf-8") as f:
+            cp = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if cp.get("file") != _file_id(csv_path):
+        logger.info(f"{csv_path} changed since its checkpoint, loading from the start")
+        return 0
+    return int(cp.get("rows_done", 0))
+
+def _write_checkpoint(csv_path: str, rows_done: int):
+    path = _checkpoint_path(csv_path)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"file": _file_id(csv_path), "rows_done": rows_done}, f)
+    os.replace(f"{path}.tmp", path)
+
+def load_csv(engine: Engine, spec: TableSpec, csv_path: str, batch_size: int = BULK_LOAD_BATCH,
+             resume: bool = True) -> LoadStats:
+    """Stream ``csv_path`` into ``spec``'s table in upserted batches.
+
+    Each batch commits on its own and is recorded in a checkpoint file next to
+    the CSV, so an interrupted load resumes after the last committed batch.
+    Upserts make replaying a batch harmless. The checkpoint is removed once the
+    whole file has loaded.
+    """
+    stats = LoadStats(spec.table.name)
+    done = _read_checkpoint(csv_path) if resume else 0
+    stats.resumed_from = done
+    started = time.perf_counter()
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        rows = iter(reader)
+        for _ in islice(rows, done):
+            pass
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            # Header is line 1
+            records, errors = convert_batch(spec, batch, first_line=done + 2)
+            with engine.begin() as conn:
+                # Rollup buckets and archived statements change in the same transaction as the rows behind them
+                days = rollups.days_touched(conn, records) if spec is DONATIONS else ()
+                stale = statement_archive.statements_touched(conn, records) if spec is DONATIONS else ()
+                upsert_batch(conn, spec, records)
+                rollups.refresh_days(conn, days)
+                statement_archive.invalidate(conn, stale, [r["donor_id"] for r in records] if spec is DONORS else ())
+            done += len(batch)
+            _write_checkpoint(csv_path, done)
+            stats.loaded += len(records)
+            stats.rejected += len(errors)
+            stats.errors.extend(errors[:MAX_REPORTED_ERRORS - len(stats.errors)])
+            logger.info(f"{spec.table.name}: {done} rows processed")
+    stats.seconds = time.perf_counter() - started
+    try:
+        os.remove(_checkpoint_path(csv_path))
+    except FileNotFoundError:
+        pass
+    return stats
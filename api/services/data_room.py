@@ -0,0 +1,83 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import DataRoomDocument, DataRoomVersion
+from services.etag import make_etag
+
+logger = logging.getLogger(__name__)
+
+class DataRoomIndex:
+    """Folder index built once per data-room version."""
+
+    def __init__(self, version: Tuple, folders: Dict[str, List[str]]):
+        self.version = version
+        self.folders = folders
+        self.body = json.dumps([{"folder": f, "items": items} for f, items in folders.items()],
+                               separators=(",", ":")).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = make_etag(self.digest)
+
+    def page_etag(self, *parts) -> str:
+        """Strong tag for a slice of this index; the slice is fixed by the index and ``parts``."""
+        key = json.dumps([self.digest, *parts])
+        return make_etag(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+
+class DataRoomIndexCache:
+    """Caches the index keyed by (document count, newest created_at, shared generation).
+
+    The version query is one aggregate over the table, so an unchanged room
+    is served without loading any documents. Additions and deletions from any
+    process change the count or newest timestamp; every ORM write to a
+    document also bumps the generation row in its own transaction, so renames
+    and moves reach every worker as soon as they commit.
+    """
+
+    def __init__(self):
+        self._index: Optional[DataRoomIndex] = None
+
+    async def version(self, db: AsyncSession) -> Tuple:
+        generation = select(DataRoomVersion.generation).where(DataRoomVersion.id == 1).scalar_subquery()
+        count, newest, gen = (await db.execute(
+            select(func.count(), func.max(DataRoomDocument.created_at), generation).select_from(DataRoomDocument)
+        )).one()
+        return count, str(newest), gen
+
+    async def get(self, db: AsyncSession) -> DataRoomIndex:
+        version = await self.version(db)
+        index = self._index
+        if index is None or index.version != version:
+            index = self._index = DataRoomIndex(version, await load_folders(db))
+            logger.info(f"Rebuilt data room index ({version[0]} documents)")
+        return index
+
+async def load_folders(db: AsyncSession) -> Dict[str, List[str]]:
+    """File names grouped by folder, in folder then file name order."""
+    rows = await db.execute(
+        select(DataRoomDocument.folder, DataRoomDocument.file_name)
+        .order_by(DataRoomDocument.folder, DataRoomDocument.file_name)
+    )
+    folders = defaultdict(list)
+    for folder, file_name in rows:
+        folders[folder].append(file_name)
+    return dict(folders)
+
+index_cache = DataRoomIndexCache()
+
+def bump_generation(conn: Connection):
+    """Advance the shared data-room version in the caller's transaction."""
+    bumped = conn.execute(update(DataRoomVersion).where(DataRoomVersion.id == 1)
+                          .values(generation=DataRoomVersion.generation + 1))
+    if not bumped.rowcount:
+        conn.execute(insert(DataRoomVersion).values(id=1, generation=1))
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_document_writes(session, flush_context):
+    if any(isinstance(obj, DataRoomDocument) for obj in chain(session.new, session.dirty, session.deleted)):
+        bump_generation(session.connection())
@@ -0,0 +1,382 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Histogram
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@sparkcreatives.org")
+FROM_NAME = os.getenv("FROM_NAME", "SparkCreatives")
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com")
+POSTMARK_API_URL = os.getenv("POSTMARK_API_URL", "https://api.postmarkapp.com")
+EMAIL_OUTBOX_DIR = os.getenv("EMAIL_OUTBOX_DIR", os.path.join(tempfile.gettempdir(), "outbox"))
+
+# Keep-alive connections held open to the provider, per process
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", 10))
+# Sends allowed in flight at once, per process
+EMAIL_MAX_CONCURRENCY = int(os.getenv("EMAIL_MAX_CONCURRENCY", 10))
+EMAIL_CONNECT_TIMEOUT = float(os.getenv("EMAIL_CONNECT_TIMEOUT", 5))
+EMAIL_READ_TIMEOUT = float(os.getenv("EMAIL_READ_TIMEOUT", 30))
+# Upper bound on one batch request body; Postmark rejects batches over 50 MB
+EMAIL_BATCH_MAX_BYTES = int(os.getenv("EMAIL_BATCH_MAX_BYTES", 40 * 1024 * 1024))
+# Extra attempts for recipients whose batch failed with a transient error
+EMAIL_BATCH_RETRIES = int(os.getenv("EMAIL_BATCH_RETRIES", 3))
+EMAIL_BATCH_RETRY_DELAY = float(os.getenv("EMAIL_BATCH_RETRY_DELAY", 2))
+
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_seconds", "Latency of a single email provider call",
+    ["provider", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+@dataclass
+class EmailMessage:
+    to: str
+    subject: str
+    html: str
+    attachment: Optional[bytes] = None
+    filename: str = "attachment.pdf"
+
+    def encoded_size(self) -> int:
+        """Approximate bytes this message adds to a JSON request body."""
+        return len(self.html) + len(self.subject) + 4 * len(self.attachment or b"") // 3 + 512
+
+@dataclass
+class SendResult:
+    """Outcome for one recipient of a batched send."""
+    message: EmailMessage
+    ok: bool
+    error: Optional[str] = None
+    # Transport failures and throttling can be retried; rejected addresses cannot
+    retryable: bool = False
+
+def _retryable_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+def _chunks(msgs: List[EmailMessage], max_messages: int) -> Iterator[List[EmailMessage]]:
+    """Split messages into batches bounded by count and request body size."""
+    batch, size = [], 0
+    for msg in msgs:
+        msg_size = msg.encoded_size()
+        if batch and (len(batch) >= max_messages or size + msg_size > EMAIL_BATCH_MAX_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(msg)
+        size += msg_size
+    if batch:
+        yield batch
+
+class SendGridBackend:
+    name = "sendgrid"
+
+    def __init__(self, api_key: str, base_url: str = SENDGRID_API_URL):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, msg: EmailMessage) -> Tuple[str, Dict, Dict]:
+        payload = {
+            "personalizations": [{"to": [{"email": msg.to}]}],
+            "from": {"email": FROM_EMAIL, "name": FROM_NAME},
+            "subject": msg.subject,
+            "content": [{"type": "text/html", "value": msg.html}],
+        }
+        if msg.attachment:
+            payload["attachments"] = [{
+                "content": base64.b64encode(msg.attachment).decode("utf-8"),
+                "filename": msg.filename,
+                "type": "application/pdf"
+            }]
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        return f"{self.base_url}/v3/mail/send", headers, payload
+
+    def accepted(self, status_code: int) -> bool:
+        return status_code in (200, 202)
+
+    # SendGrid allows 1000 personalizations per request, but they share one
+    # subject, body and attachment, so only identical messages are grouped.
+    max_batch = 1000
+
+    def batches(self, msgs: List[EmailMessage]) -> Iterator[List[EmailMessage]]:
+        groups: Dict[Tuple, List[EmailMessage]] = {}
+        for msg in msgs:
+            groups.setdefault((msg.subject, msg.html, msg.filename, msg.attachment), []).append(msg)
+        for group in groups.values():
+            yield from _chunks(group, self.max_batch)
+
+    def batch_request(self, msgs: List[EmailMessage]) -> Tuple[str, Dict, object]:
+        url, headers, payload = self.request(msgs[0])
+        payload["personalizations"] = [{"to": [{"email": m.to}]} for m in msgs]
+        return url, headers, payload
+
+    def batch_results(self, msgs: List[EmailMessage], status_code: int, body) -> List[SendResult]:
+        if self.accepted(status_code):
+            return [SendResult(m, True) for m in msgs]
+        error = f"{self.name} API error: {status_code}"
+        return [SendResult(m, False, error, _retryable_status(status_code)) for m in msgs]
+
+class PostmarkBackend:
+    name = "postmark"
+
+    def __init__(self, token: str, base_url: str = POSTMARK_API_URL):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, msg: EmailMessage) -> Tuple[str, Dict, Dict]:
+        payload = {
+            "From": FROM_EMAIL,
+            "To": msg.to,
+            "Subject": msg.subject,
+            "HtmlBody": msg.html,
+        }
+        if msg.attachment:
+            payload["Attachments"] = [{
+                "Name": msg.filename,
+                "Content": base64.b64encode(msg.attachment).decode("utf-8"),
+                "ContentType": "application/pdf"
+            }]
+        headers = {"X-Postmark-Server-Token": self.token, "Content-Type": "application/json"}
+        return f"{self.base_url}/email", headers, payload
+
+    def accepted(self, status_code: int) -> bool:
+        return status_code in (200, 201)
+
+    # /email/batch takes up to 500 independent messages and reports each one
+    max_batch = 500
+
+    def batches(self, msgs: List[EmailMessage]) -> Iterator[List[EmailMessage]]:
+        return _chunks(msgs, self.max_batch)
+
+    def batch_request(self, msgs: List[EmailMessage]) -> Tuple[str, Dict, object]:
+        payload = [self.request(m)[2] for m in msgs]
+        headers = {"X-Postmark-Server-Token": self.token, "Content-Type": "application/json"}
+        return f"{self.base_url}/email/batch", headers, payload
+
+    def batch_results(self, msgs: List[EmailMessage], status_code: int, body) -> List[SendResult]:
+        if not self.accepted(status_code) or not isinstance(body, list) or len(body) != len(msgs):
+            error = f"{self.name} API error: {status_code}"
+            return [SendResult(m, False, error, _retryable_status(status_code)) for m in msgs]
+        results = []
+        for m, item in zip(msgs, body):
+            code = item.get("ErrorCode", 0)
+            if code == 0:
+                results.append(SendResult(m, True))
+            else:
+                results.append(SendResult(m, False, f"{code}: {item.get('Message', '')}"))
+        return results
+
+class LocalFileBackend:
+    """Writes each message into a directory instead of sending it (dev and tests)."""
+    name = "file"
+
+    def __init__(self, directory: str = EMAIL_OUTBOX_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    max_batch = 1
+
+    def batches(self, msgs: List[EmailMessage]) -> Iterator[List[EmailMessage]]:
+        return _chunks(msgs, self.max_batch)
+
+    def write(self, msg: EmailMessage) -> bool:
+        stem = os.path.join(self.directory, f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}")
+        meta = {"to": msg.to, "subject": msg.subject, "html": msg.html}
+        if msg.attachment:
+            meta["attachment"] = f"{os.path.basename(stem)}-{msg.filename}"
+            with open(f"{stem}-{msg.filename}", "wb") as f:
+                f.write(msg.attachment)
+        with open(f"{stem}.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return True
+
+def backend_from_env():
+    """Backend for EMAIL_PROVIDER, or None when its credentials are missing."""
+    provider = os.getenv("EMAIL_PROVIDER", "sendgrid")
+    if provider == "file":
+        return LocalFileBackend()
+    if provider == "sendgrid":
+        key = os.getenv("SENDGRID_API_KEY")
+        if not key:
+            logger.warning("SendGrid API key missing, skipping email send")
+            return None
+        return SendGridBackend(key)
+    token = os.getenv("POSTMARK_TOKEN")
+    if not token:
+        logger.warning("Postmark token missing, skipping email send")
+        return None
+    return PostmarkBackend(token)
+
+class EmailTransport:
+    """Blocking sender over a persistent keep-alive connection pool."""
+
+    def __init__(self, backend, pool_size: int = EMAIL_POOL_SIZE, max_concurrency: int = EMAIL_MAX_CONCURRENCY):
+        self.backend = backend
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def send(self, msg: EmailMessage) -> bool:
+        with self._slots:
+            start = time.perf_counter()
+            ok = False
+            try:
+                if isinstance(self.backend, LocalFileBackend):
+                    ok = self.backend.write(msg)
+                else:
+                    url, headers, payload = self.backend.request(msg)
+                    r = self.session.post(url, headers=headers, data=json.dumps(payload),
+                                          timeout=(EMAIL_CONNECT_TIMEOUT, EMAIL_READ_TIMEOUT))
+                    ok = self.backend.accepted(r.status_code)
+                    if not ok:
+                        logger.error(f"{self.backend.name} API error: {r.status_code} - {r.text}")
+            except (requests.RequestException, OSError) as e:
+                logger.error(f"{self.backend.name} request failed: {str(e)}")
+            EMAIL_SEND_SECONDS.labels(provider=self.backend.name, outcome="ok" if ok else "error") \
+                .observe(time.perf_counter() - start)
+            telemetry.EMAILS_SENT.inc(provider=self.backend.name, outcome="ok" if ok else "error")
+            if ok:
+                logger.info(f"Email sent successfully via {self.backend.name} to {msg.to}")
+            return ok
+
+    def _send_one_batch(self, batch: List[EmailMessage]) -> List[SendResult]:
+        if isinstance(self.backend, LocalFileBackend):
+            return [SendResult(m, self.send(m)) for m in batch]
+        with self._slots:
+            start = time.perf_counter()
+            try:
+                url, headers, payload = self.backend.batch_request(batch)
+                r = self.session.post(url, headers=headers, data=json.dumps(payload),
+                                      timeout=(EMAIL_CONNECT_TIMEOUT, EMAIL_READ_TIMEOUT))
+                try:
+                    body = r.json()
+                except ValueError:
+                    body = None
+                results = self.backend.batch_results(batch, r.status_code, body)
+                if not self.backend.accepted(r.status_code):
+                    logger.error(f"{self.backend.name} batch API error: {r.status_code} - {r.text[:500]}")
+            except (requests.RequestException, OSError) as e:
+                logger.error(f"{self.backend.name} batch request failed: {str(e)}")
+                results = [SendResult(m, False, str(e), True) for m in batch]
+            ok = all(res.ok for res in results)
+            EMAIL_SEND_SECONDS.labels(provider=self.backend.name, outcome="ok" if ok else "error") \
+                .observe(time.perf_counter() - start)
+            sent = sum(1 for res in results if res.ok)
+            if sent:
+                telemetry.EMAILS_SENT.inc(sent, provider=self.backend.name, outcome="ok")
+            if sent < len(results):
+                telemetry.EMAILS_SENT.inc(len(results) - sent, provider=self.backend.name, outcome="error")
+            return results
+
+    def send_batch(self, msgs: Iterable[EmailMessage], retries: int = EMAIL_BATCH_RETRIES) -> List[SendResult]:
+        """Send messages in provider-sized batches, one result per message.
+
+        Recipients whose batch failed transiently are resent (and only they
+        are) up to ``retries`` more times with a growing delay.
+        """
+        pending = list(msgs)
+        final: Dict[int, SendResult] = {}
+        order = {id(m): i for i, m in enumerate(pending)}
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(EMAIL_BATCH_RETRY_DELAY * 2 ** (attempt - 1))
+            retry = []
+            for batch in self.backend.batches(pending):
+                for res in self._send_one_batch(batch):
+                    final[order[id(res.message)]] = res
+                    if not res.ok and res.retryable:
+                        retry.append(res.message)
+            if not retry:
+                break
+            logger.warning(f"Retrying {len(retry)} of {len(pending)} {self.backend.name} recipients")
+            pending = retry
+        sent = sum(1 for res in final.values() if res.ok)
+        logger.info(f"Batch send via {self.backend.name}: {sent} of {len(final)} accepted")
+        return [final[i] for i in range(len(final))]
+
+    def close(self):
+        self.session.close()
+
+class AsyncEmailTransport:
+    """asyncio sender sharing one httpx connection pool."""
+
+    def __init__(self, backend, pool_size: int = EMAIL_POOL_SIZE, max_concurrency: int = EMAIL_MAX_CONCURRENCY):
+        self.backend = backend
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(EMAIL_READ_TIMEOUT, connect=EMAIL_CONNECT_TIMEOUT),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def send(self, msg: EmailMessage) -> bool:
+        async with self._slots:
+            start = time.perf_counter()
+            ok = False
+            try:
+                if isinstance(self.backend, LocalFileBackend):
+                    ok = await asyncio.to_thread(self.backend.write, msg)
+                else:
+                    url, headers, payload = self.backend.request(msg)
+                    r = await self.client.post(url, headers=headers, content=json.dumps(payload))
+                    ok = self.backend.accepted(r.status_code)
+                    if not ok:
+                        logger.error(f"{self.backend.name} API error: {r.status_code} - {r.text}")
+            except (httpx.HTTPError, OSError) as e:
+                logger.error(f"{self.backend.name} request failed: {str(e)}")
+            EMAIL_SEND_SECONDS.labels(provider=self.backend.name, outcome="ok" if ok else "error") \
+                .observe(time.perf_counter() - start)
+            telemetry.EMAILS_SENT.inc(provider=self.backend.name, outcome="ok" if ok else "error")
+            if ok:
+                logger.info(f"Email sent successfully via {self.backend.name} to {msg.to}")
+            return ok
+
+    async def aclose(self):
+        await self.client.aclose()
+
+_transport: Optional[EmailTransport] = None
+_lock = threading.Lock()
+
+def get_transport() -> Optional[EmailTransport]:
+    """Process-wide blocking transport for the configured provider."""
+    global _transport
+    with _lock:
+        if _transport is None:
+            backend = backend_from_env()
+            if backend is None:
+                return None
+            _transport = EmailTransport(backend)
+        return _transport
+
+_async_transport: Optional[AsyncEmailTransport] = None
+
+def get_async_transport() -> Optional[AsyncEmailTransport]:
+    """Process-wide asyncio transport; created on first use inside the running loop."""
+    global _async_transport
+    if _async_transport is None:
+        backend = backend_from_env()
+        if backend is None:
+            return None
+        _async_transport = AsyncEmailTransport(backend)
+    return _async_transport
+
+async def close_transports():
+    global _transport, _async_transport
+    with _lock:
+        if _transport is not None:
+            _transport.close()
+            _transport = None
+    if _async_transport is not None:
+        await _async_transport.aclose()
+        _async_transport = None
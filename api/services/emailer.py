@@ -1,15 +1,12 @@
-import os
-import base64
-import json
-import requests
 import logging
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+from services.email_transport import (EmailMessage, SendResult, EMAIL_BATCH_MAX_BYTES,
+                                      get_transport, get_async_transport)
 
-PROVIDER = os.getenv("EMAIL_PROVIDER", "sendgrid")
 logger = logging.getLogger(__name__)
 
 def send_email(to_email: str, subject: str, html: str, attachment: Optional[bytes] = None, filename: str = "attachment.pdf") -> bool:
-    """Send email via SendGrid or Postmark.
+    """Send email via SendGrid, Postmark or the local outbox.
     
     Args:
         to_email: Recipient email address
@@ -21,69 +18,37 @@ def send_email(to_email: str, subject: str, html: str, attachment: Optional[byte
     Returns:
         bool: True if email sent successfully, False otherwise
     """
-    if PROVIDER == "sendgrid":
-        key = os.getenv("SENDGRID_API_KEY")
-        if not key:
-            logger.warning("SendGrid API key missing, skipping email send")
-            return False
-        payload = {
-            "personalizations":[{"to":[{"email": to_email}]}],
-            "from":{"email": os.getenv("FROM_EMAIL","noreply@sparkcreatives.org"), "name": os.getenv("FROM_NAME","SparkCreatives")},
-            "subject": subject,
-            "content":[{"type":"text/html","value": html}],
-        }
-        if attachment:
-            payload["attachments"] = [{
-                "content": base64.b64encode(attachment).decode("utf-8"),
-                "filename": filename,
-                "type":"application/pdf"
-            }]
-        try:
-            r = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                data=json.dumps(payload),
-                timeout=30
-            )
-            if r.status_code in (200, 202):
-                logger.info(f"Email sent successfully via SendGrid to {to_email}")
-                return True
-            else:
-                logger.error(f"SendGrid API error: {r.status_code} - {r.text}")
-                return False
-        except requests.RequestException as e:
-            logger.error(f"SendGrid request failed: {str(e)}")
-            return False
-    else:
-        token = os.getenv("POSTMARK_TOKEN")
-        if not token:
-            logger.warning("Postmark token missing, skipping email send")
-            return False
-        payload = {
-            "From": os.getenv("FROM_EMAIL","noreply@sparkcreatives.org"),
-            "To": to_email,
-            "Subject": subject,
-            "HtmlBody": html,
-        }
-        if attachment:
-            payload["Attachments"] = [{
-                "Name": filename,
-                "Content": base64.b64encode(attachment).decode("utf-8"),
-                "ContentType":"application/pdf"
-            }]
-        try:
-            r = requests.post(
-                "https://api.postmarkapp.com/email",
-                headers={"X-Postmark-Server-Token": token, "Content-Type": "application/json"},
-                data=json.dumps(payload),
-                timeout=30
-            )
-            if r.status_code in (200, 201):
-                logger.info(f"Email sent successfully via Postmark to {to_email}")
-                return True
-            else:
-                logger.error(f"Postmark API error: {r.status_code} - {r.text}")
-                return False
-        except requests.RequestException as e:
-            logger.error(f"Postmark request failed: {str(e)}")
-            return False
+    transport = get_transport()
+    if transport is None:
+        return False
+    return transport.send(EmailMessage(to_email, subject, html, attachment, filename))
+
+async def send_email_async(to_email: str, subject: str, html: str, attachment: Optional[bytes] = None, filename: str = "attachment.pdf") -> bool:
+    """Non-blocking variant of send_email for async handlers."""
+    transport = get_async_transport()
+    if transport is None:
+        return False
+    return await transport.send(EmailMessage(to_email, subject, html, attachment, filename))
+
+def send_emails(messages: Iterable[EmailMessage]) -> Iterator[SendResult]:
+    """Send many emails using the provider's batch API, yielding one result per message.
+
+    Messages are consumed lazily and flushed one provider batch at a time, so
+    a long generator never holds more than a batch of attachments in memory.
+    Results come back in input order.
+    """
+    transport = get_transport()
+    if transport is None:
+        for msg in messages:
+            yield SendResult(msg, False, "Email provider not configured")
+        return
+    limit = transport.backend.max_batch
+    buf, size = [], 0
+    for msg in messages:
+        buf.append(msg)
+        size += msg.encoded_size()
+        if len(buf) >= limit or size >= EMAIL_BATCH_MAX_BYTES:
+            yield from transport.send_batch(buf)
+            buf, size = [], 0
+    if buf:
+        yield from transport.send_batch(buf)
@@ -0,0 +1,15 @@
+from typing import Optional
+
+def make_etag(key: str) -> str:
+    """Strong entity tag for a content hash or version key."""
+    return f'"{key}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header value covers ``etag`` (RFC 9110 weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((t[2:] if t.startswith("W/") else t) == opaque for t in tags)
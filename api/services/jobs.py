@@ -0,0 +1,382 @@
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+# redis | memory
+JOB_BACKEND = os.getenv("JOB_BACKEND", "redis").lower()
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", 5))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", 600))
+# A running job whose lease expires (worker died) goes back on the queue; live workers renew it
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+# Lease and run-lock renewals per lease period while a handler runs
+JOB_HEARTBEATS_PER_LEASE = 3
+# A job whose run lock is held by another run waits this long before trying again
+JOB_LOCK_RETRY_SECONDS = float(os.getenv("JOB_LOCK_RETRY_SECONDS", 30))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 7 * 24 * 3600))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+
+QUEUED, RUNNING, RETRYING, SUCCEEDED, FAILED = "queued", "running", "retrying", "succeeded", "failed"
+
+HANDLERS: Dict[str, Callable[..., Any]] = {}
+# Run-lock name per job kind, derived from the payload; runs sharing a name never overlap
+RUN_LOCKS: Dict[str, Callable[[Dict], str]] = {}
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job fails immediately."""
+
+def handler(kind: str, run_lock: Optional[Callable[[Dict], str]] = None):
+    """Register ``fn(payload, ctx)`` as the runner for jobs of ``kind``.
+
+    With ``run_lock``, a job only runs while it holds the lock named by
+    ``run_lock(payload)``; another job of the same name waits its turn.
+    """
+    def register(fn):
+        HANDLERS[kind] = fn
+        if run_lock is not None:
+            RUN_LOCKS[kind] = run_lock
+        else:
+            RUN_LOCKS.pop(kind, None)
+        return fn
+    return register
+
+class MemoryJobBackend:
+    """Single-process backend for tests and local development."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._queue = []
+        self._leased: Dict[str, float] = {}
+        self._locks: Dict[str, tuple] = {}
+        self._cond = threading.Condition()
+
+    def save(self, job: Dict):
+        with self._cond:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def enqueue(self, job_id: str, run_at: float = 0.0):
+        with self._cond:
+            self._leased.pop(job_id, None)
+            heapq.heappush(self._queue, (run_at, job_id))
+            self._cond.notify()
+
+    def dequeue(self, lease_seconds: int) -> Optional[str]:
+        now = time.time()
+        with self._cond:
+            for job_id, until in list(self._leased.items()):
+                if until <= now:
+                    del self._leased[job_id]
+                    heapq.heappush(self._queue, (0.0, job_id))
+            if self._queue and self._queue[0][0] <= now:
+                _, job_id = heapq.heappop(self._queue)
+                self._leased[job_id] = now + lease_seconds
+                return job_id
+            return None
+
+    def extend_lease(self, job_id: str, lease_seconds: int):
+        with self._cond:
+            if job_id in self._leased:
+                self._leased[job_id] = time.time() + lease_seconds
+
+    def release(self, job_id: str):
+        with self._cond:
+            self._leased.pop(job_id, None)
+
+    def acquire_lock(self, name: str, token: str, ttl: int) -> bool:
+        with self._cond:
+            held = self._locks.get(name)
+            if held and held[0] != token and held[1] > time.time():
+                return False
+            self._locks[name] = (token, time.time() + ttl)
+            return True
+
+    def renew_lock(self, name: str, token: str, ttl: int):
+        with self._cond:
+            if self._locks.get(name, (None,))[0] == token:
+                self._locks[name] = (token, time.time() + ttl)
+
+    def release_lock(self, name: str, token: str):
+        with self._cond:
+            if self._locks.get(name, (None,))[0] == token:
+                del self._locks[name]
+
+# Promote due delayed jobs and expired leases, then lease the next ready job.
+_DEQUEUE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(due) do
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('LPUSH', KEYS[1], id)
+end
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(expired) do
+  redis.call('ZREM', KEYS[3], id)
+  redis.call('LPUSH', KEYS[1], id)
+end
+local id = redis.call('RPOP', KEYS[1])
+if id then
+  redis.call('ZADD', KEYS[3], tonumber(ARGV[1]) + tonumber(ARGV[2]), id)
+end
+return id
+"""
+
+# Renew or delete a lock only while ``token`` still owns it
+_RENEW_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RedisJobBackend:
+    """Jobs stored as JSON with a TTL; ready list, delayed and leased sorted sets."""
+
+    READY, DELAYED, LEASED = "jobs:ready", "jobs:delayed", "jobs:leased"
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self._dequeue = client.register_script(_DEQUEUE_LUA)
+        self._renew_lock = client.register_script(_RENEW_LOCK_LUA)
+        self._release_lock = client.register_script(_RELEASE_LOCK_LUA)
+
+    def save(self, job: Dict):
+        self.client.set(f"job:{job['id']}", json.dumps(job, default=str), ex=JOB_TTL_SECONDS)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        raw = self.client.get(f"job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def enqueue(self, job_id: str, run_at: float = 0.0):
+        pipe = self.client.pipeline()
+        pipe.zrem(self.LEASED, job_id)
+        if run_at > time.time():
+            pipe.zadd(self.DELAYED, {job_id: run_at})
+        else:
+            pipe.lpush(self.READY, job_id)
+        pipe.execute()
+
+    def dequeue(self, lease_seconds: int) -> Optional[str]:
+        job_id = self._dequeue(keys=[self.READY, self.DELAYED, self.LEASED], args=[time.time(), lease_seconds])
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    def extend_lease(self, job_id: str, lease_seconds: int):
+        self.client.zadd(self.LEASED, {job_id: time.time() + lease_seconds}, xx=True)
+
+    def release(self, job_id: str):
+        self.client.zrem(self.LEASED, job_id)
+
+    def acquire_lock(self, name: str, token: str, ttl: int) -> bool:
+        if self.client.set(f"job_lock:{name}", token, nx=True, ex=ttl):
+            return True
+        # Still ours from an earlier attempt of the same job
+        return bool(self._renew_lock(keys=[f"job_lock:{name}"], args=[token, ttl]))
+
+    def renew_lock(self, name: str, token: str, ttl: int):
+        self._renew_lock(keys=[f"job_lock:{name}"], args=[token, ttl])
+
+    def release_lock(self, name: str, token: str):
+        self._release_lock(keys=[f"job_lock:{name}"], args=[token])
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            client = None
+            if JOB_BACKEND == "redis":
+                from redis_conn import connect_redis
+                client = connect_redis()
+                if client is None:
+                    logger.warning("Redis unavailable, jobs will run in this process only")
+            _backend = RedisJobBackend(client) if client is not None else MemoryJobBackend()
+        return _backend
+
+def enqueue(kind: str, payload: Dict, max_attempts: int = JOB_MAX_ATTEMPTS, backend=None) -> Dict:
+    """Record a job and put it on the queue; returns the job record."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    backend = backend or get_backend()
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "payload": payload,
+        "status": QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "progress": None,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    backend.save(job)
+    backend.enqueue(job["id"])
+    logger.info(f"Queued {kind} job {job['id']}")
+    return job
+
+def get_job(job_id: str, backend=None) -> Optional[Dict]:
+    return (backend or get_backend()).get(job_id)
+
+class JobContext:
+    """Handed to job handlers for progress reporting; also renews the lease."""
+
+    def __init__(self, backend, job: Dict):
+        self.backend = backend
+        self.job = job
+        self._started = time.time()
+
+    def progress(self, done: int, total: Optional[int] = None, **extra):
+        elapsed = time.time() - self._started
+        self.job["progress"] = {"done": done, "total": total, "elapsed_s": round(elapsed, 1), **extra}
+        self.job["updated_at"] = time.time()
+        self.backend.save(self.job)
+        self.backend.extend_lease(self.job["id"], JOB_LEASE_SECONDS)
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+class _Heartbeat:
+    """Renews a running job's lease, and its run lock, from a background thread.
+
+    The lease then only lapses when the worker process itself is gone,
+    however long the handler goes between progress calls.
+    """
+
+    def __init__(self, backend, job_id: str, lock: Optional[str] = None):
+        self.backend = backend
+        self.job_id = job_id
+        self.lock = lock
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(JOB_LEASE_SECONDS / JOB_HEARTBEATS_PER_LEASE):
+            try:
+                self.backend.extend_lease(self.job_id, JOB_LEASE_SECONDS)
+                if self.lock:
+                    self.backend.renew_lock(self.lock, self.job_id, JOB_LEASE_SECONDS)
+            except redis.exceptions.RedisError as e:
+                logger.error(f"Could not renew the lease of job {self.job_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def run_one(backend=None) -> bool:
+    """Lease and run the next due job; returns False when nothing was ready."""
+    backend = backend or get_backend()
+    job_id = backend.dequeue(JOB_LEASE_SECONDS)
+    if job_id is None:
+        return False
+    job = backend.get(job_id)
+    if job is None or job["status"] in (SUCCEEDED, FAILED):
+        backend.release(job_id)
+        return True
+    if job["status"] == RUNNING and job["attempts"] >= job["max_attempts"]:
+        # Its lease lapsed mid-run on the last attempt; running it again would exceed max_attempts
+        job["status"] = FAILED
+        job["error"] = "Worker stopped before the job finished"
+        job["updated_at"] = time.time()
+        backend.save(job)
+        backend.release(job_id)
+        logger.error(f"{job['kind']} job {job_id} lost its worker on the last attempt")
+        return True
+
+    lock = RUN_LOCKS[job["kind"]](job["payload"]) if job["kind"] in RUN_LOCKS else None
+    if lock and not backend.acquire_lock(lock, job_id, JOB_LEASE_SECONDS):
+        job["run_at"] = time.time() + JOB_LOCK_RETRY_SECONDS
+        backend.save(job)
+        backend.enqueue(job_id, job["run_at"])
+        logger.info(f"{job['kind']} job {job_id} waiting for {lock}, which another run holds")
+        return True
+
+    job["attempts"] += 1
+    job["status"] = RUNNING
+    job["updated_at"] = time.time()
+    backend.save(job)
+    try:
+        with _Heartbeat(backend, job_id, lock):
+            result = HANDLERS[job["kind"]](job["payload"], JobContext(backend, job))
+    except Exception as e:
+        job["error"] = str(e)
+        job["updated_at"] = time.time()
+        if job["attempts"] < job["max_attempts"] and not isinstance(e, PermanentJobError):
+            delay = backoff_delay(job["attempts"])
+            job["status"] = RETRYING
+            job["run_at"] = time.time() + delay
+            backend.save(job)
+            backend.enqueue(job_id, job["run_at"])
+            logger.warning(f"{job['kind']} job {job_id} failed (attempt {job['attempts']}), retrying in {delay:.1f}s: {e}")
+        else:
+            job["status"] = FAILED
+            backend.save(job)
+            backend.release(job_id)
+            logger.error(f"{job['kind']} job {job_id} failed permanently: {e}")
+        return True
+    finally:
+        if lock:
+            backend.release_lock(lock, job_id)
+
+    job["status"] = SUCCEEDED
+    job["result"] = result
+    job["error"] = None
+    job["updated_at"] = time.time()
+    backend.save(job)
+    backend.release(job_id)
+    logger.info(f"{job['kind']} job {job_id} succeeded")
+    return True
+
+def run_worker(stop: Optional[threading.Event] = None, backend=None):
+    """Process jobs until ``stop`` is set, polling when the queue is empty."""
+    stop = stop or threading.Event()
+    backend = backend or get_backend()
+    logger.info(f"Job worker started (pid {os.getpid()})")
+    while not stop.is_set():
+        try:
+            if not run_one(backend):
+                stop.wait(JOB_POLL_INTERVAL)
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Job queue unavailable: {e}")
+            stop.wait(JOB_POLL_INTERVAL * 5)
+
+_local_stop: Optional[threading.Event] = None
+
+def start_local_worker():
+    """Run a worker thread in this process when jobs cannot reach external workers."""
+    global _local_stop
+    if isinstance(get_backend(), MemoryJobBackend) and _local_stop is None:
+        _local_stop = threading.Event()
+        threading.Thread(target=run_worker, args=(_local_stop,), name="job-worker", daemon=True).start()
+
+def stop_local_worker():
+    global _local_stop
+    if _local_stop is not None:
+        _local_stop.set()
+        _local_stop = None
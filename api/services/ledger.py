@@ -0,0 +1,130 @@
+import csv
+import logging
+import os
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models import Donation
+
+logger = logging.getLogger(__name__)
+
+# Ledger rows matched against the database per query
+LEDGER_CHUNK_ROWS = int(os.getenv("LEDGER_CHUNK_ROWS", 5000))
+
+VARIANCE_FIELDS = ["line", "kind", "receipt_id", "square_payment_id", "donation_id",
+                   "internal_cents", "square_cents", "internal_designation", "square_designation"]
+
+def to_cents(value) -> int:
+    """Parse a ledger amount such as "1,234.5", "$12.00" or "(3.25)" to integer cents.
+
+    Fractions beyond cents round half up, matching reconciliation.dec.
+    """
+    s = str(value or "").strip().replace(",", "").replace("$", "")
+    negative = (s.startswith("(") and s.endswith(")")) or s.startswith("-")
+    s = s.strip("()-+ ")
+    if not s:
+        return 0
+    whole, _, frac = s.partition(".")
+    if not (whole + frac).isdigit():
+        raise ValueError(f"Invalid amount: {value!r}")
+    cents = int(whole or 0) * 100 + int((frac + "00")[:2])
+    if len(frac) > 2 and frac[2] >= "5":
+        cents += 1
+    return -cents if negative else cents
+
+def iter_ledger_chunks(path: str, size: int = LEDGER_CHUNK_ROWS) -> Iterator[List[Dict]]:
+    """Stream the internal ledger CSV in lists of at most ``size`` rows.
+
+    Expected columns: receipt_id and/or square_payment_id, amount, designation.
+    Each row gets its line number in the file as ``line``.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        lines = enumerate(reader, start=2)
+        while True:
+            chunk = [dict(row, line=line) for line, row in islice(lines, size)]
+            if not chunk:
+                return
+            yield chunk
+
+def _square_index(db: Session, chunk: List[Dict]):
+    """Hash indexes by receipt_id and square_payment_id for the donations a chunk refers to."""
+    receipt_ids = {r["receipt_id"] for r in chunk if r.get("receipt_id")}
+    payment_ids = {r["square_payment_id"] for r in chunk if r.get("square_payment_id")}
+    conditions = []
+    if receipt_ids:
+        conditions.append(Donation.receipt_id.in_(receipt_ids))
+    if payment_ids:
+        conditions.append(Donation.square_payment_id.in_(payment_ids))
+    by_receipt, by_payment = {}, {}
+    if conditions:
+        rows = db.query(Donation.donation_id, Donation.receipt_id, Donation.square_payment_id,
+                        Donation.amount, Donation.designation).filter(or_(*conditions))
+        for row in rows:
+            if row.receipt_id:
+                by_receipt[row.receipt_id] = row
+            if row.square_payment_id:
+                by_payment[row.square_payment_id] = row
+    return by_receipt, by_payment
+
+def reconcile_ledger(db: Session, ledger_path: str, variance_path: str) -> Dict:
+    """Single pass over the internal ledger, matching each row to a Square donation.
+
+    Totals are kept in integer cents. Every row that does not agree with its
+    donation is written to ``variance_path`` as it is found, so memory stays
+    bounded by the chunk size plus the set of matched donation ids.
+    """
+    by_des: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    matched: Set[str] = set()
+    rows = 0
+    tmp_path = f"{variance_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=VARIANCE_FIELDS)
+        writer.writeheader()
+
+        def variance(kind: str, r: Dict, sq=None, cents: Optional[int] = None):
+            counts[kind] += 1
+            writer.writerow({
+                "line": r["line"], "kind": kind,
+                "receipt_id": r.get("receipt_id") or "", "square_payment_id": r.get("square_payment_id") or "",
+                "donation_id": sq.donation_id if sq else "",
+                "internal_cents": "" if cents is None else cents,
+                "square_cents": int(sq.amount * 100) if sq else "",
+                "internal_designation": r.get("designation") or "",
+                "square_designation": sq.designation if sq else "",
+            })
+
+        for chunk in iter_ledger_chunks(ledger_path):
+            by_receipt, by_payment = _square_index(db, chunk)
+            for r in chunk:
+                rows += 1
+                try:
+                    cents = to_cents(r.get("amount"))
+                except ValueError:
+                    variance("invalid_amount", r)
+                    continue
+                des = r.get("designation") or "General Fund"
+                by_des[des] += cents
+
+                sq = by_receipt.get(r.get("receipt_id")) or by_payment.get(r.get("square_payment_id"))
+                if sq is None:
+                    variance("missing_in_square", r, cents=cents)
+                    continue
+                if sq.donation_id in matched:
+                    variance("duplicate", r, sq, cents)
+                    continue
+                matched.add(sq.donation_id)
+                counts["matched"] += 1
+                if int(sq.amount * 100) != cents:
+                    variance("amount_mismatch", r, sq, cents)
+                elif (sq.designation or "General Fund") != des:
+                    variance("designation_mismatch", r, sq, cents)
+    os.replace(tmp_path, variance_path)
+
+    square_rows = db.query(Donation).count()
+    counts["missing_in_ledger"] = square_rows - len(matched)
+    logger.info(f"Reconciled {rows} ledger rows against {square_rows} donations")
+    return {"rows": rows, "by_designation_cents": dict(by_des), "counts": dict(counts)}
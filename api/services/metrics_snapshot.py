@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from itertools import chain
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Donation
+from services.etag import make_etag
+
+logger = logging.getLogger(__name__)
+
+# Snapshots older than this are refreshed in the background while still being served
+METRICS_REFRESH_SECONDS = float(os.getenv("METRICS_REFRESH_SECONDS", 30))
+# Staleness bound: past this age a request waits for a fresh snapshot
+METRICS_MAX_AGE_SECONDS = float(os.getenv("METRICS_MAX_AGE_SECONDS", 300))
+# Donation writes trigger a refresh, but no more often than this
+METRICS_MIN_REFRESH_SECONDS = float(os.getenv("METRICS_MIN_REFRESH_SECONDS", 2))
+
+def encode_payload(payload: Dict) -> Tuple[bytes, str]:
+    """Compact JSON body and a strong ETag derived from it."""
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+    return body, make_etag(hashlib.sha256(body).hexdigest()[:32])
+
+class MetricsSnapshot:
+    """Precomputed response for an aggregate endpoint.
+
+    Requests are served from the last snapshot, so their cost does not depend
+    on table size. A snapshot past METRICS_REFRESH_SECONDS, or one invalidated
+    by a write, is recomputed by a single background task while the old one is
+    still served. Past METRICS_MAX_AGE_SECONDS requests wait for the recompute.
+    """
+
+    def __init__(self, compute: Callable[..., Awaitable[Dict]], session_factory=None,
+                 refresh_after: float = METRICS_REFRESH_SECONDS, max_age: float = METRICS_MAX_AGE_SECONDS,
+                 min_refresh: float = METRICS_MIN_REFRESH_SECONDS, clock=time.monotonic):
+        self.compute = compute
+        self.session_factory = session_factory
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self.min_refresh = min_refresh
+        self.clock = clock
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.computed_at = 0.0
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def invalidate(self):
+        """Mark the snapshot out of date; safe to call from any thread."""
+        self._dirty = True
+
+    def age(self) -> float:
+        return self.clock() - self.computed_at
+
+    async def get(self) -> Tuple[bytes, str, float]:
+        """Returns (JSON body, ETag, age in seconds)."""
+        age = self.age()
+        if self.body is None or age >= self.max_age:
+            await asyncio.shield(self._start_refresh())
+        elif age >= self.refresh_after or (self._dirty and age >= self.min_refresh):
+            self._start_refresh()
+        return self.body, self.etag, self.age()
+
+    def _start_refresh(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            # Writes landing while this runs mark the snapshot dirty again
+            self._dirty = False
+            self._task = loop.create_task(self._refresh())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    async def _refresh(self):
+        if self.session_factory is None:
+            from database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        started = self.clock()
+        async with self.session_factory() as db:
+            payload = await self.compute(db)
+        self.body, self.etag = encode_payload(payload)
+        self.computed_at = started
+        logger.info(f"Refreshed metrics snapshot in {self.clock() - started:.3f}s")
+
+    def _log_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self._dirty = True
+            logger.error(f"Metrics snapshot refresh failed: {task.exception()}")
+
+_snapshots: Dict[str, MetricsSnapshot] = {}
+
+def get_snapshot(name: str, compute: Callable[..., Awaitable[Dict]]) -> MetricsSnapshot:
+    if name not in _snapshots:
+        _snapshots[name] = MetricsSnapshot(compute)
+    return _snapshots[name]
+
+def invalidate_all():
+    for snapshot in _snapshots.values():
+        snapshot.invalidate()
+
+@event.listens_for(Session, "after_flush")
+def _note_donation_writes(session, flush_context):
+    # new/dirty/deleted still describe what this flush wrote
+    if any(isinstance(obj, Donation) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["donations_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("donations_changed", False):
+        invalidate_all()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("donations_changed", None)
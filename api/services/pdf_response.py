@@ -0,0 +1,119 @@
+import os
+import re
+import tempfile
+from typing import Callable, Iterator, Optional, Tuple, Union
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from services import render_pool
+
+# Bytes read from disk per chunk when streaming a rendered PDF
+STREAM_CHUNK_SIZE = int(os.getenv("PDF_STREAM_CHUNK_SIZE", 64 * 1024))
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+def byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single-range Range header, or None to send the whole body.
+
+    Multi-range and malformed headers are ignored, which RFC 9110 allows.
+    Raises RangeNotSatisfiable when the range starts past the end.
+    """
+    if not range_header:
+        return None
+    m = _RANGE.match(range_header.strip())
+    if not m or m.group(1) == m.group(2) == "":
+        return None
+    first, last = m.groups()
+    if first == "":
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    if end < start:
+        return None
+    return start, end
+
+def _if_range_matches(if_range: str, etag: Optional[str]) -> bool:
+    # If-Range uses strong comparison, so a weak tag never matches
+    return bool(etag) and not etag.startswith("W/") and if_range.strip() == etag
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def pdf_response(pdf: Union[bytes, str], filename: str, etag: Optional[str] = None,
+                 range_header: Optional[str] = None, if_range: Optional[str] = None,
+                 delete: bool = False) -> Response:
+    """PDF response from rendered bytes or a file path, honouring a single byte range.
+
+    A path is streamed in STREAM_CHUNK_SIZE pieces so memory stays flat however
+    large the document; with ``delete`` the file is removed once the response
+    is sent (or immediately, if nothing from it is sent). Content-Length is
+    always set, and If-Range falls back to the whole document unless the
+    client's validator strongly matches ``etag``.
+    """
+    is_path = isinstance(pdf, str)
+    size = os.path.getsize(pdf) if is_path else len(pdf)
+    headers = {"Content-Disposition": f'inline; filename="{filename}"', "Accept-Ranges": "bytes"}
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, no-cache"
+
+    if if_range is not None and not _if_range_matches(if_range, etag):
+        range_header = None
+    try:
+        selected = byte_range(range_header, size)
+    except RangeNotSatisfiable:
+        if is_path and delete:
+            _unlink(pdf)
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    status = 200
+    start, end = 0, size - 1
+    if selected is not None:
+        start, end = selected
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+
+    if not is_path:
+        return Response(content=pdf[start:end + 1], status_code=status, media_type="application/pdf",
+                        headers=headers)
+    return StreamingResponse(_iter_file(pdf, start, length), status_code=status, media_type="application/pdf",
+                             headers=headers, background=BackgroundTask(_unlink, pdf) if delete else None)
+
+async def render_to_temp_file(fn: Callable, *args) -> str:
+    """Run ``fn(*args, path)`` on the render pool and return the temp file it wrote.
+
+    The caller owns the file; pass it to pdf_response with ``delete=True``.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        await render_pool.run_async(fn, *args, path)
+    except BaseException:
+        _unlink(path)
+        raise
+    return path
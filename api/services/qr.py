@@ -0,0 +1,45 @@
+import os
+from functools import lru_cache
+from typing import Tuple
+import qrcode
+
+# Distinct verify URLs kept in the memo (one entry per receipt id)
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", 4096))
+QR_BORDER = 4  # quiet zone in modules, same as qrcode.make
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_runs(url: str) -> Tuple[int, Tuple[Tuple[int, int, int], ...]]:
+    """Encode ``url`` and return (modules per side, dark runs as (row, col, length)).
+
+    Horizontally adjacent dark modules are merged into one run, which keeps the
+    number of PDF rectangles per code to a few hundred.
+    """
+    qr = qrcode.QRCode(border=QR_BORDER)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    runs = []
+    for r, row in enumerate(matrix):
+        start = None
+        for col, dark in enumerate(row):
+            if dark and start is None:
+                start = col
+            elif not dark and start is not None:
+                runs.append((r, start, col - start))
+                start = None
+        if start is not None:
+            runs.append((r, start, len(row) - start))
+    return len(matrix), tuple(runs)
+
+def draw_qr(c, url: str, x: float, y: float, size: float):
+    """Draw the QR code for ``url`` as vector rectangles with its lower-left corner at (x, y)."""
+    n, runs = qr_runs(url)
+    m = size / n
+    top = y + size
+    p = c.beginPath()
+    for row, col, length in runs:
+        p.rect(x + col*m, top - (row + 1)*m, length*m, m)
+    c.saveState()
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(p, stroke=0, fill=1)
+    c.restoreState()
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import redis
+import redis.asyncio as aioredis
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# limit/window_seconds applied to any path without a more specific rule
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "60/60")
+# Comma separated path_prefix=limit/window overrides; the longest matching prefix wins
+RATE_LIMIT_RULES = os.getenv("RATE_LIMIT_RULES", "/api/v1/donations/receipts.pdf=10/60,/api/v1/tasks/=5/60")
+# Share of a rule's limit leased from Redis per round trip and decided locally
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", 0.1))
+# Leased permits are handed back to the shared bucket after this long so workers stay in step
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1.0))
+RATE_LIMIT_REDIS_POOL = int(os.getenv("RATE_LIMIT_REDIS_POOL", 20))
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", 0.25))
+# After a Redis error, decide locally for this long before trying again
+RATE_LIMIT_REDIS_RETRY = float(os.getenv("RATE_LIMIT_REDIS_RETRY", 5.0))
+# Tracked client keys per process before idle ones are pruned
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 10000))
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    limit: int
+    window: float
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.window
+
+    @property
+    def lease_size(self) -> int:
+        return max(1, int(self.limit * RATE_LIMIT_LEASE_FRACTION))
+
+def parse_rules(default: str = RATE_LIMIT_DEFAULT, rules: str = RATE_LIMIT_RULES) -> Tuple[Rule, List[Tuple[str, Rule]]]:
+    """Parse the default rule and per-route overrides, longest prefix first."""
+    def rule(name: str, spec: str) -> Rule:
+        limit, window = spec.strip().split("/")
+        return Rule(name, int(limit), float(window))
+
+    routes = []
+    for part in filter(None, (p.strip() for p in rules.split(","))):
+        prefix, spec = part.split("=", 1)
+        routes.append((prefix.strip(), rule(prefix.strip(), spec)))
+    routes.sort(key=lambda r: len(r[0]), reverse=True)
+    return rule("default", default), routes
+
+# Token bucket holding up to ARGV[1] permits refilled at ARGV[2] per second.
+# Puts back ARGV[4] unspent permits, grants up to ARGV[3] and returns
+# {granted, ms until the next permit}.
+_TAKE_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local returned = tonumber(ARGV[4]) or 0
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or capacity
+local ts = tonumber(b[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate + returned)
+local granted = math.min(want, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+local wait = 0
+if tokens < 1 then wait = math.ceil((1 - tokens) / rate * 1000) end
+return {granted, wait}
+"""
+
+class LocalBucketStore:
+    """In-process token buckets with the same semantics as the Redis script."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, rule: Rule, want: int, returned: int = 0) -> Tuple[int, float]:
+        now = self.clock()
+        tokens, ts = self._buckets.get(key, (rule.limit, now))
+        tokens = min(rule.limit, tokens + max(0.0, now - ts) * rule.rate + returned)
+        granted = min(want, math.floor(tokens))
+        tokens -= granted
+        self._buckets[key] = (tokens, now)
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / rule.rate
+        if len(self._buckets) > RATE_LIMIT_MAX_KEYS:
+            self._prune(now, rule)
+        return granted, wait
+
+    def _prune(self, now: float, rule: Rule):
+        # A bucket that would have refilled completely carries no state
+        idle = rule.window
+        for key, (_, ts) in list(self._buckets.items()):
+            if now - ts >= idle:
+                del self._buckets[key]
+
+    def reset(self):
+        self._buckets.clear()
+
+class RedisBucketStore:
+    """Buckets shared by every API worker, updated atomically by a Lua script."""
+
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+        self._take = client.register_script(_TAKE_LUA)
+
+    async def take(self, key: str, rule: Rule, want: int, returned: int = 0) -> Tuple[int, float]:
+        granted, wait_ms = await self._take(keys=[f"rate_limit:{key}"],
+                                            args=[rule.limit, rule.rate, want, returned])
+        return int(granted), int(wait_ms) / 1000
+
+@dataclass
+class _Lease:
+    tokens: int = 0
+    expires: float = 0.0
+    denied_until: float = 0.0
+    refill: Optional[asyncio.Future] = None
+
+class RateLimiter:
+    """Per-client, per-route limiter with a local fast path.
+
+    Permits are leased from Redis in blocks of ``rule.lease_size`` and spent
+    in-process, so most requests never touch Redis. Leases lapse after
+    RATE_LIMIT_SYNC_INTERVAL and their unspent permits go back to the shared
+    bucket with the next refill, so every worker converges on the shared
+    budget without a client under its limit losing burst capacity.
+    Without Redis the same buckets are kept per process.
+    """
+
+    def __init__(self, store: Optional[RedisBucketStore] = None, rules: Optional[Tuple[Rule, List]] = None,
+                 clock=time.monotonic):
+        self.store = store
+        self.default, self.routes = rules or parse_rules()
+        self.clock = clock
+        self.local = LocalBucketStore(clock)
+        self._leases: Dict[str, _Lease] = {}
+        self._redis_down_until = 0.0
+
+    def rule_for(self, path: str) -> Rule:
+        for prefix, rule in self.routes:
+            if path.startswith(prefix):
+                return rule
+        return self.default
+
+    async def hit(self, client_id: str, path: str) -> Tuple[bool, float]:
+        """Spend one permit; returns (allowed, seconds until a permit is available)."""
+        rule = self.rule_for(path)
+        key = f"{rule.name}:{client_id}"
+        now = self.clock()
+        if self.store is None or now < self._redis_down_until:
+            granted, wait = self.local.take(key, rule, 1)
+            return granted > 0, wait
+
+        lease = self._leases.get(key)
+        if lease is None:
+            if len(self._leases) > RATE_LIMIT_MAX_KEYS:
+                self._prune(now)
+            lease = self._leases[key] = _Lease()
+        if lease.refill is not None:
+            # Another request for this key is already asking Redis
+            await asyncio.shield(lease.refill)
+            return await self.hit(client_id, path)
+        if now < lease.expires:
+            if lease.tokens > 0:
+                lease.tokens -= 1
+                return True, 0.0
+            if now < lease.denied_until:
+                return False, lease.denied_until - now
+
+        lease.refill = asyncio.get_running_loop().create_future()
+        try:
+            # Only a lapsed lease still holds permits here; hand them back with the refill
+            granted, wait = await self.store.take(key, rule, rule.lease_size, returned=lease.tokens)
+        except (redis.exceptions.RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.error(f"Redis error during rate limiting, deciding locally: {e}")
+            self._redis_down_until = self.clock() + RATE_LIMIT_REDIS_RETRY
+            granted, wait = self.local.take(key, rule, 1)
+            return granted > 0, wait
+        finally:
+            lease.refill.set_result(None)
+            lease.refill = None
+        now = self.clock()
+        lease.tokens, lease.expires, lease.denied_until = granted, now + RATE_LIMIT_SYNC_INTERVAL, now + wait
+        if lease.tokens > 0:
+            lease.tokens -= 1
+            return True, 0.0
+        return False, wait
+
+    def _prune(self, now: float):
+        for key, lease in list(self._leases.items()):
+            if lease.refill is None and now >= lease.expires:
+                del self._leases[key]
+
+    def reset(self):
+        self._leases.clear()
+        self.local.reset()
+
+_limiter: Optional[RateLimiter] = None
+
+def get_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        from redis_conn import connect_async_redis
+        client = connect_async_redis(max_connections=RATE_LIMIT_REDIS_POOL, timeout=RATE_LIMIT_REDIS_TIMEOUT)
+        _limiter = RateLimiter(RedisBucketStore(client))
+    return _limiter
+
+async def rate_limit_middleware(request: Request, call_next):
+    if not RATE_LIMIT_ENABLED:
+        return await call_next(request)
+
+    client_ip = request.client.host if request.client else "unknown"
+    allowed, retry_after = await get_limiter().hit(client_ip, request.url.path)
+    if not allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+    return await call_next(request)
+
+async def close_limiter():
+    global _limiter
+    if _limiter is not None and _limiter.store is not None:
+        await _limiter.store.client.aclose()
+    _limiter = None
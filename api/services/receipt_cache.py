@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from prometheus_client import Counter
+import redis
+from services import receipts
+from services.render_assets import registry as assets
+
+logger = logging.getLogger(__name__)
+
+# memory | disk | redis | none
+RECEIPT_CACHE_BACKEND = os.getenv("RECEIPT_CACHE_BACKEND", "memory").strip().lower()
+RECEIPT_CACHE_MAX_BYTES = int(os.getenv("RECEIPT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RECEIPT_CACHE_DIR = os.getenv("RECEIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "receipt-cache"))
+RECEIPT_CACHE_TTL = int(os.getenv("RECEIPT_CACHE_TTL", 7 * 24 * 3600))
+
+# Bump whenever the receipt layout changes so old renders stop matching
+RENDER_VERSION = "1"
+
+CACHE_HITS = Counter("receipt_cache_hits_total", "Receipt PDF cache hits", ["backend"])
+CACHE_MISSES = Counter("receipt_cache_misses_total", "Receipt PDF cache misses", ["backend"])
+CACHE_EVICTIONS = Counter("receipt_cache_evictions_total", "Receipt PDFs evicted from the cache", ["backend"])
+
+def receipt_cache_key(fields: Dict) -> str:
+    """Content hash of everything that feeds generate_receipt_pdf for one receipt."""
+    payload = json.dumps({
+        "v": RENDER_VERSION,
+        "org": [receipts.ORG_NAME, receipts.ORG_EIN, receipts.ORG_ADDR, receipts.BASE_VERIFY_URL],
+        "assets": assets.fingerprint(),
+        "fields": fields,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MemoryReceiptCache:
+    """In-process LRU bounded by the total size of the cached PDFs."""
+    name = "memory"
+
+    def __init__(self, max_bytes: int = RECEIPT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._items.get(key)
+            if pdf is not None:
+                self._items.move_to_end(key)
+            return pdf
+
+    def put(self, key: str, pdf: bytes):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = pdf
+            self.size += len(pdf)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                CACHE_EVICTIONS.labels(backend=self.name).inc()
+
+class DiskReceiptCache:
+    """One file per key under a local directory, written atomically."""
+    name = "disk"
+
+    def __init__(self, directory: str = RECEIPT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, pdf: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+class RedisReceiptCache:
+    """Shared cache in Redis; expiry and eviction are left to the server."""
+    name = "redis"
+
+    def __init__(self, client: redis.Redis, ttl: int = RECEIPT_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"receipt_pdf:{key}")
+
+    def put(self, key: str, pdf: bytes):
+        self.client.set(f"receipt_pdf:{key}", pdf, ex=self.ttl)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_receipt_cache():
+    """Process-wide cache backend selected by RECEIPT_CACHE_BACKEND, or None."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if RECEIPT_CACHE_BACKEND == "memory":
+                _cache = MemoryReceiptCache()
+            elif RECEIPT_CACHE_BACKEND == "disk":
+                _cache = DiskReceiptCache()
+            elif RECEIPT_CACHE_BACKEND == "redis":
+                from redis_conn import connect_redis
+                client = connect_redis(decode_responses=False)
+                if client is not None:
+                    _cache = RedisReceiptCache(client)
+                else:
+                    logger.warning("Redis unavailable, falling back to in-memory receipt cache")
+                    _cache = MemoryReceiptCache()
+            elif RECEIPT_CACHE_BACKEND != "none":
+                logger.error(f"Unknown RECEIPT_CACHE_BACKEND {RECEIPT_CACHE_BACKEND!r}, using the in-memory receipt cache")
+                _cache = MemoryReceiptCache()
+        return _cache
+
+def cache_get(key: str) -> Optional[bytes]:
+    cache = get_receipt_cache()
+    if cache is None:
+        return None
+    try:
+        pdf = cache.get(key)
+    except (OSError, redis.exceptions.RedisError) as e:
+        logger.error(f"Receipt cache read failed: {e}")
+        pdf = None
+    (CACHE_HITS if pdf is not None else CACHE_MISSES).labels(backend=cache.name).inc()
+    return pdf
+
+def cache_put(key: str, pdf: bytes):
+    cache = get_receipt_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(key, pdf)
+    except (OSError, redis.exceptions.RedisError) as e:
+        logger.error(f"Receipt cache write failed: {e}")
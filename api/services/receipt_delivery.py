@@ -0,0 +1,52 @@
+import logging
+from sqlalchemy.orm import Session
+from services import receipts, render_pool
+from services import emailer
+
+logger = logging.getLogger(__name__)
+
+class DonationNotFound(LookupError):
+    pass
+
+class NoDonorEmail(ValueError):
+    pass
+
+def deliver_receipt(db: Session, donation_id: str) -> dict:
+    """Render a donation's receipt and email it to the donor.
+
+    Raises DonationNotFound or NoDonorEmail when there is nothing to send.
+    """
+    ctx = receipts.load_receipt_context(db, donation_id)
+    if ctx is None:
+        logger.warning(f"Donation not found for email send: {donation_id}")
+        raise DonationNotFound(donation_id)
+
+    donor_email = ctx.donor_email
+    if not donor_email:
+        logger.warning(f"No email address for donation {donation_id}")
+        raise NoDonorEmail(donation_id)
+
+    fields = ctx.fields
+    rid = fields["receipt_id"]
+    pdf = render_pool.render_receipt(**fields)
+
+    email_html = f""" 
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <h2>Thank you for your generous donation!</h2>
+        <p>Dear {fields["donor_name"]},</p>
+        <p>Thank you for your gift of ${fields["donation_amount"]:.2f} to {fields["designation"]}.</p>
+        <p>Your donation receipt is attached to this email for your tax records.</p>
+        <p>With gratitude,<br>The SparkCreatives Team</p>
+    </body>
+    </html>
+    """ 
+
+    ok = emailer.send_email(donor_email, "Your donation receipt", email_html, pdf, f"{rid}.pdf")
+
+    if ok:
+        logger.info(f"Receipt email sent successfully for donation {donation_id} to {donor_email}")
+    else:
+        logger.error(f"Failed to send receipt email for donation {donation_id} to {donor_email}")
+
+    return {"sent": bool(ok), "recipient": donor_email}
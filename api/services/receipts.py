@@ -1,48 +1,56 @@
 import os, io
-from datetime import datetime
-from typing import Optional, List, Dict
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Optional, List, Dict, Iterable, Iterator, Sequence, Tuple
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from reportlab.lib.utils import ImageReader
-import qrcode
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models import Donation, Donor
+from services.render_assets import registry as assets
+from services.qr import draw_qr
+
+logger = logging.getLogger(__name__)
 
 ORG_NAME = os.getenv("SPARK_ORG_NAME", "SparkCreatives Inc.")
 ORG_EIN = os.getenv("SPARK_EIN", "33-4477854")
 ORG_ADDR = os.getenv("SPARK_ADDR", "6120 Caladesi Ct, Jacksonville, FL 32258")
 BASE_VERIFY_URL = os.getenv("SPARK_VERIFY_BASE_URL", "https://sparkcreatives.org/verify")
-LOGO_PATH = os.getenv("SPARK_LOGO_PATH", "/app/assets/logo.png")
-
-def _load_logo_bytes() -> Optional[bytes]:
-    try:
-        with open(LOGO_PATH, "rb") as f:
-            return f.read()
-    except Exception:
-        return None
+HEADER_FORM = "SparkHeader"
 
-def _qr_bytes(url: str) -> bytes:
-    img = qrcode.make(url)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+def _draw_header(c, W, H):
+    """Draw the page header, defining it once per document as a form XObject.
 
-def _draw_header(c, W, H, logo_bytes: Optional[bytes]):
-    c.setFillColorRGB(0.946, 0.592, 0.219)  # #F19738
-    c.rect(0, H-1.0*inch, W, 1.0*inch, fill=1, stroke=0)
-    if logo_bytes:
-        try:
-            img = ImageReader(io.BytesIO(logo_bytes))
-            c.drawImage(img, 0.75*inch, H-0.9*inch, width=0.8*inch, height=0.8*inch, preserveAspectRatio=True, mask='auto')
-        except Exception:
-            pass
-    c.setFillColor(colors.white)
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(1.8*inch, H-0.55*inch, ORG_NAME[:64])
-    c.setFont("Helvetica", 9.5)
-    c.drawString(1.8*inch, H-0.8*inch, f"EIN: {ORG_EIN} • {ORG_ADDR}")
+    Every later page (and every later receipt in a multi-page document) only
+    references the form, so the logo image is embedded a single time.
+    """
+    if not c.hasForm(HEADER_FORM):
+        c.beginForm(HEADER_FORM)
+        c.saveState()
+        c.setFillColorRGB(0.946, 0.592, 0.219)  # #F19738
+        c.rect(0, H-1.0*inch, W, 1.0*inch, fill=1, stroke=0)
+        logo = assets.logo()
+        if logo is not None:
+            try:
+                c.drawImage(logo, 0.75*inch, H-0.9*inch, width=0.8*inch, height=0.8*inch, preserveAspectRatio=True, mask='auto')
+            except Exception:
+                pass
+        c.setFillColor(colors.white)
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(1.8*inch, H-0.55*inch, ORG_NAME[:64])
+        c.setFont("Helvetica", 9.5)
+        c.drawString(1.8*inch, H-0.8*inch, f"EIN: {ORG_EIN} • {ORG_ADDR}")
+        c.restoreState()
+        c.endForm()
+    c.doForm(HEADER_FORM)
 
 def _designation_breakdown(rows: List[Dict]) -> List[Dict]:
     from collections import defaultdict
@@ -53,11 +61,11 @@ def _designation_breakdown(rows: List[Dict]) -> List[Dict]:
         totals[des] += amt
     return [{"designation": k, "amount": v} for k,v in sorted(totals.items())]
 
-def generate_receipt_pdf(receipt_id: str, donor_name: str, donation_amount: float, donation_date: str,
-                         designation: str, restricted: bool, payment_method: str,
-                         soft_credit_to: Optional[str]=None, line_items: Optional[List[Dict]]=None) -> bytes:
-    buf = io.BytesIO(); c = canvas.Canvas(buf, pagesize=LETTER); W,H = LETTER
-    _draw_header(c, W, H, _load_logo_bytes())
+def _draw_receipt_page(c, receipt_id: str, donor_name: str, donation_amount: float, donation_date: str,
+                       designation: str, restricted: bool, payment_method: str,
+                       soft_credit_to: Optional[str]=None, line_items: Optional[List[Dict]]=None):
+    W,H = LETTER
+    _draw_header(c, W, H)
 
     y = H - 1.25*inch
     c.setFillColor(colors.black)
@@ -89,8 +97,7 @@ def generate_receipt_pdf(receipt_id: str, donor_name: str, donation_amount: floa
 
     verify_url = f"{BASE_VERIFY_URL}?rid={receipt_id}"
     try:
-        qr_png = _qr_bytes(verify_url)
-        c.drawImage(ImageReader(io.BytesIO(qr_png)), W-1.9*inch, 0.9*inch, width=1.1*inch, height=1.1*inch, mask='auto')
+        draw_qr(c, verify_url, W-1.9*inch, 0.9*inch, 1.1*inch)
         c.setFont("Helvetica", 8.5); c.drawRightString(W-0.75*inch, 0.85*inch, "Verify receipt")
     except Exception:
         pass
@@ -100,15 +107,228 @@ def generate_receipt_pdf(receipt_id: str, donor_name: str, donation_amount: floa
     c.setFont("Helvetica", 8.5)
     c.drawString(0.75*inch, 0.75*inch, "Thank you for fueling creativity and shipping boxes of hope.")
     c.drawRightString(W-0.75*inch, 0.75*inch, datetime.utcnow().strftime("Generated %Y-%m-%d %H:%M UTC"))
-    c.showPage(); c.save()
+    c.showPage()
+
+def generate_receipt_pdf(receipt_id: str, donor_name: str, donation_amount: float, donation_date: str,
+                         designation: str, restricted: bool, payment_method: str,
+                         soft_credit_to: Optional[str]=None, line_items: Optional[List[Dict]]=None) -> bytes:
+    buf = io.BytesIO(); c = canvas.Canvas(buf, pagesize=LETTER)
+    _draw_receipt_page(c, receipt_id=receipt_id, donor_name=donor_name, donation_amount=donation_amount,
+                       donation_date=donation_date, designation=designation, restricted=restricted,
+                       payment_method=payment_method, soft_credit_to=soft_credit_to, line_items=line_items)
+    c.save()
     return buf.getvalue()
 
+def generate_receipts_pdf(receipts: Iterable[Dict], out) -> int:
+    """Render many receipts as consecutive pages of one document written to ``out``.
+
+    Each item holds generate_receipt_pdf keyword arguments. The header form and
+    logo are embedded once for the whole document. Returns the page count.
+    """
+    c = canvas.Canvas(out, pagesize=LETTER)
+    pages = 0
+    for fields in receipts:
+        _draw_receipt_page(c, **fields)
+        pages += 1
+    if not pages:
+        c.showPage()
+    c.save()
+    return pages
+
+def render_receipts_to_file(receipts: Sequence[Dict], path: str) -> int:
+    """Picklable entry point for the render pool: write a bulk receipt PDF to ``path``."""
+    with open(path, "wb") as f:
+        return generate_receipts_pdf(receipts, f)
+
+# Per-process read-through cache of receipt contexts; short so edits show up quickly
+RECEIPT_CONTEXT_TTL = float(os.getenv("RECEIPT_CONTEXT_TTL", 30))
+RECEIPT_CONTEXT_CACHE_SIZE = int(os.getenv("RECEIPT_CONTEXT_CACHE_SIZE", 10000))
+
+def _fields(dn, donor_name: Optional[str]) -> Dict:
+    try:
+        amount = float(dn.amount or 0)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Error converting donation amount for {dn.donation_id}: {str(e)}")
+        amount = 0.0
+    return dict(
+        receipt_id=dn.receipt_id or f"RCPT-{dn.donation_id}",
+        donor_name=donor_name if donor_name is not None else "Donor",
+        donation_amount=amount,
+        donation_date=dn.received_at.strftime("%Y-%m-%d") if dn.received_at else "",
+        designation=dn.designation or "General Fund",
+        restricted=dn.restricted,
+        payment_method=(dn.method or "square").title(),
+        soft_credit_to=dn.soft_credit_to,
+        line_items=line_items_from_row(dn)
+    )
+
+def receipt_fields(dn: Donation, donor: Optional[Donor]) -> Dict:
+    """generate_receipt_pdf keyword arguments for a donation and its donor."""
+    return _fields(dn, donor.primary_contact_name if donor else None)
+
+@dataclass(frozen=True)
+class ReceiptContext:
+    """Everything the receipt routes need for one donation; ``fields`` feeds generate_receipt_pdf."""
+    donation_id: str
+    received_at: Optional[datetime]
+    fields: Dict
+    donor_email: str
+
+def receipt_context(dn, donor_name: Optional[str], donor_email: Optional[str]) -> ReceiptContext:
+    """Build a context from a donation (ORM object or row) and its donor's name and email."""
+    return ReceiptContext(dn.donation_id, dn.received_at, _fields(dn, donor_name), (donor_email or "").strip())
+
+def _context_query():
+    """Donation and donor columns used on receipts, in one outer join and without ORM entities."""
+    return select(
+        Donation.donation_id, Donation.receipt_id, Donation.amount, Donation.received_at,
+        Donation.designation, Donation.restricted, Donation.method, Donation.soft_credit_to,
+        Donation.designation_breakdown, Donor.primary_contact_name, Donor.email,
+    ).outerjoin(Donor, Donor.donor_id == Donation.donor_id)
+
+def _row_context(row) -> ReceiptContext:
+    return receipt_context(row, row.primary_contact_name, row.email)
+
+class ReceiptContextCache:
+    """LRU of receipt contexts by donation id with a TTL; misses are not cached."""
+
+    def __init__(self, ttl: float = RECEIPT_CONTEXT_TTL, max_items: int = RECEIPT_CONTEXT_CACHE_SIZE,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.clock = clock
+        self._items: "OrderedDict[str, Tuple[float, ReceiptContext]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, donation_id: str) -> Optional[ReceiptContext]:
+        with self._lock:
+            item = self._items.get(donation_id)
+            if item is None:
+                return None
+            if item[0] <= self.clock():
+                del self._items[donation_id]
+                return None
+            self._items.move_to_end(donation_id)
+            return item[1]
+
+    def put(self, ctx: ReceiptContext):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[ctx.donation_id] = (self.clock() + self.ttl, ctx)
+            self._items.move_to_end(ctx.donation_id)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def discard(self, donation_ids: Iterable[str]):
+        with self._lock:
+            for donation_id in donation_ids:
+                self._items.pop(donation_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+context_cache = ReceiptContextCache()
+
+def load_receipt_context(db: Session, donation_id: str) -> Optional[ReceiptContext]:
+    """Donation, donor and receipt fields for one donation, read through the context cache."""
+    ctx = context_cache.get(donation_id)
+    if ctx is None:
+        row = db.execute(_context_query().where(Donation.donation_id == donation_id)).one_or_none()
+        if row is None:
+            return None
+        ctx = _row_context(row)
+        context_cache.put(ctx)
+    return ctx
+
+async def load_receipt_context_async(db: AsyncSession, donation_id: str) -> Optional[ReceiptContext]:
+    ctx = context_cache.get(donation_id)
+    if ctx is None:
+        row = (await db.execute(_context_query().where(Donation.donation_id == donation_id))).one_or_none()
+        if row is None:
+            return None
+        ctx = _row_context(row)
+        context_cache.put(ctx)
+    return ctx
+
+def load_receipt_contexts(db: Session, donation_ids: Sequence[str]) -> Dict[str, ReceiptContext]:
+    """Contexts for many donations: cached ones plus a single query for the rest. Unknown ids are left out."""
+    found: Dict[str, ReceiptContext] = {}
+    missing = []
+    for donation_id in dict.fromkeys(donation_ids):
+        ctx = context_cache.get(donation_id)
+        if ctx is not None:
+            found[donation_id] = ctx
+        else:
+            missing.append(donation_id)
+    if missing:
+        for row in db.execute(_context_query().where(Donation.donation_id.in_(missing))):
+            ctx = found[row.donation_id] = _row_context(row)
+            context_cache.put(ctx)
+    return found
+
+def receipt_fields_for_ids(db: Session, donation_ids: Sequence[str]) -> List[Dict]:
+    """Receipt fields for the given donations in received_at order, via load_receipt_contexts."""
+    found = load_receipt_contexts(db, donation_ids)
+    ordered = sorted(found.values(), key=lambda c: (c.received_at or datetime.min, c.donation_id))
+    return [c.fields for c in ordered]
+
+def iter_receipt_fields(db: Session, donation_ids: Optional[Sequence[str]] = None,
+                        start: Optional[date] = None, end: Optional[date] = None,
+                        limit: Optional[int] = None) -> Iterator[Dict]:
+    """Stream receipt fields for donations selected by id and/or an inclusive date range, at most ``limit`` of them."""
+    stmt = _context_query()
+    if donation_ids is not None:
+        stmt = stmt.where(Donation.donation_id.in_(list(donation_ids)))
+    if start is not None:
+        stmt = stmt.where(Donation.received_at >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        stmt = stmt.where(Donation.received_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    stmt = stmt.order_by(Donation.received_at, Donation.donation_id).execution_options(yield_per=500)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    for row in db.execute(stmt):
+        yield _row_context(row).fields
+
 def find_donation(db: Session, donation_id: str) -> Optional[Donation]:
     return db.query(Donation).filter(Donation.donation_id == donation_id).first()
 
 def find_donor(db: Session, donor_id: str) -> Optional[Donor]:
     return db.query(Donor).filter(Donor.donor_id == donor_id).first()
 
+async def find_donation_async(db: AsyncSession, donation_id: str) -> Optional[Donation]:
+    return (await db.execute(select(Donation).where(Donation.donation_id == donation_id))).scalars().first()
+
+async def find_donor_async(db: AsyncSession, donor_id: str) -> Optional[Donor]:
+    return (await db.execute(select(Donor).where(Donor.donor_id == donor_id))).scalars().first()
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_contexts(session, flush_context):
+    ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Donation):
+            ids.add(obj.donation_id)
+        elif isinstance(obj, Donor):
+            # A donor feeds many cached donations; donor edits are rare, so drop them all
+            ids.add("*")
+    if ids:
+        session.info.setdefault("receipt_contexts", set()).update(ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_contexts_on_commit(session):
+    ids = session.info.pop("receipt_contexts", None)
+    if not ids:
+        return
+    if "*" in ids:
+        context_cache.clear()
+    else:
+        context_cache.discard(ids)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_contexts(session):
+    session.info.pop("receipt_contexts", None)
+
 def line_items_from_row(row: Donation) -> Optional[list]:
     br = (row.designation_breakdown or "").strip()
     if not br: return None
@@ -1,9 +1,21 @@
 import os, json
+import logging
+import time
 from collections import defaultdict
+from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from models import Donation
+from models import Donation, DonationDailyRollup
+from services import telemetry
+from services.rollups import donation_cents
+from services.ledger import reconcile_ledger
+
+logger = logging.getLogger(__name__)
+
+# Per-row differences between the internal ledger and Square, next to the report
+VARIANCE_FILE = "reconciliation_variances.csv"
 
 def dec(v) -> Decimal:
     # Check if v is already a Decimal
@@ -14,30 +26,111 @@ def dec(v) -> Decimal:
         v = str(v)
     return Decimal(v or "0").quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
-def run_reconciliation(db: Session, data_dir: str) -> Dict:
-    donations = db.query(Donation).all()
+def rollup(totals: Iterable[Tuple[str, Decimal]], base: Optional[Dict[str, str]] = None) -> Dict:
+    """Format per-designation sums, added onto ``base`` from an earlier report.
+
+    Blank designations count toward the General Fund.
+    """
+    by_des = defaultdict(Decimal, {k: Decimal(v) for k, v in (base or {}).items()})
+    for des, amt in totals:
+        by_des[des or "General Fund"] += dec(amt)
+    total = sum(by_des.values(), Decimal("0.00"))
+    return {"total": f"{total:.2f}", "by_designation": {k: f"{v:.2f}" for k,v in sorted(by_des.items())}}
+
+def designation_totals(db: Session, since: Optional[datetime] = None):
+    """Exact NUMERIC sums per designation, computed by the database.
 
-    # For now, we'll ignore internal_donations.csv and just use the donations from the database
-    internal = []
+    Rows are (designation, sum, count, latest received_at); ``since`` limits
+    them to donations received strictly after it.
+    """
+    q = db.query(Donation.designation, func.sum(Donation.amount), func.count(), func.max(Donation.received_at))
+    if since is not None:
+        q = q.filter(Donation.received_at > since)
+    return q.group_by(Donation.designation).all()
 
-    def rollup(rows: List[Donation]):
-        by_des, total = defaultdict(Decimal), Decimal("0.00")
-        for r in rows:
-            des = r.designation or "General Fund"
-            amt = dec(r.amount)
-            by_des[des] += amt
-            total += amt
-        return {"total": f"{total:.2f}", "by_designation": {k: f"{v:.2f}" for k,v in sorted(by_des.items())}}
+def _totals_through(db: Session, watermark: datetime) -> Tuple[Dict[str, str], int]:
+    """Per-designation totals and row count of donations received at or before ``watermark``.
 
-    res = {"square": rollup(donations), "internal": rollup(internal)}
+    Whole days come from the daily rollups; only the watermark's own day is
+    read from the donations table.
+    """
+    day_start = datetime.combine(watermark.date(), datetime.min.time())
+    days = (db.query(DonationDailyRollup.designation, func.sum(DonationDailyRollup.amount_cents),
+                     func.sum(DonationDailyRollup.donation_count))
+            .filter(DonationDailyRollup.day < watermark.date())
+            .group_by(DonationDailyRollup.designation).all())
+    last_day = (db.query(Donation.designation, func.sum(donation_cents), func.count())
+                .filter(Donation.received_at >= day_start, Donation.received_at <= watermark)
+                .group_by(Donation.designation).all())
+    buckets = days + last_day
+    totals = rollup((des, Decimal(int(cents or 0)).scaleb(-2)) for des, cents, _ in buckets)
+    return totals["by_designation"], sum(int(count or 0) for _, _, count in buckets)
+
+def _usable_watermark(db: Session, previous: Optional[Dict]) -> Optional[Dict]:
+    """The previous report's watermark, unless history before it has changed since."""
+    wm = (previous or {}).get("watermark")
+    if not wm or not wm.get("received_at"):
+        return None
+    # A backfilled, deleted or edited donation at or before the watermark
+    # changes these totals; its effect cannot be applied incrementally, so
+    # rebuild instead
+    by_designation, rows = _totals_through(db, datetime.fromisoformat(wm["received_at"]))
+    if rows != wm["rows"] or by_designation != previous["square"]["by_designation"]:
+        logger.info("Donations before the reconciliation watermark changed, running a full rollup")
+        return None
+    return wm
+
+def run_reconciliation(db: Session, data_dir: str, incremental: bool = False) -> Dict:
+    """Roll up donations by designation and persist the report.
+
+    With ``incremental`` only donations received after the stored report's
+    watermark are aggregated and merged into its totals.
+    """
+    started = time.perf_counter()
+    try:
+        res = _run_reconciliation(db, data_dir, incremental)
+    except Exception:
+        telemetry.RECONCILIATION_RUNS.inc(mode="incremental" if incremental else "full", outcome="error")
+        raise
+    telemetry.RECONCILIATION_SECONDS.labels(mode=res["mode"]).observe(time.perf_counter() - started)
+    telemetry.RECONCILIATION_RUNS.inc(mode=res["mode"], outcome="ok")
+    return res
+
+def _run_reconciliation(db: Session, data_dir: str, incremental: bool) -> Dict:
+    previous = latest_report(data_dir) if incremental else None
+    wm = _usable_watermark(db, previous)
+    since = datetime.fromisoformat(wm["received_at"]) if wm else None
+    base = previous["square"]["by_designation"] if wm else None
+
+    totals = designation_totals(db, since)
+    rows = (wm["rows"] if wm else 0) + sum(count for _, _, count, _ in totals)
+    latest = max((last for _, _, _, last in totals if last is not None), default=since)
+
+    ledger = None
+    ledger_path = os.path.join(data_dir, "internal_donations.csv")
+    if os.path.exists(ledger_path):
+        ledger = reconcile_ledger(db, ledger_path, os.path.join(data_dir, VARIANCE_FILE))
+        internal = [(des, Decimal(cents).scaleb(-2)) for des, cents in ledger["by_designation_cents"].items()]
+    else:
+        internal = []
+
+    res = {"square": rollup(((des, amt) for des, amt, _, _ in totals), base), "internal": rollup(internal)}
+    if ledger is not None:
+        res["internal_rows"] = ledger["rows"]
+        res["variances"] = {"counts": ledger["counts"], "file": VARIANCE_FILE}
     try:
         res["variance_total"] = f'{Decimal(res["square"]["total"]) - Decimal(res["internal"]["total"]):.2f}'
     except Exception:
         res["variance_total"] = None
-    
+    res["mode"] = "incremental" if wm else "full"
+    res["watermark"] = {"received_at": latest.isoformat() if latest else None, "rows": rows}
+    res["generated_at"] = datetime.utcnow().isoformat(timespec="seconds")
+
     out_path = os.path.join(data_dir, "reconciliation_report.json")
-    with open(out_path, "w", encoding="utf-8") as f:
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(res, f, indent=2)
+    os.replace(tmp_path, out_path)
     return res
 
 def latest_report(data_dir: str):
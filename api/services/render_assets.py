@@ -0,0 +1,83 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from reportlab.lib.utils import ImageReader
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = os.getenv("SPARK_LOGO_PATH", "/app/assets/logo.png")
+# Seconds between stat() checks for a changed logo file; 0 checks on every render
+ASSET_RELOAD_INTERVAL = float(os.getenv("SPARK_ASSET_RELOAD_INTERVAL", 30))
+
+class AssetRegistry:
+    """Per-process cache of decoded renderer assets.
+
+    The logo is read and decoded once; ReportLab keeps the decoded pixels on
+    the ImageReader, so every document drawn with it skips the PNG decode.
+    The file is re-read only when its mtime or size changes.
+    """
+
+    def __init__(self, logo_path: str = LOGO_PATH, reload_interval: float = ASSET_RELOAD_INTERVAL):
+        self.logo_path = logo_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stat = None
+        self._checked_at = 0.0
+        self._logo_bytes: Optional[bytes] = None
+        self._logo_reader: Optional[ImageReader] = None
+        self._logo_fingerprint = ""
+
+    def _stat_logo(self):
+        try:
+            st = os.stat(self.logo_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        stat = self._stat_logo()
+        if self._loaded and stat == self._stat:
+            return
+        self._loaded = True
+        self._stat = stat
+        self._logo_bytes, self._logo_reader, self._logo_fingerprint = None, None, ""
+        if stat is None:
+            return
+        try:
+            with open(self.logo_path, "rb") as f:
+                data = f.read()
+            reader = ImageReader(io.BytesIO(data))
+            reader.getRGBData()  # decode now so renders only ever reuse pixels
+        except Exception as e:
+            logger.error(f"Could not load logo from {self.logo_path}: {e}")
+            return
+        self._logo_bytes, self._logo_reader = data, reader
+        self._logo_fingerprint = hashlib.sha256(data).hexdigest()
+        logger.info(f"Loaded renderer logo {self.logo_path} ({len(data)} bytes)")
+
+    def logo(self) -> Optional[ImageReader]:
+        with self._lock:
+            self._refresh()
+            return self._logo_reader
+
+    def logo_bytes(self) -> Optional[bytes]:
+        with self._lock:
+            self._refresh()
+            return self._logo_bytes
+
+    def fingerprint(self) -> str:
+        """Hash of the current assets, for cache keys of rendered output."""
+        with self._lock:
+            self._refresh()
+            return self._logo_fingerprint
+
+registry = AssetRegistry()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+from services import receipts, telemetry
+
+logger = logging.getLogger(__name__)
+
+# Number of render processes per API worker; 0 renders inline on the calling thread
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", min(2, os.cpu_count() or 1)))
+# Fresh interpreters avoid inheriting the server's event loop and open sockets
+PDF_RENDER_START_METHOD = os.getenv("PDF_RENDER_START_METHOD", "spawn")
+
+T = TypeVar("T")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if PDF_RENDER_WORKERS <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context(PDF_RENDER_START_METHOD),
+            )
+            logger.info(f"Started PDF render pool with {PDF_RENDER_WORKERS} processes")
+        return _executor
+
+# Render functions counted per document type; anything else is only timed
+_DOCUMENTS = {
+    "generate_receipt_pdf": ("receipt", telemetry.RECEIPTS_GENERATED),
+    "render_receipts_to_file": ("receipt", telemetry.RECEIPTS_GENERATED),
+    "render_statement_pdf": ("statement", telemetry.STATEMENTS_GENERATED),
+    "render_statement_to_file": ("statement", telemetry.STATEMENTS_GENERATED),
+}
+# Bulk renderers return the number of pages they wrote, one document each
+_BULK = {"render_receipts_to_file"}
+
+def _record(fn: Callable, started: float, result=None):
+    name = getattr(fn, "__name__", "render")
+    document, counter = _DOCUMENTS.get(name, (name, None))
+    telemetry.PDF_RENDER_SECONDS.labels(document=document).observe(time.perf_counter() - started)
+    if counter is not None:
+        counter.inc(result if name in _BULK else 1)
+
+def submit(fn: Callable[..., T], *args, **kwargs) -> "Future[T]":
+    """Schedule a picklable render function on the pool."""
+    started = time.perf_counter()
+    executor = _get_executor()
+    if executor is not None:
+        fut = executor.submit(fn, *args, **kwargs)
+    else:
+        fut = Future()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            fut.set_exception(e)
+
+    def done(f: Future):
+        if not f.cancelled() and f.exception() is None:
+            _record(fn, started, f.result())
+    fut.add_done_callback(done)
+    return fut
+
+def submit_receipt(**fields) -> "Future[bytes]":
+    return submit(receipts.generate_receipt_pdf, **fields)
+
+def render_receipt(**fields) -> bytes:
+    return submit_receipt(**fields).result()
+
+async def run_async(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await a pool job without holding a threadpool thread while it runs."""
+    if _get_executor() is None:
+        started = time.perf_counter()
+        result = await asyncio.to_thread(fn, *args, **kwargs)
+        _record(fn, started, result)
+        return result
+    return await asyncio.wrap_future(submit(fn, *args, **kwargs))
+
+async def render_receipt_async(**fields) -> bytes:
+    return await run_async(receipts.generate_receipt_pdf, **fields)
+
+def imap(fn: Callable[..., T], items: Iterable, window: Optional[int] = None) -> Iterator[Tuple[object, T]]:
+    """Render items on the pool, yielding (item, result) in input order.
+
+    At most ``window`` jobs are in flight so a large batch never holds every
+    rendered document in memory at once.
+    """
+    window = window or max(2 * PDF_RENDER_WORKERS, 1)
+    pending = deque()
+    for item in items:
+        pending.append((item, submit(fn, item)))
+        if len(pending) >= window:
+            done, fut = pending.popleft()
+            yield done, fut.result()
+    while pending:
+        done, fut = pending.popleft()
+        yield done, fut.result()
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,77 @@
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from typing import Dict, Iterable, List, Set
+from sqlalchemy import BigInteger, Date, cast, delete, event, func, insert, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models import Donation, DonationDailyRollup
+
+# UTC calendar day of a donation; SQLite's date() returns text, which Date binds as well
+donation_day = func.date(Donation.received_at, type_=Date)
+# Rounded per row so SQLite's float amounts still sum exactly
+donation_cents = cast(func.round(Donation.amount * 100), BigInteger)
+# First key of the Postgres advisory locks that serialize refreshes of one day
+ROLLUP_LOCK_SPACE = 0x526F6C6C
+
+def _lock_days(conn: Connection, days: List[date]):
+    """Hold a transaction-scoped lock per day, taken in day order so refreshes cannot deadlock.
+
+    Without it two transactions touching one day both delete nothing, then
+    insert the same bucket, and each recount misses the other's rows. SQLite
+    already serializes writers.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for day in days:
+        conn.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_SPACE, day.toordinal())))
+
+def refresh_days(conn: Connection, days: Iterable[date]):
+    """Recompute the rollup buckets for ``days`` from donations, in the caller's transaction.
+
+    Rebuilding whole days rather than applying deltas keeps the buckets right
+    whether donations were inserted, updated, moved between days or deleted.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    _lock_days(conn, days)
+    conn.execute(delete(DonationDailyRollup).where(DonationDailyRollup.day.in_(days)))
+    lo = datetime.combine(days[0], time.min)
+    hi = datetime.combine(days[-1] + timedelta(days=1), time.min)
+    buckets = (
+        select(donation_day, Donation.designation, func.count(), func.sum(donation_cents))
+        .where(Donation.received_at >= lo, Donation.received_at < hi, donation_day.in_(days))
+        .group_by(donation_day, Donation.designation)
+    )
+    conn.execute(insert(DonationDailyRollup).from_select(
+        ["day", "designation", "donation_count", "amount_cents"], buckets))
+
+def rebuild_all(conn: Connection):
+    """Recompute every bucket; used by the backfill and for repairs."""
+    conn.execute(delete(DonationDailyRollup))
+    buckets = (
+        select(donation_day, Donation.designation, func.count(), func.sum(donation_cents))
+        .group_by(donation_day, Donation.designation)
+    )
+    conn.execute(insert(DonationDailyRollup).from_select(
+        ["day", "designation", "donation_count", "amount_cents"], buckets))
+
+def days_touched(conn: Connection, records: List[Dict]) -> Set[date]:
+    """Days an upsert of donation ``records`` changes: their new days and the rows' current ones."""
+    days = {r["received_at"].date() for r in records}
+    ids = [r["donation_id"] for r in records]
+    if ids:
+        existing = conn.execute(select(Donation.received_at).where(Donation.donation_id.in_(ids)))
+        days.update(ts.date() for ts, in existing)
+    return days
+
+@event.listens_for(Session, "after_flush")
+def _refresh_flushed_days(session, flush_context):
+    # Before flush history is reset, so moved donations report their old day too
+    days = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Donation):
+            history = inspect(obj).attrs.received_at.load_history()
+            days.update(ts.date() for ts in chain(history.added, history.unchanged, history.deleted) if ts)
+    if days:
+        refresh_days(session.connection(), days)
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import event, extract, inspect, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import Donation, Donor, StatementArchiveEntry
+from services.statement_pdf import statement_cache_key
+
+logger = logging.getLogger(__name__)
+
+# disk | none
+STATEMENT_ARCHIVE_BACKEND = os.getenv("STATEMENT_ARCHIVE_BACKEND", "disk").lower()
+STATEMENT_ARCHIVE_DIR = os.getenv(
+    "STATEMENT_ARCHIVE_DIR", os.path.join(os.getenv("DATA_DIR", "/app/data"), "statements"))
+# Index rows written per transaction during a batch run
+STATEMENT_ARCHIVE_INDEX_BATCH = int(os.getenv("STATEMENT_ARCHIVE_INDEX_BATCH", 100))
+
+_HASH_CHUNK = 1024 * 1024
+
+class FileStatementStore:
+    """Content-addressed PDFs under a local directory; stands in for an object store.
+
+    Objects are named by their SHA-256 and never rewritten, so one can be
+    streamed to a client while other statements are being archived.
+    """
+    name = "disk"
+
+    def __init__(self, directory: str = STATEMENT_ARCHIVE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.pdf")
+
+    def path(self, digest: str) -> Optional[str]:
+        path = self._path(digest)
+        return path if os.path.exists(path) else None
+
+    def put(self, pdf: bytes) -> Tuple[str, int]:
+        """Store rendered bytes; returns (digest, size)."""
+        digest = hashlib.sha256(pdf).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pdf)
+                os.replace(tmp, path)
+            except Exception:
+                os.unlink(tmp)
+                raise
+        return digest, len(pdf)
+
+    def put_file(self, src: str) -> Tuple[str, int]:
+        """Move a rendered file into the store; returns (digest, size).
+
+        ``src`` is consumed on success and left in place if the move fails.
+        """
+        h = hashlib.sha256()
+        with open(src, "rb") as f:
+            while chunk := f.read(_HASH_CHUNK):
+                h.update(chunk)
+        digest, size = h.hexdigest(), os.path.getsize(src)
+        path = self._path(digest)
+        if os.path.exists(path):
+            os.unlink(src)
+            return digest, size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.move(src, tmp)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, size
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> Optional[FileStatementStore]:
+    """Process-wide archive store selected by STATEMENT_ARCHIVE_BACKEND, or None."""
+    global _store
+    with _store_lock:
+        if _store is None and STATEMENT_ARCHIVE_BACKEND == "disk":
+            try:
+                _store = FileStatementStore()
+            except OSError as e:
+                logger.error(f"Statement archive unavailable, rendering on demand: {e}")
+        return _store
+
+_ENTRY_COLUMNS = ("digest", "size", "content_key", "archived_at")
+
+def _entry(st, digest: str, size: int, version: int) -> Dict:
+    return {"donor_id": st.donor_id, "year": st.year, "version": version, "digest": digest, "size": size,
+            "content_key": statement_cache_key(st), "archived_at": datetime.utcnow()}
+
+def _dialect(dialect_name: str):
+    return postgresql if dialect_name == "postgresql" else sqlite
+
+def _upsert(dialect_name: str):
+    """Index a render, unless the statement was staled after the version it was rendered from was read.
+
+    A concurrent invalidation holds the row until it commits; the condition
+    is then checked against its bumped version.
+    """
+    stmt = _dialect(dialect_name).insert(StatementArchiveEntry)
+    return stmt.on_conflict_do_update(
+        index_elements=["donor_id", "year"],
+        set_={c: stmt.excluded[c] for c in _ENTRY_COLUMNS},
+        where=StatementArchiveEntry.version == stmt.excluded.version,
+    )
+
+def _versions_query(statements: Iterable[Tuple[str, int]]):
+    return (select(StatementArchiveEntry.donor_id, StatementArchiveEntry.year, StatementArchiveEntry.version)
+            .where(tuple_(StatementArchiveEntry.donor_id, StatementArchiveEntry.year).in_(list(statements))))
+
+class ArchiveWriter:
+    """Archives statements as a batch renders them.
+
+    PDFs go to the store immediately. Index rows are upserted on the batch's
+    own session every STATEMENT_ARCHIVE_INDEX_BATCH statements, without
+    committing; they are published by ``commit`` or by whatever commit the
+    batch makes next. ``read_versions`` must see a page of donors before
+    their donations are loaded, so a write that lands in between keeps the
+    render out of the index.
+    """
+
+    def __init__(self, db: Session, store: FileStatementStore, batch_size: int = STATEMENT_ARCHIVE_INDEX_BATCH):
+        self.db = db
+        self.store = store
+        self.batch_size = batch_size
+        self.archived = 0
+        self._pending: List[Dict] = []
+        self._versions: Dict[Tuple[str, int], int] = {}
+
+    def read_versions(self, year: int, donor_ids: Iterable[str]):
+        """Note the versions the next page of statements is rendered from."""
+        rows = self.db.execute(_versions_query((donor_id, year) for donor_id in donor_ids))
+        self._versions = {(donor_id, year): version for donor_id, year, version in rows}
+
+    def add(self, st, pdf: bytes):
+        digest, size = self.store.put(pdf)
+        version = self._versions.pop((st.donor_id, st.year), 0)
+        self._pending.append(_entry(st, digest, size, version))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self.db.execute(_upsert(self.db.get_bind().dialect.name), self._pending)
+        self.archived += len(self._pending)
+        self._pending = []
+
+    def commit(self):
+        self.flush()
+        self.db.commit()
+
+def current_paths(db: Session, store: FileStatementStore, statements: List) -> Dict[str, str]:
+    """Stored PDFs still matching the content of ``statements``, keyed by donor_id."""
+    keys = {(st.donor_id, st.year): statement_cache_key(st) for st in statements}
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(StatementArchiveEntry.donor_id, StatementArchiveEntry.year,
+               StatementArchiveEntry.digest, StatementArchiveEntry.content_key)
+        .where(tuple_(StatementArchiveEntry.donor_id, StatementArchiveEntry.year).in_(list(keys)),
+               StatementArchiveEntry.digest.is_not(None))
+    )
+    found = {}
+    for donor_id, year, digest, content_key in rows:
+        if content_key == keys[(donor_id, year)] and (path := store.path(digest)):
+            found[donor_id] = path
+    return found
+
+class ArchiveLookup(NamedTuple):
+    """An index lookup: the entry's version, and the archived PDF when there is a current one."""
+    version: int
+    digest: Optional[str] = None
+    path: Optional[str] = None
+
+async def find_archived(db: AsyncSession, donor_id: str, year: int) -> ArchiveLookup:
+    """Look up a donor's archived statement; ``path`` is None on a miss.
+
+    Read the lookup before loading the statement on a miss, and hand its
+    version to ``archive_file_async``.
+    """
+    store = get_store()
+    if store is None:
+        return ArchiveLookup(0)
+    row = (await db.execute(
+        select(StatementArchiveEntry.version, StatementArchiveEntry.digest)
+        .where(StatementArchiveEntry.donor_id == donor_id, StatementArchiveEntry.year == year)
+    )).one_or_none()
+    if row is None:
+        return ArchiveLookup(0)
+    version, digest = row
+    if digest is None:
+        return ArchiveLookup(version)
+    path = store.path(digest)
+    if path is None:
+        logger.warning(f"Archived statement {digest} for {donor_id}/{year} is missing from the store")
+    return ArchiveLookup(version, digest, path)
+
+async def archive_file_async(db: AsyncSession, st, src: str, version: int) -> Optional[Tuple[str, str]]:
+    """Move an on-demand render into the archive and index it at ``version``; (digest, path), or None when disabled.
+
+    The PDF is returned even when a later write has staled it and it is
+    left out of the index; it is still what the caller rendered.
+    """
+    store = get_store()
+    if store is None:
+        return None
+    digest, size = await asyncio.to_thread(store.put_file, src)
+    try:
+        await db.execute(_upsert(db.get_bind().dialect.name), [_entry(st, digest, size, version)])
+        await db.commit()
+    except SQLAlchemyError as e:
+        # The stored PDF is still good to serve; the next request renders again
+        await db.rollback()
+        logger.error(f"Could not index archived statement {st.receipt_id}: {e}")
+    return digest, store.path(digest)
+
+def invalidate(conn: Connection, statements: Iterable[Tuple[str, int]] = (), donor_ids: Iterable[str] = ()):
+    """Stale the index rows for (donor_id, year) pairs and for every year ``donor_ids`` gave in.
+
+    Runs in the caller's transaction so an archived statement never outlives
+    the change that made it stale. Each row is kept with its version bumped,
+    and created if missing, so a render started before the change cannot be
+    indexed after it. Blobs stay in the store; they are content-addressed
+    and harmless once unreferenced.
+    """
+    statements, donor_ids = set(statements), list(set(donor_ids))
+    if donor_ids:
+        years = conn.execute(select(Donation.donor_id, extract("year", Donation.received_at))
+                             .where(Donation.donor_id.in_(donor_ids)).distinct())
+        statements.update((donor_id, int(year)) for donor_id, year in years)
+    if not statements:
+        return
+    stmt = _dialect(conn.dialect.name).insert(StatementArchiveEntry)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["donor_id", "year"],
+        set_={"version": StatementArchiveEntry.version + 1, **{c: None for c in _ENTRY_COLUMNS}},
+    )
+    conn.execute(stmt, [{"donor_id": donor_id, "year": year, "version": 1} for donor_id, year in sorted(statements)])
+
+def statements_touched(conn: Connection, records: List[Dict]) -> Set[Tuple[str, int]]:
+    """(donor_id, year) statements an upsert of donation ``records`` changes, before and after."""
+    touched = {(r["donor_id"], r["received_at"].year) for r in records}
+    ids = [r["donation_id"] for r in records]
+    if ids:
+        existing = conn.execute(select(Donation.donor_id, Donation.received_at).where(Donation.donation_id.in_(ids)))
+        touched.update((donor_id, ts.year) for donor_id, ts in existing)
+    return touched
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_statements(session, flush_context):
+    # Before flush history is reset, so a moved donation also stales its old statement
+    statements, donor_ids = set(), set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Donation):
+            state = inspect(obj)
+            donors = {d for d in chain(*state.attrs.donor_id.load_history()) if d}
+            years = {ts.year for ts in chain(*state.attrs.received_at.load_history()) if ts}
+            statements.update((d, y) for d in donors for y in years)
+        elif isinstance(obj, Donor) and obj not in session.new:
+            donor_ids.add(obj.donor_id)
+    if statements or donor_ids:
+        invalidate(session.connection(), statements, donor_ids)
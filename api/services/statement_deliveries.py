@@ -0,0 +1,119 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import StatementDelivery
+
+RENDERED, SENT, FAILED, NO_EMAIL = "rendered", "sent", "failed", "no_email"
+# Donors a rerun leaves alone; rendered and failed ones are picked up again
+FINISHED = (SENT, NO_EMAIL)
+
+# Donor outcomes buffered before they are committed; a crash can re-send at most this many
+STATEMENT_PROGRESS_COMMIT_EVERY = int(os.getenv("STATEMENT_PROGRESS_COMMIT_EVERY", 25))
+# Throughput for the progress endpoint is measured over this trailing window
+STATEMENT_THROUGHPUT_WINDOW_SECONDS = float(os.getenv("STATEMENT_THROUGHPUT_WINDOW_SECONDS", 300))
+
+def _upsert(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    stmt = dialect.insert(StatementDelivery)
+    return stmt.on_conflict_do_update(
+        index_elements=["year", "donor_id"],
+        set_={c: stmt.excluded[c] for c in ("status", "error", "updated_at")},
+    )
+
+class DeliveryTracker:
+    """Per-donor progress of one year's statement batch, checkpointed in the database.
+
+    Outcomes are buffered and upserted in one statement every
+    STATEMENT_PROGRESS_COMMIT_EVERY donors; the caller commits them through
+    ``commit`` together with anything else it has pending.
+    """
+
+    def __init__(self, db: Session, year: int, commit_every: Optional[int] = None):
+        self.db = db
+        self.year = year
+        self.commit_every = commit_every or STATEMENT_PROGRESS_COMMIT_EVERY
+        self._pending: Dict[str, Dict] = {}
+
+    def finished(self, donor_ids: Iterable[str]) -> Set[str]:
+        """Those of ``donor_ids`` a previous run already sent or had nothing to send to."""
+        donor_ids = list(donor_ids)
+        if not donor_ids:
+            return set()
+        return set(self.db.execute(
+            select(StatementDelivery.donor_id).where(
+                StatementDelivery.year == self.year,
+                StatementDelivery.donor_id.in_(donor_ids),
+                StatementDelivery.status.in_(FINISHED),
+            )
+        ).scalars())
+
+    def mark(self, donor_id: str, status: str, error: Optional[str] = None):
+        self._pending[donor_id] = {"year": self.year, "donor_id": donor_id, "status": status,
+                                   "error": error, "updated_at": datetime.utcnow()}
+
+    @property
+    def due(self) -> bool:
+        return len(self._pending) >= self.commit_every
+
+    def commit(self):
+        if self._pending:
+            self.db.execute(_upsert(self.db.get_bind().dialect.name), list(self._pending.values()))
+            self._pending = {}
+        self.db.commit()
+
+async def reset(db: AsyncSession, year: int):
+    """Forget a year's progress so the next run sends every statement again."""
+    await db.execute(delete(StatementDelivery).where(StatementDelivery.year == year))
+    await db.commit()
+
+async def progress(db: AsyncSession, year: int, total: int,
+                   window: float = STATEMENT_THROUGHPUT_WINDOW_SECONDS) -> Dict:
+    """Counts by status, recent throughput and an ETA for a year's statement batch.
+
+    Throughput is the donors finished in the trailing ``window`` divided by
+    the time since the first of them, so it reflects the current run and
+    falls toward zero when a run stalls.
+    """
+    counts = dict((await db.execute(
+        select(StatementDelivery.status, func.count())
+        .where(StatementDelivery.year == year)
+        .group_by(StatementDelivery.status)
+    )).all())
+    now = datetime.utcnow()
+    recent, first, last = (await db.execute(
+        select(func.count(), func.min(StatementDelivery.updated_at), func.max(StatementDelivery.updated_at))
+        .where(StatementDelivery.year == year,
+               StatementDelivery.updated_at >= now - timedelta(seconds=window),
+               StatementDelivery.status != RENDERED)
+    )).one()
+    if last is None:
+        last = (await db.execute(
+            select(func.max(StatementDelivery.updated_at)).where(StatementDelivery.year == year)
+        )).scalar()
+
+    processed = sum(counts.get(s, 0) for s in (SENT, FAILED, NO_EMAIL))
+    remaining = max(total - processed, 0)
+    rate = recent / max((now - first).total_seconds(), 1.0) if recent else 0.0
+    if not remaining:
+        eta = 0
+    elif rate:
+        eta = round(remaining / rate)
+    else:
+        eta = None
+    return {
+        "year": year,
+        "total": total,
+        "sent": counts.get(SENT, 0),
+        "failed": counts.get(FAILED, 0),
+        "no_email": counts.get(NO_EMAIL, 0),
+        "rendered": counts.get(RENDERED, 0),
+        "remaining": remaining,
+        "percent": round(100 * processed / total, 1) if total else 100.0,
+        "throughput_per_min": round(rate * 60, 1),
+        "eta_seconds": eta,
+        "last_update": last.isoformat() if last else None,
+    }
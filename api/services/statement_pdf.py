@@ -0,0 +1,178 @@
+import io
+import math
+from datetime import datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from services.qr import draw_qr
+from services.receipts import BASE_VERIFY_URL, _draw_header
+from services.receipt_cache import receipt_cache_key
+
+if TYPE_CHECKING:
+    from services.statements import DonorStatement
+
+# Bump whenever the statement layout changes so old ETags stop matching
+STATEMENT_LAYOUT_VERSION = "1"
+
+# Designations listed individually in the first-page summary; the rest are combined
+MAX_SUMMARY_ROWS = 12
+
+W, H = LETTER
+LEFT, RIGHT = 0.75*inch, W - 0.75*inch
+ROW = 0.18*inch
+TITLE_Y = H - 1.25*inch
+CONTINUED_TOP = TITLE_Y - 0.35*inch
+# Gift rows stop here; below it is the page footer
+TABLE_BOTTOM = 1.5*inch
+# Table columns: date, donation id, designation; amounts are right-aligned at RIGHT
+DATE_X, ID_X, DESIGNATION_X = LEFT, LEFT + 1.0*inch, LEFT + 2.6*inch
+
+def _money(v) -> str:
+    return f"${v:,.2f}"
+
+def _day(v) -> str:
+    return v.strftime("%Y-%m-%d") if hasattr(v, "strftime") else str(v)[:10]
+
+def _clip(text: str, n: int) -> str:
+    return text if len(text) <= n else text[:n - 1] + "…"
+
+def _summary_rows(st: "DonorStatement") -> List[Tuple[str, Decimal]]:
+    rows = sorted(st.by_designation.items())
+    if len(rows) > MAX_SUMMARY_ROWS:
+        rest = rows[MAX_SUMMARY_ROWS - 1:]
+        rows = rows[:MAX_SUMMARY_ROWS - 1] + [(f"{len(rest)} other designations", sum(v for _, v in rest))]
+    return rows
+
+def _capacity(top: float) -> int:
+    """Gift rows that fit between a table header drawn at ``top`` and TABLE_BOTTOM."""
+    return max(int((top - 1.4*ROW - TABLE_BOTTOM) // ROW) + 1, 1)
+
+def _draw_summary(c, st: "DonorStatement") -> float:
+    """First-page title, donor, totals and designation breakdown; returns the table's top."""
+    y = TITLE_Y
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 14); c.drawString(LEFT, y, f"Annual Giving Statement {st.year}")
+    c.setFont("Helvetica", 10); c.drawRightString(RIGHT, y, f"Statement ID: {st.receipt_id}")
+    y -= 0.3*inch
+
+    qr_top = y
+    c.setFont("Helvetica-Bold", 11); c.drawString(LEFT, y, "Donor"); y -= 0.2*inch
+    c.setFont("Helvetica", 10); c.drawString(0.95*inch, y, st.donor_name); y -= 0.35*inch
+
+    c.setFont("Helvetica-Bold", 11); c.drawString(LEFT, y, "Summary"); y -= 0.2*inch
+    c.setFont("Helvetica", 10)
+    for k, v in [("Period", f"January 1 - December 31, {st.year}"), ("Total giving", _money(st.total)),
+                 ("Gifts", f"{len(st.gifts):,}")]:
+        c.drawString(0.95*inch, y, f"{k}:"); c.drawString(2.3*inch, y, v); y -= ROW
+    y -= 0.1*inch
+
+    c.setFont("Helvetica-Bold", 10); c.drawString(LEFT, y, "By Designation"); y -= 0.2*inch
+    c.setFont("Helvetica", 9.5)
+    for name, amount in _summary_rows(st):
+        c.drawString(0.95*inch, y, f"- {_clip(name, 48)}")
+        c.drawRightString(LEFT + 4.2*inch, y, _money(amount))
+        y -= ROW
+
+    try:
+        draw_qr(c, f"{BASE_VERIFY_URL}?rid={st.receipt_id}", W - 1.9*inch, qr_top - 1.1*inch, 1.1*inch)
+        c.setFont("Helvetica", 8.5); c.drawRightString(RIGHT, qr_top - 1.25*inch, "Verify statement")
+    except Exception:
+        pass
+    return min(y - 0.15*inch, qr_top - 1.45*inch)
+
+def _draw_continued(c, st: "DonorStatement") -> float:
+    y = TITLE_Y
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 12); c.drawString(LEFT, y, f"Annual Giving Statement {st.year} (continued)")
+    c.setFont("Helvetica", 10); c.drawRightString(RIGHT, y, f"{st.donor_name} • {st.receipt_id}")
+    return CONTINUED_TOP
+
+def _draw_gifts(c, gifts: Sequence[Dict], top: float) -> Decimal:
+    """Draw the gift table header and rows starting at ``top``; returns the rows' subtotal."""
+    c.setFont("Helvetica-Bold", 9.5)
+    for x, label in ((DATE_X, "Date"), (ID_X, "Donation ID"), (DESIGNATION_X, "Designation")):
+        c.drawString(x, top, label)
+    c.drawRightString(RIGHT, top, "Amount")
+    c.setLineWidth(0.5)
+    c.line(LEFT, top - 0.06*inch, RIGHT, top - 0.06*inch)
+
+    subtotal = Decimal("0.00")
+    y = top - 1.4*ROW
+    c.setFont("Helvetica", 9)
+    for gift in gifts:
+        c.drawString(DATE_X, y, _day(gift["received_at"]))
+        c.drawString(ID_X, y, _clip(str(gift["donation_id"]), 24))
+        c.drawString(DESIGNATION_X, y, _clip(gift["designation"], 44))
+        c.drawRightString(RIGHT, y, _money(gift["amount"]))
+        subtotal += gift["amount"]
+        y -= ROW
+    return subtotal
+
+def _draw_footer(c, st: "DonorStatement", page: int, pages: int, count: int, subtotal: Decimal,
+                 running: Decimal, generated: str):
+    c.setLineWidth(0.5)
+    c.line(LEFT, TABLE_BOTTOM - 0.12*inch, RIGHT, TABLE_BOTTOM - 0.12*inch)
+    c.setFont("Helvetica-Bold", 9.5)
+    c.drawString(LEFT, 1.2*inch, f"Page subtotal ({count:,} gift{'s' if count != 1 else ''})")
+    c.drawRightString(RIGHT, 1.2*inch, _money(subtotal))
+    c.drawString(LEFT, 1.03*inch, f"Total for {st.year}" if page == pages else "Running total")
+    c.drawRightString(RIGHT, 1.03*inch, _money(running))
+
+    if page == pages:
+        c.setFont("Helvetica-Oblique", 9.5)
+        c.drawString(LEFT, 0.85*inch, "No goods or services were provided in exchange for these contributions.")
+    c.setFont("Helvetica", 8.5)
+    c.drawString(LEFT, 0.65*inch, "Thank you for fueling creativity and shipping boxes of hope.")
+    c.drawCentredString(W / 2, 0.45*inch, f"Page {page} of {pages}")
+    c.drawRightString(RIGHT, 0.65*inch, generated)
+
+def write_statement_pdf(st: "DonorStatement", out) -> int:
+    """Render an itemized year-end statement to ``out`` (file object or path).
+
+    Every gift gets a row; rows flow onto as many pages as needed, each with
+    its own subtotal and the running total. The header form and logo are
+    embedded once and referenced from every page, and each gift is drawn
+    once, so render time grows linearly with the number of gifts. Returns
+    the page count.
+    """
+    c = canvas.Canvas(out, pagesize=LETTER)
+    c.setTitle(f"{st.year} Annual Giving Statement")
+    generated = datetime.utcnow().strftime("Generated %Y-%m-%d %H:%M UTC")
+    gifts = st.gifts
+
+    _draw_header(c, W, H)
+    top = _draw_summary(c, st)
+    first = _capacity(top)
+    pages = 1 + max(0, math.ceil((len(gifts) - first) / _capacity(CONTINUED_TOP)))
+
+    start, running = 0, Decimal("0.00")
+    for page in range(1, pages + 1):
+        if page > 1:
+            _draw_header(c, W, H)
+            top = _draw_continued(c, st)
+        rows = gifts[start:start + _capacity(top)]
+        subtotal = _draw_gifts(c, rows, top)
+        running += subtotal
+        _draw_footer(c, st, page, pages, len(rows), subtotal, running, generated)
+        start += len(rows)
+        c.showPage()
+    c.save()
+    return pages
+
+def generate_statement_pdf(st: "DonorStatement") -> bytes:
+    buf = io.BytesIO()
+    write_statement_pdf(st, buf)
+    return buf.getvalue()
+
+def statement_cache_key(st: "DonorStatement") -> str:
+    """Content hash of everything that feeds write_statement_pdf for one statement."""
+    return receipt_cache_key({
+        "document": "statement",
+        "layout": STATEMENT_LAYOUT_VERSION,
+        "receipt_id": st.receipt_id,
+        "donor_name": st.donor_name,
+        "gifts": st.gifts,
+    })
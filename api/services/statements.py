@@ -1,74 +1,314 @@
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models import Donor, Donation
-from services.receipts import generate_receipt_pdf, find_donor
-from services.emailer import send_email
-from services.receipts import _designation_breakdown as designation_breakdown
-from typing import List
+from services.receipts import find_donor, find_donor_async
+from services.statement_pdf import generate_statement_pdf, write_statement_pdf
+from services.email_transport import EmailMessage
+from services.emailer import send_emails
+from services import render_pool, statement_archive, statement_deliveries, telemetry
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip while streaming a year's donations
+STATEMENT_FETCH_SIZE = int(os.getenv("STATEMENT_FETCH_SIZE", 1000))
+# Donors loaded per page by the year-end batch
+STATEMENT_PAGE_DONORS = int(os.getenv("STATEMENT_PAGE_DONORS", 200))
+
+@dataclass
+class DonorStatement:
+    """One donor's giving for a calendar year, accumulated in a single pass."""
+    donor_id: str
+    donor_name: str
+    email: Optional[str]
+    year: int
+    total: Decimal = Decimal("0.00")
+    gifts: List[Dict] = field(default_factory=list)
+    by_designation: Dict[str, Decimal] = field(default_factory=lambda: defaultdict(Decimal))
+
+    @property
+    def receipt_id(self) -> str:
+        return f"YEAR-{self.year}-{self.donor_id}"
+
+    @property
+    def line_items(self) -> List[Dict]:
+        return [{"designation": k, "amount": v} for k, v in sorted(self.by_designation.items())]
+
+    def add(self, donation_id: str, received_at: datetime, amount, designation: Optional[str]):
+        des = designation or "General Fund"
+        amt = amount if isinstance(amount, Decimal) else Decimal(str(amount or 0))
+        self.gifts.append({"donation_id": donation_id, "received_at": received_at,
+                           "designation": des, "amount": amt})
+        self.by_designation[des] += amt
+        self.total += amt
+
+def year_bounds(year: int) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) datetime range covering a calendar year."""
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+def _year_statement_query(year: int, donor_id: Optional[str] = None):
+    start, end = year_bounds(year)
+    stmt = (
+        select(Donation.donor_id, Donor.primary_contact_name, Donor.email,
+               Donation.donation_id, Donation.received_at, Donation.amount, Donation.designation)
+        .join(Donor, Donor.donor_id == Donation.donor_id)
+        .where(Donation.received_at >= start, Donation.received_at < end)
+    )
+    if donor_id is not None:
+        stmt = stmt.where(Donation.donor_id == donor_id)
+    return stmt.order_by(Donation.donor_id, Donation.received_at)
+
+def _fold_statements(rows: Iterable, year: int) -> Iterator[DonorStatement]:
+    current = None
+    for row in rows:
+        if current is None or row.donor_id != current.donor_id:
+            if current is not None:
+                yield current
+            current = DonorStatement(donor_id=row.donor_id, donor_name=row.primary_contact_name or "Donor",
+                                     email=row.email, year=year)
+        current.add(row.donation_id, row.received_at, row.amount, row.designation)
+    if current is not None:
+        yield current
+
+def iter_year_statements(db: Session, year: int, donor_id: Optional[str] = None) -> Iterator[DonorStatement]:
+    """Stream every donor's statement for a year from one date-bounded query.
+
+    Donations are ordered by donor so each statement is complete as soon as
+    the donor id changes; only one donor's gifts are held in memory at a time.
+    """
+    stmt = _year_statement_query(year, donor_id).execution_options(yield_per=STATEMENT_FETCH_SIZE)
+    yield from _fold_statements(db.execute(stmt), year)
+
+def _year_donors_query(year: int):
+    start, end = year_bounds(year)
+    return (
+        select(distinct(Donation.donor_id))
+        .join(Donor, Donor.donor_id == Donation.donor_id)
+        .where(Donation.received_at >= start, Donation.received_at < end)
+    )
+
+def iter_statement_pages(db: Session, year: int, page_donors: int = STATEMENT_PAGE_DONORS,
+                         before_load: Optional[Callable[[List[str]], None]] = None) -> Iterator[List[DonorStatement]]:
+    """Every donor's statement for a year, ``page_donors`` donors at a time.
+
+    Pages are keyed on the last donor id of the previous one and fetched in
+    full, so no cursor is open between pages and the caller may commit
+    while iterating. ``before_load`` sees each page's donor ids before their
+    donations are read.
+    """
+    after = None
+    while True:
+        stmt = _year_donors_query(year)
+        if after is not None:
+            stmt = stmt.where(Donation.donor_id > after)
+        donor_ids = db.execute(stmt.order_by(Donation.donor_id).limit(page_donors)).scalars().all()
+        if not donor_ids:
+            return
+        if before_load is not None:
+            before_load(donor_ids)
+        rows = db.execute(_year_statement_query(year).where(Donation.donor_id.in_(donor_ids))).all()
+        yield list(_fold_statements(rows, year))
+        after = donor_ids[-1]
+
+def render_statement_pdf(st: DonorStatement) -> bytes:
+    return generate_statement_pdf(st)
+
+def render_statement_to_file(st: DonorStatement, path: str):
+    """Picklable entry point for the render pool: write a statement PDF to ``path``."""
+    write_statement_pdf(st, path)
 
 def get_donor_statement(db: Session, donor_id: str, year: int):
     donor = find_donor(db, donor_id)
     if not donor:
         return None, None
 
-    donations = db.query(Donation).filter(
-        Donation.donor_id == donor_id,
-        Donation.received_at.cast(str).like(f'{year}%')
-    ).all()
-
-    if not donations:
+    st = next(iter_year_statements(db, year, donor_id=donor_id), None)
+    if not st:
         return donor, None
+    return donor, render_statement_pdf(st)
 
-    total = sum(d.amount for d in donations)
-    rid = f"YEAR-{year}-{donor_id}"
-
-    pdf = generate_receipt_pdf(
-        receipt_id=rid,
-        donor_name=donor.primary_contact_name or "Donor",
-        donation_amount=total,
-        donation_date=f"{year}-12-31",
-        designation=f"Annual Statement {year}",
-        restricted=False,
-        payment_method="Multiple",
-        soft_credit_to=None,
-        line_items=designation_breakdown_from_donations(donations)
+async def load_donor_statement_async(db: AsyncSession, donor_id: str, year: int):
+    """(donor, statement) for one donor's year; either is None when missing."""
+    donor = await find_donor_async(db, donor_id)
+    if not donor:
+        return None, None
+
+    rows = await db.execute(_year_statement_query(year, donor_id))
+    return donor, next(_fold_statements(rows, year), None)
+
+class _PhaseTimer:
+    """Accumulates exclusive wall-clock seconds per named phase of a batch run.
+
+    Phases may nest; time spent in an inner phase is not counted again in the
+    outer one, so the per-phase numbers add up to the run time.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._stack: List[str] = []
+        self._mark = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self.totals[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.totals[self._stack.pop()] += now - self._mark
+            self._mark = now
+
+    def timed(self, name: str, items: Iterator) -> Iterator:
+        """Wrap an iterator so the time spent producing each item counts toward ``name``."""
+        while True:
+            with self.phase(name):
+                item = next(items, None)
+            if item is None:
+                return
+            yield item
+
+    def report(self) -> Dict[str, float]:
+        return {f"{k}_s": round(v, 3) for k, v in self.totals.items()}
+
+def count_year_statements(db: Session, year: int) -> int:
+    """Number of donors with at least one donation in the year."""
+    start, end = year_bounds(year)
+    return (
+        db.query(func.count(distinct(Donation.donor_id)))
+        .join(Donor, Donor.donor_id == Donation.donor_id)
+        .filter(Donation.received_at >= start, Donation.received_at < end)
+        .scalar()
     )
-    return donor, pdf
-
-def batch_generate_statements(db: Session, year: int):
-    donors = db.query(Donor).all()
-    count = 0
-    for d in donors:
-        donations = db.query(Donation).filter(
-            Donation.donor_id == d.donor_id,
-            Donation.received_at.cast(str).like(f'{year}%')
-        ).all()
-
-        if not donations:
-            continue
-
-        total = sum(don.amount for don in donations)
-        rid = f"YEAR-{year}-{d.donor_id}"
-        pdf = generate_receipt_pdf(
-            receipt_id=rid, 
-            donor_name=d.primary_contact_name or "Donor",
-            donation_amount=total, 
-            donation_date=f"{year}-12-31",
-            designation=f"Annual Statement {year}", 
-            restricted=False, 
-            payment_method="Multiple",
-            soft_credit_to=None, 
-            line_items=designation_breakdown_from_donations(donations)
-        )
-        if d.email:
-            send_email(d.email, f"Your {year} annual giving statement", "<p>Attached is your annual statement.</p>", pdf, f"{rid}.pdf")
-        count += 1
-    return {"generated": count}
-
-def designation_breakdown_from_donations(donations: List[Donation]):
-    from collections import defaultdict
-    totals = defaultdict(float)
-    for r in donations:
-        des = r.designation or "General Fund"
-        amt = float(r.amount or 0)
-        totals[des] += amt
-    return [{"designation": k, "amount": v} for k,v in sorted(totals.items())]
+
+async def count_year_statements_async(db: AsyncSession, year: int) -> int:
+    return (await db.execute(select(func.count()).select_from(_year_donors_query(year).subquery()))).scalar()
+
+# Statements between progress callbacks during a batch run
+PROGRESS_EVERY = 25
+
+# Failed recipients listed individually in a batch result
+MAX_REPORTED_FAILURES = 100
+
+def batch_generate_statements(db: Session, year: int, on_progress: Optional[Callable[..., None]] = None):
+    started = time.perf_counter()
+    try:
+        result = _batch_generate_statements(db, year, on_progress)
+    except Exception:
+        telemetry.STATEMENT_BATCHES.inc(outcome="error")
+        raise
+    finally:
+        telemetry.STATEMENT_BATCH_SECONDS.observe(time.perf_counter() - started)
+    telemetry.STATEMENT_BATCHES.inc(outcome="ok")
+    return result
+
+def _batch_generate_statements(db: Session, year: int, on_progress: Optional[Callable[..., None]]):
+    """Render, archive and email a year's statements, resuming where an earlier run stopped.
+
+    Donors a previous run already emailed (or had no address for) are
+    skipped, and statements still current in the archive are not rendered
+    again. Outcomes are checkpointed with the archive index every
+    STATEMENT_PROGRESS_COMMIT_EVERY donors, so a run that dies re-sends at
+    most that many plus the provider batch in flight.
+    """
+    timer = _PhaseTimer()
+    started = time.perf_counter()
+    count = emailed = skipped = reused = 0
+    failures: List[Dict] = []
+    tracker = statement_deliveries.DeliveryTracker(db, year)
+    total = count_year_statements(db, year) if on_progress else None
+    store = statement_archive.get_store()
+    archive = statement_archive.ArchiveWriter(db, store) if store is not None else None
+    before_load = (lambda donor_ids: archive.read_versions(year, donor_ids)) if archive is not None else None
+    # Donors whose messages are with the emailer; results come back in the same order
+    sending: Deque[str] = deque()
+
+    def checkpoint():
+        with timer.phase("checkpoint"):
+            if archive is not None:
+                archive.flush()
+            tracker.commit()
+
+    def pdfs() -> Iterator[Tuple[DonorStatement, bytes, bool]]:
+        nonlocal skipped, reused
+        for page in timer.timed("query", iter_statement_pages(db, year, STATEMENT_PAGE_DONORS, before_load)):
+            finished = tracker.finished(st.donor_id for st in page)
+            skipped += len(finished)
+            page = [st for st in page if st.donor_id not in finished]
+            kept = statement_archive.current_paths(db, store, page) if store is not None else {}
+            for st in page:
+                if st.donor_id in kept:
+                    with timer.phase("archive"):
+                        with open(kept[st.donor_id], "rb") as f:
+                            pdf = f.read()
+                    reused += 1
+                    yield st, pdf, False
+            fresh = [st for st in page if st.donor_id not in kept]
+            for st, pdf in timer.timed("render", render_pool.imap(render_statement_pdf, fresh)):
+                yield st, pdf, True
+
+    def messages() -> Iterator[EmailMessage]:
+        nonlocal count
+        for st, pdf, rendered in pdfs():
+            count += 1
+            if rendered and archive is not None:
+                with timer.phase("archive"):
+                    archive.add(st, pdf)
+            if st.email:
+                tracker.mark(st.donor_id, statement_deliveries.RENDERED)
+                sending.append(st.donor_id)
+            else:
+                tracker.mark(st.donor_id, statement_deliveries.NO_EMAIL)
+            if tracker.due:
+                checkpoint()
+            if on_progress and count % PROGRESS_EVERY == 0:
+                on_progress(skipped + count, total, emailed=emailed)
+            if st.email:
+                yield EmailMessage(st.email, f"Your {year} annual giving statement",
+                                   "<p>Attached is your annual statement.</p>", pdf, f"{st.receipt_id}.pdf")
+
+    try:
+        for result in timer.timed("email", send_emails(messages())):
+            donor_id = sending.popleft()
+            if result.ok:
+                emailed += 1
+                tracker.mark(donor_id, statement_deliveries.SENT)
+            else:
+                failures.append({"email": result.message.to, "error": result.error})
+                tracker.mark(donor_id, statement_deliveries.FAILED, result.error)
+            if tracker.due:
+                checkpoint()
+    except Exception:
+        # Keep what was already sent so the retry does not send it again
+        try:
+            checkpoint()
+        except Exception as e:
+            logger.error(f"Could not checkpoint {year} statement progress: {e}")
+        raise
+    checkpoint()
+    if on_progress:
+        on_progress(skipped + count, total, emailed=emailed)
+    timings = timer.report()
+    timings["total_s"] = round(time.perf_counter() - started, 3)
+    return {
+        "generated": count,
+        "emailed": emailed,
+        "failed": len(failures),
+        "skipped": skipped,
+        "reused": reused,
+        "failures": failures[:MAX_REPORTED_FAILURES],
+        "archived": archive.archived if archive is not None else 0,
+        "timings": timings,
+    }
@@ -0,0 +1,27 @@
+"""Job handlers for work that is too slow to run inside an HTTP request."""
+from database import SessionLocal
+from services import jobs
+from services.receipt_delivery import deliver_receipt, DonationNotFound, NoDonorEmail
+from services.statements import batch_generate_statements
+
+@jobs.handler("receipt_email")
+def receipt_email(payload: dict, ctx: jobs.JobContext):
+    db = SessionLocal()
+    try:
+        result = deliver_receipt(db, payload["donation_id"])
+    except (DonationNotFound, NoDonorEmail) as e:
+        raise jobs.PermanentJobError(f"{type(e).__name__}: {e}")
+    finally:
+        db.close()
+    if not result["sent"]:
+        raise RuntimeError(f"Email provider did not accept receipt for {payload['donation_id']}")
+    return result
+
+# Two batches for one year would both email donors neither has checkpointed yet
+@jobs.handler("year_end_statements", run_lock=lambda payload: f"year_end_statements:{payload['year']}")
+def year_end_statements(payload: dict, ctx: jobs.JobContext):
+    db = SessionLocal()
+    try:
+        return batch_generate_statements(db, payload["year"], on_progress=ctx.progress)
+    finally:
+        db.close()
@@ -0,0 +1,170 @@
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Also keep fleet-wide counter totals in one Redis hash shared by every instance
+TELEMETRY_REDIS_ENABLED = os.getenv("TELEMETRY_REDIS_ENABLED", "false").lower() == "true"
+TELEMETRY_REDIS_KEY = os.getenv("TELEMETRY_REDIS_KEY", "telemetry:counters")
+# Counter deltas are buffered in-process and pushed to Redis this often
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", 10))
+
+class FleetCounters:
+    """Counter deltas buffered per process and added to a Redis hash in batches.
+
+    One pipelined HINCRBYFLOAT per changed series every TELEMETRY_FLUSH_SECONDS
+    keeps Redis off the request path. Each process restarts its flusher after
+    a fork so no delta is pushed twice.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None, key: str = TELEMETRY_REDIS_KEY,
+                 interval: float = TELEMETRY_FLUSH_SECONDS):
+        self.client = client
+        self.key = key
+        self.interval = interval
+        self._pending: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def add(self, field: str, amount: float):
+        if self.client is None:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            self._pending[field] += amount
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending = defaultdict(float)
+        threading.Thread(target=self._run, name="telemetry-flush", daemon=True).start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+        if not pending or self.client is None:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for field, amount in pending.items():
+                pipe.hincrbyfloat(self.key, field, amount)
+            pipe.execute()
+        except (redis.exceptions.RedisError, OSError) as e:
+            logger.error(f"Could not push telemetry to Redis, keeping it for the next flush: {e}")
+            with self._lock:
+                for field, amount in pending.items():
+                    self._pending[field] += amount
+
+    def totals(self) -> Optional[Dict[str, float]]:
+        if self.client is None:
+            return None
+        try:
+            return {k: float(v) for k, v in self.client.hgetall(self.key).items()}
+        except (redis.exceptions.RedisError, OSError) as e:
+            logger.error(f"Could not read fleet telemetry from Redis: {e}")
+            return None
+
+_fleet: Optional[FleetCounters] = None
+_fleet_lock = threading.Lock()
+
+def get_fleet() -> FleetCounters:
+    global _fleet
+    with _fleet_lock:
+        if _fleet is None:
+            client = None
+            if TELEMETRY_REDIS_ENABLED:
+                from redis_conn import connect_redis
+                client = connect_redis()
+            _fleet = FleetCounters(client)
+            atexit.register(_fleet.flush)
+        return _fleet
+
+def _field(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+class AppCounter:
+    """Prometheus counter that also feeds the Redis fleet view."""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.metric = Counter(name, documentation, labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        (self.metric.labels(**labels) if labels else self.metric).inc(amount)
+        get_fleet().add(_field(self.name, labels), amount)
+
+RECEIPTS_GENERATED = AppCounter("receipts_generated", "Receipt PDFs rendered")
+EMAILS_SENT = AppCounter("emails_sent", "Emails handed to the provider, by outcome", ["provider", "outcome"])
+STATEMENTS_GENERATED = AppCounter("statements_generated", "Year-end statement PDFs rendered")
+STATEMENT_BATCHES = AppCounter("statement_batches", "Year-end statement batch runs", ["outcome"])
+RECONCILIATION_RUNS = AppCounter("reconciliation_runs", "Reconciliation runs", ["mode", "outcome"])
+
+PDF_RENDER_SECONDS = Histogram(
+    "pdf_render_seconds", "Time from submitting a PDF render to its result, including pool queueing",
+    ["document"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+STATEMENT_BATCH_SECONDS = Histogram(
+    "statement_batch_seconds", "Duration of a year-end statement batch",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+RECONCILIATION_SECONDS = Histogram(
+    "reconciliation_seconds", "Duration of a reconciliation run", ["mode"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+def registry():
+    """Registry to expose: every worker's samples in multiprocess mode, else this process's."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        reg = CollectorRegistry()
+        multiprocess.MultiProcessCollector(reg)
+        return reg
+    return REGISTRY
+
+def exposition() -> bytes:
+    return generate_latest(registry())
+
+def _local_totals() -> Dict[str, float]:
+    totals: Dict[str, float] = defaultdict(float)
+    for family in registry().collect():
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                totals[_field(sample.name[:-len("_total")], sample.labels)] += sample.value
+    return totals
+
+def summary() -> Dict:
+    """Headline counters: fleet-wide from Redis when enabled and reachable, else this instance."""
+    totals = get_fleet().totals()
+    scope = "fleet"
+    if totals is None:
+        totals, scope = _local_totals(), "instance"
+
+    def total(name: str, **match) -> int:
+        wanted = [f"{k}={v}" for k, v in match.items()]
+        return int(sum(v for field, v in totals.items()
+                       if (field == name or field.startswith(name + "{")) and all(w in field for w in wanted)))
+
+    return {
+        "receipts_generated": total("receipts_generated"),
+        "emails_sent": total("emails_sent", outcome="ok"),
+        "statements_generated": total("statements_generated"),
+        "reconciliation_runs": total("reconciliation_runs"),
+        "scope": scope,
+    }
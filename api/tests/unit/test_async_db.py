@@ -0,0 +1,67 @@
+"""Unit tests for the async database layer (aiosqlite)."""
+import pytest
+from datetime import datetime
+from models import Donor, Donation, DataRoomDocument
+# Bound at import so the autouse lookup mocks do not replace them
+from services.receipts import find_donation_async, find_donor_async
+from services import metrics, statements
+
+
+@pytest.fixture
+async def seeded_async_db(async_db_session):
+    async_db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 2, 1),
+                 amount=100.0, designation="Shipping Fund"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", received_at=datetime(2025, 5, 1),
+                 amount=40.0, designation="General Fund"),
+        Donation(donation_id="g3", donor_id="d_1", receipt_id="R3", received_at=datetime(2024, 5, 1),
+                 amount=10.0, designation="General Fund"),
+        DataRoomDocument(id="doc1", folder="Finance", file_name="990.pdf", file_path="/dr/990.pdf", created_at=datetime(2025, 1, 1)),
+        DataRoomDocument(id="doc2", folder="Finance", file_name="Audit.pdf", file_path="/dr/Audit.pdf", created_at=datetime(2025, 1, 1)),
+        DataRoomDocument(id="doc3", folder="Board", file_name="Minutes.pdf", file_path="/dr/Minutes.pdf", created_at=datetime(2025, 1, 1)),
+    ])
+    await async_db_session.commit()
+    return async_db_session
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("url, expected", [
+    ("postgresql://u:p@db:5432/spark", "postgresql+asyncpg://u:p@db:5432/spark"),
+    ("postgresql+psycopg2://u:p@db/spark", "postgresql+asyncpg://u:p@db/spark"),
+    ("sqlite:///./test.db", "sqlite+aiosqlite:///./test.db"),
+    ("postgresql+asyncpg://u:p@db/spark", "postgresql+asyncpg://u:p@db/spark"),
+])
+def test_async_database_url(url, expected):
+    from database import async_database_url
+    assert async_database_url(url) == expected
+
+
+@pytest.mark.unit
+async def test_async_lookups(seeded_async_db):
+    dn = await find_donation_async(seeded_async_db, "g1")
+    assert dn.donor_id == "d_1"
+    assert await find_donation_async(seeded_async_db, "missing") is None
+    assert (await find_donor_async(seeded_async_db, "d_1")).email == "alex@example.com"
+
+
+@pytest.mark.unit
+async def test_async_metrics_queries(seeded_async_db):
+    assert await metrics.shipped_count(seeded_async_db) == 3
+    funds = {f["name"]: f["value"] for f in await metrics.funds_by_designation(seeded_async_db)}
+    assert funds == {"General Fund": 50.0, "Shipping Fund": 100.0}
+    assert await metrics.data_room_index(seeded_async_db) == [
+        {"folder": "Board", "items": ["Minutes.pdf"]},
+        {"folder": "Finance", "items": ["990.pdf", "Audit.pdf"]},
+    ]
+
+
+@pytest.mark.unit
+async def test_async_donor_statement(seeded_async_db):
+    donor, st = await statements.load_donor_statement_async(seeded_async_db, "d_1", 2025)
+    missing, _ = await statements.load_donor_statement_async(seeded_async_db, "nobody", 2025)
+    _, none_that_year = await statements.load_donor_statement_async(seeded_async_db, "d_1", 2023)
+
+    assert donor.donor_id == "d_1" and st.total == 140.0
+    assert missing is None
+    assert none_that_year is None
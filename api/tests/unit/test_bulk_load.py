@@ -0,0 +1,127 @@
+"""Unit tests for the batched, resumable CSV loader."""
+import csv
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from models import Donor, Donation
+
+DONATION_FIELDS = ["donation_id", "donor_id", "amount", "method", "designation", "restricted",
+                   "received_at", "square_payment_id", "receipt_id"]
+
+
+def _write_csv(path, fields, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _donation(i, **kw):
+    row = {"donation_id": f"g{i}", "donor_id": "d_1", "amount": "10.00", "method": "card",
+           "designation": "General Fund", "restricted": "no", "received_at": f"2025-01-{i:02d}T12:00:00Z",
+           "square_payment_id": f"sq_{i}", "receipt_id": f"R{i}"}
+    row.update(kw)
+    return row
+
+
+@pytest.fixture
+def loaded_donor(db_session, tmp_path):
+    from services.bulk_load import DONORS, load_csv
+    path = tmp_path / "donors.csv"
+    _write_csv(path, ["donor_id", "primary_contact_name", "email"],
+               [{"donor_id": "d_1", "primary_contact_name": "Alex Rivera", "email": "alex@example.com"}])
+    load_csv(db_session.get_bind(), DONORS, str(path))
+    return db_session
+
+
+@pytest.mark.unit
+def test_convert_batch_rejects_bad_rows_with_line_numbers():
+    from services.bulk_load import DONATIONS, convert_batch
+
+    rows = [_donation(1), _donation(2, amount="ten"), _donation(3, received_at=""), _donation(4, restricted="yes")]
+    records, errors = convert_batch(DONATIONS, rows, first_line=2)
+
+    assert [r["donation_id"] for r in records] == ["g1", "g4"]
+    assert records[0]["amount"] == Decimal("10.00")
+    assert records[0]["received_at"] == datetime(2025, 1, 1, 12, 0)
+    assert records[1]["restricted"] is True
+    assert [e["line"] for e in errors] == [3, 4]
+    assert errors[0]["error"].startswith("amount")
+
+
+@pytest.mark.unit
+def test_load_is_idempotent_and_updates_changed_rows(loaded_donor, tmp_path):
+    from services.bulk_load import DONATIONS, load_csv
+    path = tmp_path / "donations.csv"
+    engine = loaded_donor.get_bind()
+
+    _write_csv(path, DONATION_FIELDS, [_donation(i) for i in range(1, 6)])
+    first = load_csv(engine, DONATIONS, str(path), batch_size=2)
+    _write_csv(path, DONATION_FIELDS, [_donation(i, amount="12.50" if i == 3 else "10.00") for i in range(1, 6)])
+    second = load_csv(engine, DONATIONS, str(path), batch_size=2, resume=False)
+
+    assert first.loaded == second.loaded == 5
+    assert first.rows_per_sec > 0
+    assert loaded_donor.query(Donation).count() == 5
+    assert loaded_donor.get(Donation, "g3").amount == Decimal("12.50")
+    assert not (tmp_path / "donations.csv.checkpoint.json").exists()
+
+
+@pytest.mark.unit
+def test_duplicate_keys_in_one_batch_keep_the_last_row(loaded_donor, tmp_path):
+    from services import bulk_load
+    path = tmp_path / "donations.csv"
+    _write_csv(path, DONATION_FIELDS, [_donation(1), _donation(2), _donation(1, amount="7.00"), _donation(3)])
+
+    with patch.object(bulk_load, "_insert_upsert", wraps=bulk_load._insert_upsert) as upsert:
+        bulk_load.load_csv(loaded_donor.get_bind(), bulk_load.DONATIONS, str(path), batch_size=4)
+
+    # Each key reaches the upsert statement once, as Postgres requires
+    assert [r["donation_id"] for r in upsert.call_args.args[2]] == ["g1", "g2", "g3"]
+    assert loaded_donor.query(Donation).count() == 3
+    assert loaded_donor.get(Donation, "g1").amount == Decimal("7.00")
+
+
+@pytest.mark.unit
+def test_interrupted_load_resumes_after_last_committed_batch(loaded_donor, tmp_path):
+    from services import bulk_load
+    path = tmp_path / "donations.csv"
+    engine = loaded_donor.get_bind()
+    _write_csv(path, DONATION_FIELDS, [_donation(i) for i in range(1, 8)])
+
+    real_upsert, calls = bulk_load.upsert_batch, []
+
+    def failing_upsert(conn, spec, records):
+        calls.append([r["donation_id"] for r in records])
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        real_upsert(conn, spec, records)
+
+    with patch.object(bulk_load, "upsert_batch", failing_upsert):
+        with pytest.raises(RuntimeError):
+            bulk_load.load_csv(engine, bulk_load.DONATIONS, str(path), batch_size=2)
+    checkpoint = json.loads((tmp_path / "donations.csv.checkpoint.json").read_text())
+    assert checkpoint["rows_done"] == 4
+    assert loaded_donor.query(Donation).count() == 4
+
+    stats = bulk_load.load_csv(engine, bulk_load.DONATIONS, str(path), batch_size=2)
+    assert stats.resumed_from == 4
+    assert stats.loaded == 3
+    assert loaded_donor.query(Donation).count() == 7
+
+
+@pytest.mark.unit
+def test_checkpoint_ignored_when_file_changes(loaded_donor, tmp_path):
+    from services.bulk_load import DONATIONS, load_csv
+    path = tmp_path / "donations.csv"
+    _write_csv(path, DONATION_FIELDS, [_donation(i) for i in range(1, 4)])
+    (tmp_path / "donations.csv.checkpoint.json").write_text(
+        json.dumps({"file": {"size": 1, "mtime": 0}, "rows_done": 2}))
+
+    stats = load_csv(loaded_donor.get_bind(), DONATIONS, str(path))
+
+    assert stats.resumed_from == 0
+    assert stats.loaded == 3
+    assert loaded_donor.query(Donor).count() == 1
@@ -0,0 +1,104 @@
+"""Unit tests for multi-page bulk receipt rendering."""
+import io
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+from PIL import Image
+from prometheus_client import REGISTRY
+from models import Donor, Donation
+
+
+@pytest.fixture
+def donations(db_session):
+    db_session.add(Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"))
+    db_session.add_all([
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 8, 1),
+                 amount=125.0, designation="Shipping Fund", designation_breakdown="Shipping Fund:125"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="", received_at=datetime(2025, 8, 2, 18),
+                 amount=75.0, designation="General Fund", method="card"),
+        Donation(donation_id="g3", donor_id="d_missing", receipt_id="R3", received_at=datetime(2025, 8, 3),
+                 amount=10.0, designation="General Fund"),
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.mark.unit
+def test_iter_receipt_fields_by_ids(donations):
+    from services.receipts import iter_receipt_fields
+
+    fields = list(iter_receipt_fields(donations, donation_ids=["g2", "g3"]))
+
+    assert [f["receipt_id"] for f in fields] == ["RCPT-g2", "R3"]
+    assert fields[0]["donor_name"] == "Alex Rivera"
+    assert fields[0]["payment_method"] == "Card"
+    assert fields[1]["donor_name"] == "Donor"
+
+
+@pytest.mark.unit
+def test_iter_receipt_fields_inclusive_date_range(donations):
+    from services.receipts import iter_receipt_fields
+
+    fields = list(iter_receipt_fields(donations, start=date(2025, 8, 1), end=date(2025, 8, 2)))
+
+    assert [f["receipt_id"] for f in fields] == ["R1", "RCPT-g2"]
+    assert fields[0]["line_items"] == [{"designation": "Shipping Fund", "amount": 125.0}]
+
+
+@pytest.mark.unit
+def test_bulk_pdf_shares_header_and_logo(donations, tmp_path):
+    from services import receipts
+    from services.render_assets import AssetRegistry
+
+    logo = tmp_path / "logo.png"
+    Image.new("RGB", (16, 16), (241, 151, 56)).save(logo)
+    out = io.BytesIO()
+    with patch.object(receipts, "assets", AssetRegistry(str(logo))):
+        pages = receipts.generate_receipts_pdf(receipts.iter_receipt_fields(donations), out)
+
+    pdf = out.getvalue()
+    assert pages == 3
+    assert pdf.count(b"/Type /Page\n") == 3
+    assert pdf.count(b"/Subtype /Form") == 1
+    assert pdf.count(b"/Subtype /Image") == 1
+
+
+@pytest.mark.unit
+def test_iter_receipt_fields_stops_at_limit(donations):
+    from services.receipts import iter_receipt_fields
+
+    fields = list(iter_receipt_fields(donations, start=date(2025, 8, 1), end=date(2025, 8, 3), limit=2))
+    assert len(fields) == 2
+    assert fields[0]["receipt_id"] == "R1"
+
+
+@pytest.mark.unit
+def test_render_receipts_to_file(tmp_path):
+    from services.receipts import render_receipts_to_file
+
+    path = tmp_path / "out.pdf"
+    fields = dict(receipt_id="R1", donor_name="A", donation_amount=1.0, donation_date="2025-01-01",
+                  designation="General Fund", restricted=False, payment_method="Square")
+
+    assert render_receipts_to_file([fields, fields], str(path)) == 2
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+@pytest.mark.unit
+def test_bulk_endpoint_counts_every_receipt(app, client, donations):
+    from auth import optional_auth
+    from database import get_db
+
+    before = REGISTRY.get_sample_value("receipts_generated_total") or 0.0
+    timed = REGISTRY.get_sample_value("pdf_render_seconds_count", {"document": "receipt"}) or 0.0
+    app.dependency_overrides[get_db] = lambda: donations
+    app.dependency_overrides[optional_auth] = lambda: {"user_id": "u_1"}
+    try:
+        response = client.post("/api/v1/donations/receipts.pdf", json={"start": "2025-08-01", "end": "2025-08-03"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.content.count(b"/Type /Page\n") == 3
+    assert REGISTRY.get_sample_value("receipts_generated_total") == before + 3
+    assert REGISTRY.get_sample_value("pdf_render_seconds_count", {"document": "receipt"}) == timed + 1
@@ -0,0 +1,106 @@
+"""Unit tests for the cached data-room index and its ETag/pagination handling."""
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi import HTTPException
+from models import DataRoomDocument
+from services import data_room
+
+
+def _doc(i, folder, name, day=1):
+    return DataRoomDocument(id=f"doc{i}", folder=folder, file_name=name, file_path=f"/dr/{name}",
+                            created_at=datetime(2025, 1, day))
+
+
+@pytest.fixture
+async def room_db(async_db_session):
+    data_room.index_cache._index = None
+    async_db_session.add_all([
+        _doc(1, "Finance", "990.pdf"), _doc(2, "Finance", "Audit.pdf"), _doc(3, "Finance", "Budget.xlsx"),
+        _doc(4, "Board", "Minutes.pdf"),
+    ])
+    await async_db_session.commit()
+    yield async_db_session
+    data_room.index_cache._index = None
+
+
+async def _get(db, folder=None, offset=0, limit=None, if_none_match=None):
+    from routes.metrics import get_data_room_index
+    return await get_data_room_index(folder, offset, limit, if_none_match=if_none_match, db=db)
+
+
+@pytest.mark.unit
+async def test_index_is_rebuilt_only_when_the_room_changes(room_db):
+    with patch.object(data_room, "load_folders", wraps=data_room.load_folders) as load:
+        first = await _get(room_db)
+        again = await _get(room_db)
+        assert load.call_count == 1
+        assert again.body == first.body
+        assert json.loads(first.body) == [
+            {"folder": "Board", "items": ["Minutes.pdf"]},
+            {"folder": "Finance", "items": ["990.pdf", "Audit.pdf", "Budget.xlsx"]},
+        ]
+
+        room_db.add(_doc(5, "Board", "Bylaws.pdf", day=2))
+        await room_db.commit()
+        added = await _get(room_db)
+        assert load.call_count == 2
+        assert added.headers["etag"] != first.headers["etag"]
+
+        # A rename changes neither the count nor the newest timestamp
+        (await room_db.get(DataRoomDocument, "doc4")).file_name = "Minutes-2025.pdf"
+        await room_db.commit()
+        renamed = await _get(room_db)
+        assert load.call_count == 3
+        assert "Minutes-2025.pdf" in json.loads(renamed.body)[0]["items"]
+
+
+@pytest.mark.unit
+async def test_writes_reach_other_workers_caches(room_db):
+    # Another worker process keeps its own cache; only the shared version tells it about a write
+    other = data_room.DataRoomIndexCache()
+    before = await other.get(room_db)
+
+    (await room_db.get(DataRoomDocument, "doc1")).folder = "Archive"
+    await room_db.commit()
+    after = await other.get(room_db)
+
+    assert after is not before
+    assert after.folders["Archive"] == ["990.pdf"]
+
+    # A rolled-back write leaves the version alone
+    (await room_db.get(DataRoomDocument, "doc2")).file_name = "Audit-draft.pdf"
+    await room_db.flush()
+    await room_db.rollback()
+    assert await other.get(room_db) is after
+
+
+@pytest.mark.unit
+async def test_matching_etag_returns_304(room_db):
+    first = await _get(room_db)
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = await _get(room_db, if_none_match=first.headers["etag"])
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == first.headers["etag"]
+
+    page = await _get(room_db, folder="Finance", limit=2)
+    assert page.headers["etag"] != first.headers["etag"]
+    assert (await _get(room_db, folder="Finance", limit=2, if_none_match=page.headers["etag"])).status_code == 304
+
+
+@pytest.mark.unit
+async def test_folders_are_paginated(room_db):
+    first = json.loads((await _get(room_db, folder="Finance", limit=2)).body)
+    assert first == {"folder": "Finance", "items": ["990.pdf", "Audit.pdf"], "total": 3, "offset": 0, "next_offset": 2}
+    rest = json.loads((await _get(room_db, folder="Finance", offset=2, limit=2)).body)
+    assert (rest["items"], rest["next_offset"]) == (["Budget.xlsx"], None)
+
+    capped = json.loads((await _get(room_db, limit=1)).body)
+    assert [(f["folder"], f["items"], f["total"]) for f in capped] == [
+        ("Board", ["Minutes.pdf"], 1), ("Finance", ["990.pdf"], 3)]
+
+    with pytest.raises(HTTPException) as exc:
+        await _get(room_db, folder="Legal")
+    assert exc.value.status_code == 404
@@ -0,0 +1,220 @@
+"""Unit tests for the pooled email transport against a local stand-in server."""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from prometheus_client import REGISTRY
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append({"path": self.path, "headers": dict(self.headers),
+                                     "body": body, "peer": self.client_address})
+        if self.path == "/email/batch":
+            if self.server.fail_batches:
+                self.server.fail_batches -= 1
+                status, reply = 503, b'{"Message": "unavailable"}'
+            else:
+                status = 200
+                reply = json.dumps([
+                    {"ErrorCode": 406, "Message": "Inactive recipient"} if "bad" in m["To"] else {"ErrorCode": 0}
+                    for m in body
+                ]).encode()
+        else:
+            failed = "fail" in json.dumps(body)
+            status = 500 if failed else (202 if self.path == "/v3/mail/send" else 200)
+            reply = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def provider():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    server.requests = []
+    server.fail_batches = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _count(provider_name, outcome):
+    return REGISTRY.get_sample_value("email_send_seconds_count",
+                                     {"provider": provider_name, "outcome": outcome}) or 0.0
+
+
+@pytest.mark.unit
+def test_sendgrid_reuses_pooled_connection(provider):
+    from services.email_transport import EmailTransport, SendGridBackend, EmailMessage
+
+    transport = EmailTransport(SendGridBackend("key", _url(provider)))
+    before = _count("sendgrid", "ok")
+    for i in range(3):
+        assert transport.send(EmailMessage(f"d{i}@example.com", "Hi", "<p>x</p>", b"%PDF", "r.pdf"))
+    transport.close()
+
+    assert len(provider.requests) == 3
+    assert len({r["peer"] for r in provider.requests}) == 1  # one keep-alive connection
+    first = provider.requests[0]
+    assert first["path"] == "/v3/mail/send"
+    assert first["headers"]["Authorization"] == "Bearer key"
+    assert first["body"]["personalizations"] == [{"to": [{"email": "d0@example.com"}]}]
+    assert first["body"]["attachments"][0]["filename"] == "r.pdf"
+    assert _count("sendgrid", "ok") == before + 3
+
+
+@pytest.mark.unit
+def test_postmark_failure_returns_false(provider):
+    from services.email_transport import EmailTransport, PostmarkBackend, EmailMessage
+
+    transport = EmailTransport(PostmarkBackend("token", _url(provider)))
+    before = _count("postmark", "error")
+
+    assert transport.send(EmailMessage("ok@example.com", "Hi", "<p>x</p>"))
+    assert not transport.send(EmailMessage("fail@example.com", "Hi", "<p>x</p>"))
+
+    assert provider.requests[0]["path"] == "/email"
+    assert provider.requests[0]["headers"]["X-Postmark-Server-Token"] == "token"
+    assert _count("postmark", "error") == before + 1
+
+
+@pytest.mark.unit
+def test_unreachable_provider_returns_false():
+    from services.email_transport import EmailTransport, SendGridBackend, EmailMessage
+
+    transport = EmailTransport(SendGridBackend("key", "http://127.0.0.1:9"))
+    assert not transport.send(EmailMessage("a@example.com", "Hi", "<p>x</p>"))
+
+
+@pytest.mark.unit
+async def test_async_transport_bounds_concurrency(provider):
+    import asyncio
+    from services.email_transport import AsyncEmailTransport, SendGridBackend, EmailMessage
+
+    transport = AsyncEmailTransport(SendGridBackend("key", _url(provider)), pool_size=2, max_concurrency=2)
+    try:
+        results = await asyncio.gather(*[
+            transport.send(EmailMessage(f"d{i}@example.com", "Hi", "<p>x</p>")) for i in range(6)
+        ])
+    finally:
+        await transport.aclose()
+
+    assert results == [True] * 6
+    assert len(provider.requests) == 6
+    assert len({r["peer"] for r in provider.requests}) <= 2
+
+
+@pytest.mark.unit
+def test_local_file_backend_writes_outbox(tmp_path):
+    from services.email_transport import EmailTransport, LocalFileBackend, EmailMessage
+
+    transport = EmailTransport(LocalFileBackend(str(tmp_path)))
+    assert transport.send(EmailMessage("a@example.com", "Receipt", "<p>x</p>", b"%PDF", "r.pdf"))
+
+    meta_files = [f for f in os.listdir(tmp_path) if f.endswith(".json")]
+    assert len(meta_files) == 1
+    meta = json.loads((tmp_path / meta_files[0]).read_text())
+    assert meta["to"] == "a@example.com"
+    assert (tmp_path / meta["attachment"]).read_bytes() == b"%PDF"
+
+
+@pytest.mark.unit
+def test_backend_from_env_requires_credentials():
+    from unittest.mock import patch
+    from services.email_transport import backend_from_env, SendGridBackend, PostmarkBackend
+
+    with patch.dict(os.environ, {"EMAIL_PROVIDER": "sendgrid"}, clear=False):
+        os.environ.pop("SENDGRID_API_KEY", None)
+        assert backend_from_env() is None
+    with patch.dict(os.environ, {"EMAIL_PROVIDER": "sendgrid", "SENDGRID_API_KEY": "k"}):
+        assert isinstance(backend_from_env(), SendGridBackend)
+    with patch.dict(os.environ, {"EMAIL_PROVIDER": "postmark", "POSTMARK_TOKEN": "t"}):
+        assert isinstance(backend_from_env(), PostmarkBackend)
+
+
+@pytest.mark.unit
+def test_postmark_batch_reports_each_recipient(provider):
+    from services.email_transport import EmailTransport, PostmarkBackend, EmailMessage
+
+    transport = EmailTransport(PostmarkBackend("token", _url(provider)))
+    msgs = [EmailMessage(f"{'bad' if i == 3 else 'd'}{i}@example.com", "Hi", "<p>x</p>", b"%PDF", f"{i}.pdf")
+            for i in range(1203)]
+    results = transport.send_batch(msgs, retries=0)
+
+    assert [r["path"] for r in provider.requests] == ["/email/batch"] * 3  # 500 + 500 + 203
+    assert [len(r["body"]) for r in provider.requests] == [500, 500, 203]
+    assert [res.message for res in results] == msgs
+    assert [i for i, res in enumerate(results) if not res.ok] == [3]
+    assert results[3].error == "406: Inactive recipient"
+    assert not results[3].retryable
+
+
+@pytest.mark.unit
+def test_batch_retries_only_transient_failures(provider):
+    from unittest.mock import patch
+    from services import email_transport
+    from services.email_transport import EmailTransport, PostmarkBackend, EmailMessage
+
+    provider.fail_batches = 1
+    transport = EmailTransport(PostmarkBackend("token", _url(provider)))
+    msgs = [EmailMessage(f"d{i}@example.com", "Hi", "<p>x</p>") for i in range(3)]
+    with patch.object(email_transport, "EMAIL_BATCH_RETRY_DELAY", 0):
+        results = transport.send_batch(msgs, retries=2)
+
+    assert all(res.ok for res in results)
+    assert len(provider.requests) == 2
+    assert provider.requests[1]["body"] == provider.requests[0]["body"]
+
+
+@pytest.mark.unit
+def test_sendgrid_batch_groups_identical_messages(provider):
+    from services.email_transport import EmailTransport, SendGridBackend, EmailMessage
+
+    transport = EmailTransport(SendGridBackend("key", _url(provider)))
+    msgs = [EmailMessage(f"d{i}@example.com", "Newsletter", "<p>x</p>") for i in range(4)]
+    msgs.append(EmailMessage("solo@example.com", "Statement", "<p>y</p>", b"%PDF", "s.pdf"))
+    results = transport.send_batch(msgs)
+
+    assert all(res.ok for res in results)
+    assert len(provider.requests) == 2
+    assert len(provider.requests[0]["body"]["personalizations"]) == 4
+    assert provider.requests[1]["body"]["personalizations"] == [{"to": [{"email": "solo@example.com"}]}]
+
+
+@pytest.mark.unit
+def test_send_emails_flushes_per_provider_batch(provider):
+    from unittest.mock import patch
+    from services import emailer
+    from services.email_transport import EmailTransport, PostmarkBackend, EmailMessage
+
+    transport = EmailTransport(PostmarkBackend("token", _url(provider)))
+    pulled = []
+
+    def messages():
+        for i in range(700):
+            pulled.append(i)
+            yield EmailMessage(f"d{i}@example.com", "Hi", "<p>x</p>")
+
+    with patch.object(emailer, "get_transport", return_value=transport):
+        results = emailer.send_emails(messages())
+        first = next(results)
+        assert len(pulled) == 500  # only the first batch has been consumed
+        rest = list(results)
+
+    assert first.ok and len(rest) == 699
+    assert [len(r["body"]) for r in provider.requests] == [500, 200]
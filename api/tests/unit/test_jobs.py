@@ -0,0 +1,185 @@
+"""Unit tests for the background job queue."""
+import pytest
+import time
+from unittest.mock import patch
+
+from services import jobs
+
+
+@pytest.fixture
+def backend():
+    return jobs.MemoryJobBackend()
+
+
+@pytest.fixture
+def kind():
+    calls = []
+
+    @jobs.handler("test_job")
+    def run(payload, ctx):
+        calls.append(payload)
+        behaviour = payload.get("behaviour")
+        if behaviour == "flaky" and len(calls) < 2:
+            raise RuntimeError("temporary outage")
+        if behaviour == "broken":
+            raise RuntimeError("always fails")
+        if behaviour == "permanent":
+            raise jobs.PermanentJobError("bad input")
+        if behaviour == "progress":
+            ctx.progress(3, 4, emailed=2)
+        if behaviour == "slow":
+            # Longer than the lease, without a progress call
+            time.sleep(1.3)
+            return {"released": ctx.backend.dequeue(jobs.JOB_LEASE_SECONDS) is None}
+        return {"ok": True}
+
+    yield calls
+    jobs.HANDLERS.pop("test_job", None)
+    jobs.RUN_LOCKS.pop("test_job", None)
+
+
+@pytest.mark.unit
+def test_enqueue_unknown_kind_is_rejected(backend):
+    with pytest.raises(ValueError):
+        jobs.enqueue("no_such_job", {}, backend=backend)
+
+
+@pytest.mark.unit
+def test_job_runs_to_success(backend, kind):
+    job = jobs.enqueue("test_job", {"n": 1}, backend=backend)
+
+    assert jobs.run_one(backend) is True
+    assert jobs.run_one(backend) is False
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["status"] == jobs.SUCCEEDED
+    assert done["attempts"] == 1
+    assert done["result"] == {"ok": True}
+    assert kind == [{"n": 1}]
+
+
+@pytest.mark.unit
+def test_transient_failure_is_retried(backend, kind):
+    job = jobs.enqueue("test_job", {"behaviour": "flaky"}, backend=backend)
+
+    with patch.object(jobs, "backoff_delay", return_value=0):
+        jobs.run_one(backend)
+        assert jobs.get_job(job["id"], backend)["status"] == jobs.RETRYING
+        jobs.run_one(backend)
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["status"] == jobs.SUCCEEDED
+    assert done["attempts"] == 2
+    assert done["error"] is None
+
+
+@pytest.mark.unit
+def test_retry_waits_for_backoff(backend, kind):
+    jobs.enqueue("test_job", {"behaviour": "flaky"}, backend=backend)
+
+    with patch.object(jobs, "backoff_delay", return_value=60):
+        jobs.run_one(backend)
+        assert jobs.run_one(backend) is False
+
+
+@pytest.mark.unit
+def test_gives_up_after_max_attempts(backend, kind):
+    job = jobs.enqueue("test_job", {"behaviour": "broken"}, max_attempts=3, backend=backend)
+
+    with patch.object(jobs, "backoff_delay", return_value=0):
+        while jobs.run_one(backend):
+            pass
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["status"] == jobs.FAILED
+    assert done["attempts"] == 3
+    assert "always fails" in done["error"]
+
+
+@pytest.mark.unit
+def test_permanent_error_is_not_retried(backend, kind):
+    job = jobs.enqueue("test_job", {"behaviour": "permanent"}, backend=backend)
+
+    jobs.run_one(backend)
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["status"] == jobs.FAILED
+    assert done["attempts"] == 1
+    assert jobs.run_one(backend) is False
+
+
+@pytest.mark.unit
+def test_expired_lease_is_requeued(backend, kind):
+    job = jobs.enqueue("test_job", {}, backend=backend)
+
+    # A worker leases the job and dies without finishing it
+    assert backend.dequeue(lease_seconds=0) == job["id"]
+    jobs.run_one(backend)
+
+    assert jobs.get_job(job["id"], backend)["status"] == jobs.SUCCEEDED
+
+
+@pytest.mark.unit
+def test_lapsed_lease_on_last_attempt_fails_the_job(backend, kind):
+    job = jobs.enqueue("test_job", {}, max_attempts=1, backend=backend)
+
+    # The worker marked it running, then died without renewing the lease
+    assert backend.dequeue(lease_seconds=0) == job["id"]
+    backend.save({**jobs.get_job(job["id"], backend), "status": jobs.RUNNING, "attempts": 1})
+    jobs.run_one(backend)
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["status"] == jobs.FAILED
+    assert done["attempts"] == 1
+    assert kind == []
+    assert jobs.run_one(backend) is False
+
+
+@pytest.mark.unit
+def test_heartbeat_keeps_a_slow_job_leased(backend, kind):
+    job = jobs.enqueue("test_job", {"behaviour": "slow"}, backend=backend)
+
+    with patch.object(jobs, "JOB_LEASE_SECONDS", 1), patch.object(jobs, "JOB_HEARTBEATS_PER_LEASE", 10):
+        jobs.run_one(backend)
+
+    done = jobs.get_job(job["id"], backend)
+    assert done["result"] == {"released": True}
+    assert kind == [{"behaviour": "slow"}]
+
+
+@pytest.mark.unit
+def test_runs_sharing_a_lock_never_overlap(backend, kind):
+    jobs.handler("test_job", run_lock=lambda payload: f"test:{payload['year']}")(jobs.HANDLERS["test_job"])
+    job = jobs.enqueue("test_job", {"year": 2025}, backend=backend)
+    assert backend.acquire_lock("test:2025", "other-run", ttl=60)
+
+    with patch.object(jobs, "JOB_LOCK_RETRY_SECONDS", 0):
+        jobs.run_one(backend)
+        waiting = jobs.get_job(job["id"], backend)
+        assert (waiting["status"], waiting["attempts"]) == (jobs.QUEUED, 0)
+        assert kind == []
+
+        backend.release_lock("test:2025", "other-run")
+        jobs.run_one(backend)
+
+    assert jobs.get_job(job["id"], backend)["status"] == jobs.SUCCEEDED
+    # Released once the run finishes
+    assert backend.acquire_lock("test:2025", "next-run", ttl=60)
+
+
+@pytest.mark.unit
+def test_progress_is_recorded(backend, kind):
+    job = jobs.enqueue("test_job", {"behaviour": "progress"}, backend=backend)
+
+    jobs.run_one(backend)
+
+    progress = jobs.get_job(job["id"], backend)["progress"]
+    assert progress["done"] == 3
+    assert progress["total"] == 4
+    assert progress["emailed"] == 2
+
+
+@pytest.mark.unit
+def test_backoff_is_capped():
+    with patch.object(jobs, "JOB_BACKOFF_MAX", 10):
+        assert all(0 <= jobs.backoff_delay(20) <= 10 for _ in range(50))
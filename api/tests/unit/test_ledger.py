@@ -0,0 +1,100 @@
+"""Unit tests for streaming internal-ledger reconciliation."""
+import csv
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from models import Donor, Donation
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("raw, cents", [
+    ("125.00", 12500), ("1,234.5", 123450), ("$12", 1200), (".07", 7), ("0.005", 1),
+    ("19.994", 1999), ("(3.25)", -325), ("-4.10", -410), ("", 0),
+])
+def test_to_cents(raw, cents):
+    from services.ledger import to_cents
+    assert to_cents(raw) == cents
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("raw", ["abc", "1.2.3", "12a"])
+def test_to_cents_rejects_garbage(raw):
+    from services.ledger import to_cents
+    with pytest.raises(ValueError):
+        to_cents(raw)
+
+
+@pytest.fixture
+def seeded_db(db_session):
+    db_session.add(Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"))
+    db_session.add_all([
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", square_payment_id="sq_1",
+                 received_at=datetime(2025, 1, 1), amount=Decimal("125.00"), designation="Shipping Fund"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", square_payment_id="sq_2",
+                 received_at=datetime(2025, 1, 2), amount=Decimal("75.00"), designation="General Fund"),
+        Donation(donation_id="g3", donor_id="d_1", receipt_id="R3", square_payment_id="sq_3",
+                 received_at=datetime(2025, 1, 3), amount=Decimal("10.00"), designation="General Fund"),
+        Donation(donation_id="g4", donor_id="d_1", receipt_id="R4", square_payment_id="sq_4",
+                 received_at=datetime(2025, 1, 4), amount=Decimal("5.00"), designation="Outreach"),
+    ])
+    db_session.commit()
+    return db_session
+
+
+def _write_ledger(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["receipt_id", "square_payment_id", "amount", "designation"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.mark.unit
+def test_ledger_rows_are_matched_and_variances_written(seeded_db, tmp_path):
+    from services import ledger
+
+    _write_ledger(tmp_path / "internal_donations.csv", [
+        {"receipt_id": "R1", "square_payment_id": "", "amount": "125.00", "designation": "Shipping Fund"},
+        {"receipt_id": "", "square_payment_id": "sq_2", "amount": "70.00", "designation": "General Fund"},
+        {"receipt_id": "R3", "square_payment_id": "sq_3", "amount": "10", "designation": "Outreach"},
+        {"receipt_id": "R1", "square_payment_id": "", "amount": "125.00", "designation": "Shipping Fund"},
+        {"receipt_id": "R9", "square_payment_id": "", "amount": "1.00", "designation": ""},
+        {"receipt_id": "R4", "square_payment_id": "", "amount": "n/a", "designation": "Outreach"},
+    ])
+
+    with patch.object(ledger, "LEDGER_CHUNK_ROWS", 2):
+        result = ledger.reconcile_ledger(seeded_db, str(tmp_path / "internal_donations.csv"),
+                                         str(tmp_path / "variances.csv"))
+
+    assert result["rows"] == 6
+    assert result["by_designation_cents"] == {"Shipping Fund": 25000, "General Fund": 7100, "Outreach": 1000}
+    assert result["counts"] == {"matched": 3, "amount_mismatch": 1, "designation_mismatch": 1,
+                                "duplicate": 1, "missing_in_square": 1, "invalid_amount": 1,
+                                "missing_in_ledger": 1}
+    with open(tmp_path / "variances.csv") as f:
+        records = list(csv.DictReader(f))
+    assert [(r["line"], r["kind"]) for r in records] == [
+        ("3", "amount_mismatch"), ("4", "designation_mismatch"), ("5", "duplicate"),
+        ("6", "missing_in_square"), ("7", "invalid_amount"),
+    ]
+    assert records[0]["donation_id"] == "g2"
+    assert (records[0]["internal_cents"], records[0]["square_cents"]) == ("7000", "7500")
+
+
+@pytest.mark.unit
+def test_reconciliation_report_includes_ledger(seeded_db, tmp_path):
+    from services.reconciliation import run_reconciliation
+
+    _write_ledger(tmp_path / "internal_donations.csv", [
+        {"receipt_id": "R1", "square_payment_id": "", "amount": "125.00", "designation": "Shipping Fund"},
+        {"receipt_id": "R2", "square_payment_id": "", "amount": "75.00", "designation": "General Fund"},
+    ])
+
+    res = run_reconciliation(seeded_db, str(tmp_path))
+
+    assert res["internal"] == {"total": "200.00",
+                               "by_designation": {"General Fund": "75.00", "Shipping Fund": "125.00"}}
+    assert res["variance_total"] == "15.00"
+    assert res["internal_rows"] == 2
+    assert res["variances"]["counts"]["missing_in_ledger"] == 2
+    assert (tmp_path / res["variances"]["file"]).exists()
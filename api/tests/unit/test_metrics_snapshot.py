@@ -0,0 +1,143 @@
+"""Unit tests for the precomputed reviewer-metrics snapshot."""
+import json
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from models import Donor, Donation
+from services import metrics, metrics_snapshot
+from services.metrics_snapshot import MetricsSnapshot
+
+# The default metrics range is the current year to date
+TODAY = datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def snapshot_db(async_db_session):
+    async_db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=TODAY,
+                 amount=100.0, designation="Shipping Fund"),
+    ])
+    await async_db_session.commit()
+    return async_sessionmaker(async_db_session.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def counted(snapshot_db):
+    calls = []
+
+    async def compute(db):
+        calls.append(1)
+        return await metrics.reviewer_metrics(db)
+
+    return compute, calls
+
+
+@pytest.mark.unit
+async def test_requests_are_served_from_the_snapshot(snapshot_db, counted):
+    compute, calls = counted
+    clock = FakeClock()
+    snap = MetricsSnapshot(compute, snapshot_db, refresh_after=30, max_age=300, clock=clock)
+
+    body, etag, _ = await snap.get()
+    clock.now += 10
+    again, same_etag, age = await snap.get()
+
+    assert len(calls) == 1
+    assert (again, same_etag, age) == (body, etag, 10)
+    assert json.loads(body)["shippedYTD"] == 1
+
+
+@pytest.mark.unit
+async def test_stale_snapshot_is_served_while_refreshing(snapshot_db, counted):
+    compute, calls = counted
+    clock = FakeClock()
+    snap = MetricsSnapshot(compute, snapshot_db, refresh_after=30, max_age=300, clock=clock)
+    body, _, _ = await snap.get()
+
+    async with snapshot_db() as db:
+        db.add(Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", received_at=TODAY,
+                        amount=5.0, designation="General Fund"))
+        await db.commit()
+    clock.now += 31
+    stale, _, _ = await snap.get()
+    await snap._task
+
+    assert stale == body
+    assert len(calls) == 2
+    assert json.loads(snap.body)["shippedYTD"] == 2
+
+
+@pytest.mark.unit
+async def test_requests_wait_past_the_staleness_bound(snapshot_db, counted):
+    compute, calls = counted
+    clock = FakeClock()
+    snap = MetricsSnapshot(compute, snapshot_db, refresh_after=30, max_age=60, clock=clock)
+    await snap.get()
+
+    clock.now += 61
+    _, _, age = await snap.get()
+
+    assert len(calls) == 2
+    assert age == 0
+
+
+@pytest.mark.unit
+async def test_donation_commit_invalidates_snapshots(snapshot_db, counted, db_session):
+    compute, calls = counted
+    clock = FakeClock()
+    snap = MetricsSnapshot(compute, snapshot_db, refresh_after=30, max_age=300, min_refresh=2, clock=clock)
+    metrics_snapshot._snapshots["test"] = snap
+    try:
+        await snap.get()
+        db_session.add(Donor(donor_id="d_9", primary_contact_name="Sam Lee", email="sam@example.com"))
+        db_session.commit()
+        assert snap._dirty is False
+
+        db_session.add(Donation(donation_id="g9", donor_id="d_9", receipt_id="R9", received_at=TODAY,
+                                amount=1.0, designation="General Fund"))
+        db_session.rollback()
+        assert snap._dirty is False
+
+        db_session.add(Donation(donation_id="g9", donor_id="d_9", receipt_id="R9", received_at=TODAY,
+                                amount=1.0, designation="General Fund"))
+        db_session.commit()
+        assert snap._dirty is True
+
+        clock.now += 1
+        await snap.get()
+        assert len(calls) == 1
+        clock.now += 1
+        await snap.get()
+        await snap._task
+        assert len(calls) == 2
+        assert snap._dirty is False
+    finally:
+        metrics_snapshot._snapshots.pop("test")
+
+
+@pytest.mark.unit
+async def test_route_sets_cache_headers_and_honours_etag(snapshot_db):
+    from routes.metrics import get_reviewer_metrics
+
+    metrics_snapshot._snapshots["reviewer"] = MetricsSnapshot(metrics.reviewer_metrics, snapshot_db)
+    try:
+        first = await get_reviewer_metrics(None, None, if_none_match=None, db=None)
+        etag = first.headers["etag"]
+        assert first.status_code == 200
+        assert first.headers["cache-control"].startswith("public, max-age=")
+        assert json.loads(first.body)["fundsByDesignation"] == [{"name": "Shipping Fund", "value": 100.0}]
+
+        second = await get_reviewer_metrics(None, None, if_none_match=etag, db=None)
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+    finally:
+        metrics_snapshot._snapshots.pop("reviewer")
@@ -0,0 +1,124 @@
+"""Unit tests for streamed PDF responses and byte-range handling."""
+import pytest
+from datetime import datetime
+from fastapi import FastAPI, Header
+from fastapi.testclient import TestClient
+from typing import Optional
+from models import Donor, Donation
+# Bound at import so the autouse lookup mocks do not replace the statement donor lookup
+from routes.statements import get_statement
+from services.pdf_response import RangeNotSatisfiable, byte_range, pdf_response
+
+PDF = b"%PDF-" + bytes(range(256)) * 4
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 1028)),
+    ("bytes=-10", (1019, 1028)),
+    ("bytes=-5000", (0, 1028)),
+    ("bytes=1000-5000", (1000, 1028)),
+    ("bytes=0-1,5-9", None),
+    ("items=0-1", None),
+    ("bytes=9-3", None),
+])
+def test_byte_range(header, expected):
+    assert byte_range(header, len(PDF)) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("header", ["bytes=1029-", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        byte_range(header, len(PDF))
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.get("/bytes")
+    def from_bytes(range: Optional[str] = Header(None), if_range: Optional[str] = Header(None)):
+        return pdf_response(PDF, "r.pdf", '"v1"', range_header=range, if_range=if_range)
+
+    @app.get("/weak")
+    def weak(range: Optional[str] = Header(None), if_range: Optional[str] = Header(None)):
+        return pdf_response(PDF, "r.pdf", 'W/"v1"', range_header=range, if_range=if_range)
+
+    @app.get("/file")
+    def from_file(range: Optional[str] = Header(None)):
+        path = tmp_path / "out.pdf"
+        path.write_bytes(PDF)
+        return pdf_response(str(path), "r.pdf", range_header=range, delete=True)
+
+    return TestClient(app)
+
+
+@pytest.mark.unit
+def test_bytes_ranges_and_if_range(client):
+    full = client.get("/bytes")
+    assert full.status_code == 200
+    assert full.content == PDF
+    assert full.headers["content-length"] == str(len(PDF))
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = client.get("/bytes", headers={"Range": "bytes=5-14"})
+    assert part.status_code == 206
+    assert part.content == PDF[5:15]
+    assert part.headers["content-range"] == f"bytes 5-14/{len(PDF)}"
+    assert part.headers["content-length"] == "10"
+
+    assert client.get("/bytes", headers={"Range": "bytes=5-14", "If-Range": '"v1"'}).status_code == 206
+    stale = client.get("/bytes", headers={"Range": "bytes=5-14", "If-Range": '"v0"'})
+    assert (stale.status_code, stale.content) == (200, PDF)
+
+    # A weak tag may stand for different bytes, so a resumed range never splices onto it
+    assert client.get("/weak", headers={"Range": "bytes=5-14"}).status_code == 206
+    resumed = client.get("/weak", headers={"Range": "bytes=5-14", "If-Range": 'W/"v1"'})
+    assert (resumed.status_code, resumed.content) == (200, PDF)
+
+    bad = client.get("/bytes", headers={"Range": "bytes=9999-"})
+    assert bad.status_code == 416
+    assert bad.headers["content-range"] == f"bytes */{len(PDF)}"
+
+
+@pytest.mark.unit
+def test_file_is_streamed_and_removed(client, tmp_path, monkeypatch):
+    from services import pdf_response as module
+    monkeypatch.setattr(module, "STREAM_CHUNK_SIZE", 100)
+
+    full = client.get("/file")
+    assert full.content == PDF
+    assert full.headers["content-length"] == str(len(PDF))
+    assert not (tmp_path / "out.pdf").exists()
+
+    part = client.get("/file", headers={"Range": "bytes=250-549"})
+    assert (part.status_code, part.content) == (206, PDF[250:550])
+    assert not (tmp_path / "out.pdf").exists()
+
+    assert client.get("/file", headers={"Range": "bytes=9999-"}).status_code == 416
+    assert not (tmp_path / "out.pdf").exists()
+
+
+@pytest.mark.unit
+async def test_statement_route_streams_a_temp_file(async_db_session):
+    async_db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 2, 1),
+                 amount=100.0, designation="Shipping Fund"),
+    ])
+    await async_db_session.commit()
+
+    resp = await get_statement("d_1", 2025, db=async_db_session, if_none_match=None, range="bytes=0-4", if_range=None)
+    assert resp.status_code == 206
+    assert resp.headers["etag"].startswith('W/"')
+    assert int(resp.headers["content-range"].rsplit("/", 1)[1]) > 5
+    chunks = [chunk async for chunk in resp.body_iterator]
+    assert b"".join(chunks) == b"%PDF-"
+    await resp.background()
+
+    cached = await get_statement("d_1", 2025, db=async_db_session, if_none_match=resp.headers["etag"],
+                                 range=None, if_range=None)
+    assert cached.status_code == 304
@@ -0,0 +1,53 @@
+"""Unit tests for vector QR drawing."""
+import io
+import pytest
+import qrcode
+from reportlab.pdfgen import canvas
+
+
+@pytest.mark.unit
+def test_runs_reconstruct_the_qr_matrix():
+    from services.qr import qr_runs
+
+    url = "https://sparkcreatives.org/verify?rid=RCPT-1"
+    qr = qrcode.QRCode(border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    n, runs = qr_runs(url)
+    rebuilt = [[False] * n for _ in range(n)]
+    for row, col, length in runs:
+        for i in range(col, col + length):
+            rebuilt[row][i] = True
+
+    assert n == len(matrix)
+    assert rebuilt == matrix
+
+
+@pytest.mark.unit
+def test_runs_are_memoized_per_url():
+    from services.qr import qr_runs
+
+    qr_runs.cache_clear()
+    qr_runs("https://example.org/a")
+    qr_runs("https://example.org/a")
+    qr_runs("https://example.org/b")
+
+    info = qr_runs.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+@pytest.mark.unit
+def test_draw_qr_emits_vectors_not_images():
+    from services.qr import draw_qr
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.setPageCompression(0)
+    draw_qr(c, "https://example.org/a", 10, 10, 80)
+    c.showPage(); c.save()
+
+    pdf = buf.getvalue()
+    assert b"/Subtype /Image" not in pdf
+    assert b" re" in pdf
@@ -0,0 +1,101 @@
+"""Migrations and index use for the donation queries (SQLite EXPLAIN QUERY PLAN)."""
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import String, cast, func, inspect, select, text
+from models import Donation
+
+
+def _plan(db, stmt):
+    sql = stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return " | ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+@pytest.mark.unit
+def test_donor_year_statement_uses_composite_index(db_session):
+    from services.statements import _year_statement_query
+
+    plan = _plan(db_session, _year_statement_query(2025, donor_id="d_1"))
+
+    assert "USING INDEX ix_donations_donor_id_received_at (donor_id=? AND received_at>? AND received_at<?)" in plan
+
+
+@pytest.mark.unit
+def test_year_range_is_an_index_search(db_session):
+    from services.statements import _year_statement_query
+
+    plan = _plan(db_session, _year_statement_query(2025))
+
+    assert "SEARCH donations USING INDEX ix_donations_received_at" in plan
+    # The string-prefix filter it replaced cannot use any index
+    legacy = select(Donation.donation_id).where(cast(Donation.received_at, String).like("2025%"))
+    assert "SCAN donations" in _plan(db_session, legacy)
+
+
+@pytest.mark.unit
+def test_bulk_receipt_range_and_lookups_use_indexes(db_session):
+    start, end = date(2025, 1, 1), date(2025, 3, 31)
+    stmt = select(Donation).where(Donation.received_at >= start, Donation.received_at < end)
+
+    assert "SEARCH donations USING INDEX ix_donations_received_at" in _plan(db_session, stmt)
+    assert "USING INDEX ix_donations_receipt_id" in _plan(
+        db_session, select(Donation).where(Donation.receipt_id == "R1"))
+    assert "USING INDEX ix_donations_designation" in _plan(
+        db_session, select(Donation.designation, func.sum(Donation.amount)).group_by(Donation.designation))
+
+
+@pytest.mark.unit
+def test_migrations_match_models(migrated_db):
+    from alembic import command
+
+    cfg, engine = migrated_db
+    command.upgrade(cfg, "head")
+    indexes = {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes("donations")}
+    assert indexes["ix_donations_donor_id_received_at"] == ["donor_id", "received_at"]
+    assert {ix.name for ix in Donation.__table__.indexes} == set(indexes)
+
+    command.downgrade(cfg, "0001")
+    assert inspect(engine).get_indexes("donations") == []
+
+
+@pytest.mark.unit
+def test_amount_migration_rounds_floats_to_cents(migrated_db):
+    from alembic import command
+
+    cfg, engine = migrated_db
+    command.upgrade(cfg, "0002")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO donors (donor_id, primary_contact_name, email) VALUES ('d', 'D', '')"))
+        conn.execute(text("INSERT INTO donations (donation_id, donor_id, receipt_id, received_at, amount, designation) "
+                          "VALUES ('g', 'd', 'R', '2025-01-01 00:00:00', 0.1 + 0.2, 'General Fund')"))
+    command.upgrade(cfg, "head")
+
+    with engine.connect() as conn:
+        amount = conn.execute(select(Donation.amount)).scalar_one()
+        names = {ix["name"] for ix in inspect(conn).get_indexes("donations")}
+    assert amount == Decimal("0.30")
+    assert "ix_donations_donor_id_received_at" in names
+
+
+@pytest.mark.unit
+def test_rollup_migration_backfills_daily_buckets(migrated_db):
+    from alembic import command
+    from models import DonationDailyRollup
+
+    cfg, engine = migrated_db
+    command.upgrade(cfg, "0004")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO donors (donor_id, primary_contact_name, email) VALUES ('d', 'D', '')"))
+        conn.execute(text(
+            "INSERT INTO donations (donation_id, donor_id, receipt_id, received_at, amount, designation) VALUES "
+            "('g1', 'd', 'R1', '2025-01-01 09:00:00', 0.29, 'General Fund'), "
+            "('g2', 'd', 'R2', '2025-01-01 23:59:59', 10.01, 'General Fund'), "
+            "('g3', 'd', 'R3', '2025-01-02 00:00:00', 5, 'General Fund')"))
+    command.upgrade(cfg, "head")
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(DonationDailyRollup.day, DonationDailyRollup.donation_count,
+                                   DonationDailyRollup.amount_cents).order_by(DonationDailyRollup.day)).all()
+    assert rows == [(date(2025, 1, 1), 2, 1030), (date(2025, 1, 2), 1, 500)]
+    command.downgrade(cfg, "0004")
+    assert "donation_daily_rollups" not in inspect(engine).get_table_names()
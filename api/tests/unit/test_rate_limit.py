@@ -0,0 +1,145 @@
+"""Unit tests for the rate limiter's local fast path and Redis leasing."""
+import asyncio
+import pytest
+import redis
+
+from services.rate_limit import RateLimiter, Rule, parse_rules
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _CountingStore:
+    """Stands in for RedisBucketStore using the local bucket algorithm."""
+
+    def __init__(self, clock, fail=False):
+        from services.rate_limit import LocalBucketStore
+        self.buckets = LocalBucketStore(clock)
+        self.calls = 0
+        self.fail = fail
+
+    async def take(self, key, rule, want, returned=0):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise redis.exceptions.ConnectionError("down")
+        return self.buckets.take(key, rule, want, returned)
+
+
+def _rules(default="60/60", routes=""):
+    return parse_rules(default, routes)
+
+
+@pytest.mark.unit
+def test_parse_rules_prefers_longest_prefix():
+    limiter = RateLimiter(rules=_rules("60/60", "/api/v1/=100/60, /api/v1/tasks/=5/60"))
+
+    assert limiter.rule_for("/api/v1/tasks/year-end-statements").limit == 5
+    assert limiter.rule_for("/api/v1/jobs/abc").limit == 100
+    assert limiter.rule_for("/health") == Rule("default", 60, 60.0)
+
+
+@pytest.mark.unit
+async def test_local_bucket_blocks_and_refills():
+    clock = _Clock()
+    limiter = RateLimiter(rules=_rules("3/3"), clock=clock)
+
+    results = [await limiter.hit("1.2.3.4", "/x") for _ in range(4)]
+    assert [ok for ok, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert (await limiter.hit("1.2.3.4", "/x"))[0]
+    assert (await limiter.hit("5.6.7.8", "/x"))[0]  # other clients have their own bucket
+
+
+@pytest.mark.unit
+async def test_redis_is_consulted_once_per_lease():
+    clock = _Clock()
+    store = _CountingStore(clock)
+    limiter = RateLimiter(store, rules=_rules("100/60"), clock=clock)  # lease of 10
+
+    allowed = [(await limiter.hit("c", "/x"))[0] for _ in range(100)]
+
+    assert all(allowed)
+    assert store.calls == 10
+    assert not (await limiter.hit("c", "/x"))[0]
+
+
+@pytest.mark.unit
+async def test_denial_is_cached_until_a_permit_is_due():
+    clock = _Clock()
+    store = _CountingStore(clock)
+    limiter = RateLimiter(store, rules=_rules("10/10"), clock=clock)  # lease of 1
+
+    for _ in range(10):
+        assert (await limiter.hit("c", "/x"))[0]
+    calls = store.calls
+    for _ in range(5):
+        ok, retry_after = await limiter.hit("c", "/x")
+        assert not ok and retry_after > 0
+    # The last lease already reported the bucket empty, so denials stay local
+    assert store.calls == calls
+
+    clock.now += 1.0
+    assert (await limiter.hit("c", "/x"))[0]
+    assert store.calls == calls + 1
+
+
+@pytest.mark.unit
+async def test_lapsed_leases_return_unspent_permits():
+    async def trickle_then_burst(limiter, clock):
+        # 40 requests well under 60/60, then a burst the bucket still has room for
+        for _ in range(40):
+            assert (await limiter.hit("c", "/x"))[0]
+            clock.now += 1.5
+        return sum([(await limiter.hit("c", "/x"))[0] for _ in range(30)])
+
+    local_clock, leased_clock = _Clock(), _Clock()
+    local = RateLimiter(rules=_rules("60/60"), clock=local_clock)
+    leased = RateLimiter(_CountingStore(leased_clock), rules=_rules("60/60"), clock=leased_clock)
+
+    assert await trickle_then_burst(local, local_clock) == 30
+    assert await trickle_then_burst(leased, leased_clock) == 30
+
+
+@pytest.mark.unit
+async def test_concurrent_requests_share_one_refill():
+    clock = _Clock()
+    store = _CountingStore(clock)
+    limiter = RateLimiter(store, rules=_rules("100/60"), clock=clock)
+
+    results = await asyncio.gather(*[limiter.hit("c", "/x") for _ in range(8)])
+
+    assert all(ok for ok, _ in results)
+    assert store.calls == 1
+
+
+@pytest.mark.unit
+async def test_redis_failure_falls_back_to_local_buckets():
+    clock = _Clock()
+    store = _CountingStore(clock, fail=True)
+    limiter = RateLimiter(store, rules=_rules("2/60"), clock=clock)
+
+    results = [(await limiter.hit("c", "/x"))[0] for _ in range(3)]
+
+    assert results == [True, True, False]
+    assert store.calls == 1  # Redis is left alone while it is marked down
+
+
+@pytest.mark.unit
+def test_middleware_returns_429_with_retry_after(client, rate_limiter):
+    from services.rate_limit import Rule
+    rate_limiter.default = Rule("default", 1, 60.0)
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/health")
+
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Rate limit exceeded"
+    assert int(response.headers["Retry-After"]) >= 1
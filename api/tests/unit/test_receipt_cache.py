@@ -0,0 +1,111 @@
+"""Unit tests for the receipt PDF cache."""
+import pytest
+from unittest.mock import patch, MagicMock
+from prometheus_client import REGISTRY
+
+
+def _sample(name, backend):
+    return REGISTRY.get_sample_value(name, {"backend": backend}) or 0.0
+
+
+FIELDS = dict(
+    receipt_id="RCPT-1", donor_name="Alex", donation_amount=125.0, donation_date="2025-08-01",
+    designation="Shipping Fund", restricted=True, payment_method="Square", soft_credit_to=None,
+    line_items=[{"designation": "Shipping Fund", "amount": 125.0}],
+)
+
+
+@pytest.mark.unit
+def test_cache_key_is_stable_and_content_sensitive():
+    from services.receipt_cache import receipt_cache_key
+
+    key = receipt_cache_key(FIELDS)
+    assert key == receipt_cache_key(dict(reversed(list(FIELDS.items()))))
+    assert key != receipt_cache_key({**FIELDS, "donation_amount": 126.0})
+    assert len(key) == 64
+
+
+@pytest.mark.unit
+def test_memory_cache_evicts_least_recently_used_by_size():
+    from services.receipt_cache import MemoryReceiptCache
+
+    cache = MemoryReceiptCache(max_bytes=10)
+    before = _sample("receipt_cache_evictions_total", "memory")
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # a is now most recent
+    cache.put("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert cache.size == 8
+    assert _sample("receipt_cache_evictions_total", "memory") == before + 1
+
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+@pytest.mark.unit
+def test_disk_cache_round_trip(tmp_path):
+    from services.receipt_cache import DiskReceiptCache
+
+    cache = DiskReceiptCache(str(tmp_path))
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, b"%PDF-1.4")
+    assert cache.get("ab" * 32) == b"%PDF-1.4"
+    assert DiskReceiptCache(str(tmp_path)).get("ab" * 32) == b"%PDF-1.4"
+
+
+@pytest.mark.unit
+def test_redis_cache_uses_prefixed_keys_with_ttl():
+    from services.receipt_cache import RedisReceiptCache
+
+    client = MagicMock()
+    client.get.return_value = b"%PDF"
+    cache = RedisReceiptCache(client, ttl=60)
+    cache.put("k", b"%PDF")
+
+    client.set.assert_called_once_with("receipt_pdf:k", b"%PDF", ex=60)
+    assert cache.get("k") == b"%PDF"
+    client.get.assert_called_once_with("receipt_pdf:k")
+
+
+@pytest.mark.unit
+def test_cache_get_counts_hits_and_misses():
+    from services import receipt_cache
+
+    cache = receipt_cache.MemoryReceiptCache()
+    hits, misses = _sample("receipt_cache_hits_total", "memory"), _sample("receipt_cache_misses_total", "memory")
+    with patch.object(receipt_cache, "get_receipt_cache", return_value=cache):
+        assert receipt_cache.cache_get("k") is None
+        receipt_cache.cache_put("k", b"%PDF")
+        assert receipt_cache.cache_get("k") == b"%PDF"
+
+    assert _sample("receipt_cache_hits_total", "memory") == hits + 1
+    assert _sample("receipt_cache_misses_total", "memory") == misses + 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend, expected", [("none", None), ("mem", "memory")])
+def test_unknown_backend_is_not_taken_as_disabled(backend, expected):
+    from services import receipt_cache
+
+    with patch.object(receipt_cache, "RECEIPT_CACHE_BACKEND", backend), patch.object(receipt_cache, "_cache", None), \
+         patch.object(receipt_cache.logger, "error") as error:
+        cache = receipt_cache.get_receipt_cache()
+    assert getattr(cache, "name", None) == expected
+    assert error.called == (backend != "none")
+
+
+@pytest.mark.unit
+def test_etag_matching():
+    from services.etag import make_etag, etag_matches
+
+    etag = make_etag("abc")
+    assert etag == '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
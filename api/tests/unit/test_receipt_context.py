@@ -0,0 +1,115 @@
+"""Unit tests for the joined receipt-context loader and its cache."""
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event
+# Bound at import so the autouse lookup mocks do not replace them
+from services.receipts import load_receipt_context, load_receipt_context_async, load_receipt_contexts
+from services import receipts
+from models import Donor, Donation
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    receipts.context_cache.clear()
+    yield
+    receipts.context_cache.clear()
+
+
+def _seed(db):
+    db.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email=" alex@example.com "),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 8, 2, 9),
+                 amount=Decimal("125.00"), designation="Shipping Fund", method="card",
+                 designation_breakdown="Shipping Fund:100;General Fund:25"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="", received_at=datetime(2025, 8, 1),
+                 amount=Decimal("5.50"), designation="General Fund"),
+        Donation(donation_id="g3", donor_id="d_missing", receipt_id="R3", received_at=datetime(2025, 7, 1),
+                 amount=Decimal("1.00"), designation="General Fund"),
+    ])
+    db.commit()
+
+
+def _count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, stmt, *args: statements.append(stmt))
+    return statements
+
+
+@pytest.fixture
+def seeded(db_session):
+    _seed(db_session)
+    return db_session
+
+
+@pytest.mark.unit
+def test_one_joined_query_then_served_from_cache(seeded):
+    statements = _count_queries(seeded)
+    ctx = load_receipt_context(seeded, "g1")
+
+    assert len(statements) == 1
+    assert "JOIN donors" in statements[0] and "LIMIT" not in statements[0]
+    assert ctx.donor_email == "alex@example.com"
+    assert ctx.fields == dict(
+        receipt_id="R1", donor_name="Alex Rivera", donation_amount=125.0, donation_date="2025-08-02",
+        designation="Shipping Fund", restricted=False, payment_method="Card", soft_credit_to=None,
+        line_items=[{"designation": "Shipping Fund", "amount": 100.0}, {"designation": "General Fund", "amount": 25.0}],
+    )
+    assert load_receipt_context(seeded, "g1") is ctx
+    assert len(statements) == 1
+
+
+@pytest.mark.unit
+def test_missing_donation_and_donor(seeded):
+    assert load_receipt_context(seeded, "nope") is None
+    orphan = load_receipt_context(seeded, "g3")
+    assert (orphan.fields["donor_name"], orphan.donor_email) == ("Donor", "")
+    assert load_receipt_context(seeded, "g2").fields["receipt_id"] == "RCPT-g2"
+
+
+@pytest.mark.unit
+def test_cache_expires_and_drops_committed_edits(seeded):
+    clock = [0.0]
+    cache = receipts.ReceiptContextCache(ttl=30, clock=lambda: clock[0])
+    cache.put(load_receipt_context(seeded, "g1"))
+    assert cache.get("g1") is not None
+    clock[0] = 31
+    assert cache.get("g1") is None
+
+    load_receipt_context(seeded, "g1")
+    seeded.get(Donation, "g1").amount = Decimal("130.00")
+    seeded.commit()
+    assert receipts.context_cache.get("g1") is None
+    assert load_receipt_context(seeded, "g1").fields["donation_amount"] == 130.0
+
+    load_receipt_context(seeded, "g2")
+    seeded.get(Donor, "d_1").primary_contact_name = "Alex R."
+    seeded.commit()
+    assert receipts.context_cache.get("g2") is None
+
+
+@pytest.mark.unit
+def test_batch_loader_queries_only_uncached_ids(seeded):
+    load_receipt_context(seeded, "g1")
+    statements = _count_queries(seeded)
+    found = load_receipt_contexts(seeded, ["g1", "g2", "g3", "nope", "g2"])
+
+    assert sorted(found) == ["g1", "g2", "g3"]
+    assert len(statements) == 1
+    assert [f["receipt_id"] for f in receipts.receipt_fields_for_ids(seeded, ["g1", "g2", "g3"])] == \
+        ["R3", "RCPT-g2", "R1"]
+
+
+@pytest.mark.unit
+async def test_async_loader(async_db_session):
+    async_db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 8, 2),
+                 amount=Decimal("10.00"), designation="General Fund"),
+    ])
+    await async_db_session.commit()
+
+    ctx = await load_receipt_context_async(async_db_session, "g1")
+    assert (ctx.fields["donor_name"], ctx.donor_email) == ("Alex Rivera", "alex@example.com")
+    assert await load_receipt_context_async(async_db_session, "nope") is None
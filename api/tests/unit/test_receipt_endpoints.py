@@ -20,6 +20,38 @@ def test_get_receipt_success(client, test_env, mock_donation_data, mock_donor_da
     assert response.content == mock_pdf_data
 
 
+@pytest.mark.unit
+def test_get_receipt_etag_is_weak(client, test_env, mock_donation_data, mock_donor_data, mock_pdf_data, mock_external_services):
+    """The receipt tag names the render's inputs, not its bytes, so it is weak but still revalidates."""
+    mock_external_services['find_donation'].return_value = mock_donation_data
+    mock_external_services['find_donor'].return_value = mock_donor_data
+    mock_external_services['generate_receipt_pdf'].return_value = mock_pdf_data
+
+    response = client.get("/api/v1/donations/test_donation_123/receipt.pdf")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get("/api/v1/donations/test_donation_123/receipt.pdf", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+
+@pytest.mark.unit
+def test_get_receipt_if_range_sends_the_whole_document(client, test_env, mock_donation_data, mock_donor_data, mock_pdf_data, mock_external_services):
+    """A re-render may differ byte for byte, so resuming a range against the receipt tag restarts the download."""
+    mock_external_services['find_donation'].return_value = mock_donation_data
+    mock_external_services['find_donor'].return_value = mock_donor_data
+    mock_external_services['generate_receipt_pdf'].return_value = mock_pdf_data
+    url = "/api/v1/donations/test_donation_123/receipt.pdf"
+
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"Range": "bytes=0-4"}).status_code == 206
+    resumed = client.get(url, headers={"Range": "bytes=5-", "If-Range": etag})
+
+    assert resumed.status_code == 200
+    assert resumed.content == mock_pdf_data
+
+
 @pytest.mark.unit
 def test_get_receipt_donation_not_found(client, test_env, mock_external_services):
     """Test receipt generation when donation is not found."""
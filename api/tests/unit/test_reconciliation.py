@@ -0,0 +1,118 @@
+"""Unit tests for the reconciliation rollup."""
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from models import Donor, Donation
+
+
+@pytest.fixture
+def seeded_db(db_session):
+    db_session.add(Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"))
+    amounts = [("0.10", "Shipping Fund"), ("0.20", "Shipping Fund"), ("19.99", ""), ("0.01", "General Fund")]
+    db_session.add_all([
+        Donation(donation_id=f"g{i}", donor_id="d_1", receipt_id=f"R{i}", received_at=datetime(2025, 1, i + 1),
+                 amount=Decimal(amount), designation=des)
+        for i, (amount, des) in enumerate(amounts)
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.mark.unit
+def test_amounts_round_trip_as_exact_decimals(seeded_db):
+    dn = seeded_db.get(Donation, "g0")
+    assert dn.amount == Decimal("0.10")
+
+
+@pytest.mark.unit
+def test_reconciliation_sums_exactly_in_sql(seeded_db, tmp_path):
+    from services.reconciliation import run_reconciliation
+
+    res = run_reconciliation(seeded_db, str(tmp_path))
+
+    assert res["square"] == {
+        "total": "20.30",
+        "by_designation": {"General Fund": "20.00", "Shipping Fund": "0.30"},
+    }
+    assert res["variance_total"] == "20.30"
+    assert json.loads((tmp_path / "reconciliation_report.json").read_text()) == res
+
+
+def _add(db, donation_id, when, amount, designation="Shipping Fund"):
+    db.add(Donation(donation_id=donation_id, donor_id="d_1", receipt_id=f"R-{donation_id}",
+                    received_at=when, amount=Decimal(amount), designation=designation))
+    db.commit()
+
+
+@pytest.mark.unit
+def test_incremental_run_merges_only_new_donations(seeded_db, tmp_path):
+    from unittest.mock import patch
+    from services import reconciliation
+
+    full = reconciliation.run_reconciliation(seeded_db, str(tmp_path))
+    assert full["mode"] == "full"
+    assert full["watermark"] == {"received_at": "2025-01-04T00:00:00", "rows": 4}
+
+    _add(seeded_db, "new1", datetime(2025, 2, 1), "5.00")
+    _add(seeded_db, "new2", datetime(2025, 2, 2), "1.25", "Outreach")
+    with patch.object(reconciliation, "designation_totals", wraps=reconciliation.designation_totals) as totals:
+        res = reconciliation.run_reconciliation(seeded_db, str(tmp_path), incremental=True)
+
+    assert totals.call_args.args[1] == datetime(2025, 1, 4)
+    assert res["mode"] == "incremental"
+    assert res["square"] == {
+        "total": "26.55",
+        "by_designation": {"General Fund": "20.00", "Outreach": "1.25", "Shipping Fund": "5.30"},
+    }
+    assert res["watermark"] == {"received_at": "2025-02-02T00:00:00", "rows": 6}
+    assert reconciliation.latest_report(str(tmp_path)) == res
+
+
+@pytest.mark.unit
+def test_incremental_run_with_nothing_new_keeps_totals(seeded_db, tmp_path):
+    from services.reconciliation import run_reconciliation
+
+    full = run_reconciliation(seeded_db, str(tmp_path))
+    res = run_reconciliation(seeded_db, str(tmp_path), incremental=True)
+
+    assert res["square"] == full["square"]
+    assert res["watermark"] == full["watermark"]
+
+
+@pytest.mark.unit
+def test_backfilled_donation_forces_full_rollup(seeded_db, tmp_path):
+    from services.reconciliation import run_reconciliation
+
+    run_reconciliation(seeded_db, str(tmp_path))
+    _add(seeded_db, "late", datetime(2024, 12, 1), "3.00")
+    res = run_reconciliation(seeded_db, str(tmp_path), incremental=True)
+
+    assert res["mode"] == "full"
+    assert res["square"]["total"] == "23.30"
+    assert res["watermark"]["rows"] == 5
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("field, value", [("amount", Decimal("0.40")), ("designation", "Outreach")])
+def test_edited_donation_before_watermark_forces_full_rollup(seeded_db, tmp_path, field, value):
+    from services.reconciliation import run_reconciliation
+
+    run_reconciliation(seeded_db, str(tmp_path))
+    setattr(seeded_db.get(Donation, "g1"), field, value)
+    seeded_db.commit()
+    res = run_reconciliation(seeded_db, str(tmp_path), incremental=True)
+
+    assert res["mode"] == "full"
+    assert res["watermark"]["rows"] == 4
+    assert res["square"] == run_reconciliation(seeded_db, str(tmp_path))["square"]
+
+
+@pytest.mark.unit
+def test_incremental_without_previous_report_is_full(seeded_db, tmp_path):
+    from services.reconciliation import run_reconciliation
+
+    res = run_reconciliation(seeded_db, str(tmp_path), incremental=True)
+
+    assert res["mode"] == "full"
+    assert res["square"]["total"] == "20.30"
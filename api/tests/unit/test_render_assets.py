@@ -0,0 +1,82 @@
+"""Unit tests for the receipt renderer asset registry."""
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+from PIL import Image
+
+
+@pytest.fixture
+def logo_file(tmp_path):
+    path = tmp_path / "source.png"
+    Image.new("RGB", (16, 16), (241, 151, 56)).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def logo_copy(tmp_path, logo_file):
+    path = tmp_path / "logo.png"
+    shutil.copy(logo_file, path)
+    return str(path)
+
+
+@pytest.mark.unit
+def test_logo_is_loaded_once(logo_copy, logo_file):
+    from services.render_assets import AssetRegistry
+
+    registry = AssetRegistry(logo_copy, reload_interval=0)
+    with patch("builtins.open", wraps=open) as mock_open:
+        first = registry.logo()
+        second = registry.logo()
+
+    assert first is not None and first is second
+    assert mock_open.call_count == 1
+    assert registry.logo_bytes() == open(logo_file, "rb").read()
+
+
+@pytest.mark.unit
+def test_logo_hot_reloads_when_file_changes(logo_copy, logo_file):
+    from services.render_assets import AssetRegistry
+
+    registry = AssetRegistry(logo_copy, reload_interval=0)
+    first, fingerprint = registry.logo(), registry.fingerprint()
+
+    os.remove(logo_copy)
+    assert registry.logo() is None
+    assert registry.fingerprint() == ""
+
+    shutil.copy(logo_file, logo_copy)
+    assert registry.logo() is not first
+    assert registry.fingerprint() == fingerprint
+
+
+@pytest.mark.unit
+def test_missing_logo_renders_without_image(tmp_path):
+    from services.render_assets import AssetRegistry
+
+    registry = AssetRegistry(str(tmp_path / "missing.png"), reload_interval=0)
+    assert registry.logo() is None
+    assert registry.logo_bytes() is None
+
+
+@pytest.mark.unit
+def test_header_form_defined_once_per_document(logo_copy):
+    import io
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import LETTER
+    from services import receipts
+    from services.render_assets import AssetRegistry
+    from services.receipts import _draw_header
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=LETTER)
+    with patch.object(receipts, "assets", AssetRegistry(logo_copy)), \
+         patch.object(c, "beginForm", wraps=c.beginForm) as begin:
+        for _ in range(3):
+            _draw_header(c, *LETTER)
+            c.showPage()
+    c.save()
+
+    assert begin.call_count == 1
+    assert buf.getvalue().count(b"/Subtype /Form") == 1
+    assert buf.getvalue().count(b"/Subtype /Image") == 1
@@ -0,0 +1,53 @@
+"""Unit tests for the PDF render pool."""
+import pytest
+from unittest.mock import patch
+
+
+def _double(x):
+    return x * 2
+
+
+@pytest.mark.unit
+def test_inline_mode_renders_on_caller(mock_external_services):
+    from services import render_pool
+
+    with patch.object(render_pool, "PDF_RENDER_WORKERS", 0):
+        pdf = render_pool.render_receipt(receipt_id="R1")
+
+    assert pdf == b"%PDF-1.4\ntest"
+    mock_external_services['generate_receipt_pdf'].assert_called_once_with(receipt_id="R1")
+
+
+@pytest.mark.unit
+def test_inline_mode_propagates_errors():
+    from services import render_pool
+
+    with patch.object(render_pool, "PDF_RENDER_WORKERS", 0):
+        fut = render_pool.submit(int, "not a number")
+
+    with pytest.raises(ValueError):
+        fut.result()
+
+
+@pytest.mark.unit
+def test_imap_preserves_order_with_small_window():
+    from services import render_pool
+
+    with patch.object(render_pool, "PDF_RENDER_WORKERS", 0):
+        results = list(render_pool.imap(_double, iter(range(7)), window=2))
+
+    assert results == [(i, i * 2) for i in range(7)]
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_process_pool_runs_jobs_in_workers():
+    from services import render_pool
+
+    with patch.object(render_pool, "PDF_RENDER_WORKERS", 2):
+        try:
+            results = list(render_pool.imap(_double, range(5)))
+        finally:
+            render_pool.shutdown()
+
+    assert results == [(i, i * 2) for i in range(5)]
@@ -0,0 +1,148 @@
+"""Unit tests for the daily donation rollups behind the metrics endpoints."""
+import csv
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from models import Donor, Donation, DonationDailyRollup
+from services import metrics, rollups
+
+
+def _buckets(db):
+    rows = db.execute(select(DonationDailyRollup.day, DonationDailyRollup.designation,
+                             DonationDailyRollup.donation_count, DonationDailyRollup.amount_cents)
+                      .order_by(DonationDailyRollup.day, DonationDailyRollup.designation))
+    return [tuple(r) for r in rows]
+
+
+def _scanned(db):
+    """The same buckets computed straight from donations."""
+    rows = db.execute(select(rollups.donation_day, Donation.designation, func.count(), func.sum(rollups.donation_cents))
+                      .group_by(rollups.donation_day, Donation.designation)
+                      .order_by(rollups.donation_day, Donation.designation))
+    return [tuple(r) for r in rows]
+
+
+@pytest.fixture
+def donor_db(db_session):
+    db_session.add(Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"))
+    db_session.commit()
+    return db_session
+
+
+@pytest.mark.unit
+def test_orm_writes_keep_buckets_in_step(donor_db):
+    db = donor_db
+    db.add_all([
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 3, 1, 9),
+                 amount=Decimal("0.29"), designation="General Fund"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", received_at=datetime(2025, 3, 1, 17),
+                 amount=Decimal("10.01"), designation="General Fund"),
+        Donation(donation_id="g3", donor_id="d_1", receipt_id="R3", received_at=datetime(2025, 3, 2),
+                 amount=Decimal("5.00"), designation="Shipping Fund"),
+    ])
+    db.commit()
+    assert _buckets(db) == [(date(2025, 3, 1), "General Fund", 2, 1030), (date(2025, 3, 2), "Shipping Fund", 1, 500)]
+
+    # Move a donation to another day and designation, then delete one
+    g2 = db.get(Donation, "g2")
+    g2.received_at, g2.designation = datetime(2025, 3, 2, 8), "Shipping Fund"
+    db.commit()
+    db.delete(db.get(Donation, "g1"))
+    db.commit()
+
+    assert _buckets(db) == [(date(2025, 3, 2), "Shipping Fund", 2, 1501)]
+    assert _buckets(db) == _scanned(db)
+
+
+@pytest.mark.unit
+def test_rolled_back_writes_leave_buckets_alone(donor_db):
+    donor_db.add(Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 3, 1),
+                          amount=Decimal("1.00"), designation="General Fund"))
+    donor_db.flush()
+    donor_db.rollback()
+    assert _buckets(donor_db) == []
+
+
+@pytest.mark.unit
+def test_postgres_refresh_locks_each_day_in_order():
+    from unittest.mock import MagicMock
+    from sqlalchemy.dialects import postgresql
+
+    conn = MagicMock()
+    conn.dialect.name = "postgresql"
+    rollups.refresh_days(conn, [date(2025, 3, 2), date(2025, 3, 1), date(2025, 3, 2)])
+
+    statements = [c.args[0].compile(dialect=postgresql.dialect()) for c in conn.execute.call_args_list]
+    locks = [st for st in statements if "pg_advisory_xact_lock" in str(st)]
+    assert statements[:2] == locks
+    assert [list(st.params.values())[1] for st in locks] == [date(2025, 3, 1).toordinal(), date(2025, 3, 2).toordinal()]
+    assert str(statements[2]).startswith("DELETE FROM donation_daily_rollups")
+
+
+@pytest.mark.unit
+def test_bulk_load_refreshes_old_and_new_days(donor_db, tmp_path):
+    from services.bulk_load import DONATIONS, load_csv
+    path = tmp_path / "donations.csv"
+    fields = ["donation_id", "donor_id", "amount", "designation", "received_at", "receipt_id"]
+
+    def write(rows):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    write([{"donation_id": "g1", "donor_id": "d_1", "amount": "20.00", "designation": "General Fund",
+            "received_at": "2025-04-01T10:00:00Z", "receipt_id": "R1"},
+           {"donation_id": "g2", "donor_id": "d_1", "amount": "1.10", "designation": "General Fund",
+            "received_at": "2025-04-01T11:00:00Z", "receipt_id": "R2"}])
+    load_csv(donor_db.get_bind(), DONATIONS, str(path))
+    write([{"donation_id": "g2", "donor_id": "d_1", "amount": "1.10", "designation": "General Fund",
+            "received_at": "2025-04-03T11:00:00Z", "receipt_id": "R2"}])
+    load_csv(donor_db.get_bind(), DONATIONS, str(path))
+
+    assert _buckets(donor_db) == [(date(2025, 4, 1), "General Fund", 1, 2000), (date(2025, 4, 3), "General Fund", 1, 110)]
+
+
+@pytest.fixture
+async def rollup_async_db(async_db_session):
+    async_db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2024, 12, 31, 23),
+                 amount=Decimal("7.00"), designation="General Fund"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", received_at=datetime(2025, 1, 1),
+                 amount=Decimal("100.00"), designation="Shipping Fund"),
+        Donation(donation_id="g3", donor_id="d_1", receipt_id="R3", received_at=datetime(2025, 2, 15),
+                 amount=Decimal("40.25"), designation="General Fund"),
+    ])
+    await async_db_session.commit()
+    return async_db_session
+
+
+@pytest.mark.unit
+async def test_range_queries_sum_buckets(rollup_async_db):
+    db = rollup_async_db
+    assert await metrics.shipped_count(db) == 3
+    assert await metrics.shipped_count(db, date(2025, 1, 1), date(2025, 12, 31)) == 2
+    assert await metrics.shipped_count(db, date(2025, 1, 1), date(2025, 1, 31)) == 1
+    assert await metrics.funds_by_designation(db, date(2025, 1, 1), None) == [
+        {"name": "General Fund", "value": Decimal("40.25")},
+        {"name": "Shipping Fund", "value": Decimal("100.00")},
+    ]
+
+
+@pytest.mark.unit
+async def test_route_accepts_a_range(rollup_async_db):
+    import json
+    from routes.metrics import get_reviewer_metrics
+
+    resp = await get_reviewer_metrics(date(2024, 12, 1), date(2024, 12, 31), if_none_match=None, db=rollup_async_db)
+    payload = json.loads(resp.body)
+    assert (payload["from"], payload["to"], payload["shippedYTD"]) == ("2024-12-01", "2024-12-31", 1)
+    assert payload["fundsByDesignation"] == [{"name": "General Fund", "value": 7.0}]
+    assert "etag" in resp.headers
+
+    with pytest.raises(HTTPException) as exc:
+        await get_reviewer_metrics(date(2025, 2, 1), date(2025, 1, 1), if_none_match=None, db=rollup_async_db)
+    assert exc.value.status_code == 400
@@ -0,0 +1,181 @@
+"""Unit tests for the pre-rendered year-end statement archive."""
+import hashlib
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import select
+from models import Donor, Donation, StatementArchiveEntry
+# Bound at import so the autouse lookup mocks do not replace the statement donor lookup
+from routes.statements import get_statement
+from services import statement_archive, statements
+from services.statement_archive import FileStatementStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FileStatementStore(str(tmp_path / "archive"))
+    with patch.object(statement_archive, "_store", store):
+        yield store
+
+
+def _index(db):
+    """Statements with a current archived PDF; stale entries keep their row without a digest."""
+    rows = db.execute(select(StatementArchiveEntry.donor_id, StatementArchiveEntry.year)
+                      .where(StatementArchiveEntry.digest.is_not(None))
+                      .order_by(StatementArchiveEntry.donor_id, StatementArchiveEntry.year))
+    return [tuple(r) for r in rows]
+
+
+@pytest.fixture
+def seeded_db(seed_db, make_gift):
+    return seed_db([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donor(donor_id="d_2", primary_contact_name="Jamie Lin", email="jamie@example.com"),
+        make_gift("g1", "d_1", datetime(2025, 2, 1)),
+        make_gift("g2", "d_1", datetime(2024, 2, 1)),
+        make_gift("g3", "d_2", datetime(2025, 3, 1)),
+    ])
+
+
+def _accept_all(messages):
+    from services.email_transport import SendResult
+    for msg in messages:
+        yield SendResult(msg, True)
+
+
+@pytest.mark.unit
+def test_store_is_content_addressed(store, tmp_path):
+    digest, size = store.put(b"%PDF one")
+    assert digest == hashlib.sha256(b"%PDF one").hexdigest() and size == 8
+    assert open(store.path(digest), "rb").read() == b"%PDF one"
+
+    src = tmp_path / "render.pdf"
+    src.write_bytes(b"%PDF one")
+    assert store.put_file(str(src)) == (digest, 8)
+    assert not src.exists()
+    assert store.path("0" * 64) is None
+
+
+@pytest.mark.unit
+def test_batch_archives_every_statement(seeded_db, store):
+    with patch.object(statements.render_pool, "PDF_RENDER_WORKERS", 0), \
+         patch.object(statements, "generate_statement_pdf", side_effect=lambda st: f"%PDF {st.donor_id}".encode()), \
+         patch.object(statements, "send_emails", side_effect=_accept_all):
+        result = statements.batch_generate_statements(seeded_db, 2025)
+
+    assert result["archived"] == 2
+    assert "archive_s" in result["timings"]
+    assert _index(seeded_db) == [("d_1", 2025), ("d_2", 2025)]
+    digest = seeded_db.execute(select(StatementArchiveEntry.digest).where(StatementArchiveEntry.donor_id == "d_2")).scalar()
+    assert open(store.path(digest), "rb").read() == b"%PDF d_2"
+
+
+@pytest.mark.unit
+def test_writes_drop_stale_entries(seeded_db, store, make_gift):
+    archive = statement_archive.ArchiveWriter(seeded_db, store)
+    for year in (2025, 2024):
+        archive.read_versions(year, ["d_1", "d_2"])
+        for st in list(statements.iter_year_statements(seeded_db, year)):
+            archive.add(st, f"%PDF {st.receipt_id}".encode())
+    archive.commit()
+    assert _index(seeded_db) == [("d_1", 2024), ("d_1", 2025), ("d_2", 2025)]
+
+    seeded_db.add(make_gift("g4", "d_2", datetime(2025, 12, 1)))
+    seeded_db.commit()
+    assert _index(seeded_db) == [("d_1", 2024), ("d_1", 2025)]
+
+    # Moving a gift to another year stales both years
+    seeded_db.get(Donation, "g2").received_at = datetime(2025, 6, 1)
+    seeded_db.flush()
+    assert _index(seeded_db) == []
+    seeded_db.rollback()
+    assert _index(seeded_db) == [("d_1", 2024), ("d_1", 2025)]
+
+    # The donor's name is on every statement
+    seeded_db.get(Donor, "d_1").primary_contact_name = "Alex Rivera-Lopez"
+    seeded_db.commit()
+    assert _index(seeded_db) == []
+
+
+@pytest.mark.unit
+def test_gift_recorded_mid_batch_keeps_the_stale_render_out(seeded_db, store, make_gift):
+    def render(st):
+        if st.donor_id == "d_1":
+            # Lands after d_1's donations were loaded, before its PDF is indexed
+            seeded_db.add(make_gift("g_late", "d_1", datetime(2025, 12, 30)))
+            seeded_db.flush()
+        return f"%PDF {st.donor_id} {len(st.gifts)}".encode()
+
+    with patch.object(statements.render_pool, "PDF_RENDER_WORKERS", 0), \
+         patch.object(statements, "generate_statement_pdf", side_effect=render), \
+         patch.object(statements, "send_emails", side_effect=_accept_all):
+        statements.batch_generate_statements(seeded_db, 2025)
+
+    assert _index(seeded_db) == [("d_2", 2025)]
+
+
+@pytest.mark.unit
+def test_statements_touched_by_an_upsert(seeded_db):
+    records = [{"donation_id": "g2", "donor_id": "d_1", "received_at": datetime(2025, 1, 5)},
+               {"donation_id": "g9", "donor_id": "d_2", "received_at": datetime(2023, 1, 5)}]
+    assert statement_archive.statements_touched(seeded_db.connection(), records) == {
+        ("d_1", 2025), ("d_1", 2024), ("d_2", 2023)}
+
+
+@pytest.fixture
+async def async_seeded(seed_async_db, make_gift):
+    return await seed_async_db([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        make_gift("g1", "d_1", datetime(2025, 2, 1), amount=100.0),
+    ])
+
+
+async def _get(db, if_none_match=None, range=None):
+    return await get_statement("d_1", 2025, db=db, if_none_match=if_none_match, range=range, if_range=None)
+
+
+@pytest.mark.unit
+async def test_route_serves_archive_without_rendering(async_seeded, store, make_gift):
+    first = await _get(async_seeded)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/")
+    body = b"".join([chunk async for chunk in first.body_iterator])
+    assert f'"{hashlib.sha256(body).hexdigest()}"' == etag
+
+    with patch("routes.statements.load_donor_statement_async") as load, \
+         patch("routes.statements.render_to_temp_file") as render:
+        again = await _get(async_seeded, range="bytes=0-4")
+        cached = await _get(async_seeded, if_none_match=etag)
+    load.assert_not_called()
+    render.assert_not_called()
+    assert again.status_code == 206
+    assert b"".join([chunk async for chunk in again.body_iterator]) == b"%PDF-"
+    assert cached.status_code == 304
+
+    # A late gift stales the archived copy, so the next download renders it again
+    async_seeded.add(make_gift("g2", "d_1", datetime(2025, 12, 30)))
+    await async_seeded.commit()
+    fresh = await _get(async_seeded)
+    assert fresh.headers["etag"] != etag
+
+
+@pytest.mark.unit
+async def test_gift_recorded_during_a_render_is_not_archived_over(async_seeded, store, make_gift):
+    from services import pdf_response
+
+    async def render_then_record_gift(fn, *args):
+        # Another request records a gift after this one loaded the statement
+        path = await pdf_response.render_to_temp_file(fn, *args)
+        async_seeded.add(make_gift("g_late", "d_1", datetime(2025, 12, 30)))
+        await async_seeded.commit()
+        return path
+
+    with patch("routes.statements.render_to_temp_file", side_effect=render_then_record_gift):
+        stale = await _get(async_seeded)
+    assert stale.status_code == 200
+    assert (await statement_archive.find_archived(async_seeded, "d_1", 2025)).path is None
+
+    fresh = await _get(async_seeded)
+    assert fresh.headers["etag"] != stale.headers["etag"]
+    assert (await statement_archive.find_archived(async_seeded, "d_1", 2025)).digest == fresh.headers["etag"].strip('"')
@@ -0,0 +1,203 @@
+"""Unit tests for resumable, checkpointed year-end statement batches."""
+import json
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Donor, StatementDelivery
+from routes.statements import batch_statements_progress, batch_statements_route
+from services import jobs, statement_archive, statement_deliveries, statements, tasks
+from services.email_transport import SendResult
+from services.statement_archive import FileStatementStore
+
+
+@pytest.fixture
+def donors(make_gift):
+    """Donors d_00.. with one gift each; the indexes in ``no_email`` have no address."""
+    def make(n, no_email=()):
+        rows = []
+        for i in range(n):
+            donor_id = f"d_{i:02d}"
+            rows.append(Donor(donor_id=donor_id, primary_contact_name=f"Donor {i}",
+                              email="" if i in no_email else f"donor{i}@example.com"))
+            rows.append(make_gift(f"g{i:02d}", donor_id))
+        return rows
+    return make
+
+
+@pytest.fixture
+def seeded_db(seed_db, donors):
+    return seed_db(donors(6, no_email={5}))
+
+
+def _statuses(db):
+    return dict(db.execute(select(StatementDelivery.donor_id, StatementDelivery.status)
+                           .where(StatementDelivery.year == 2025)).all())
+
+
+class _Provider:
+    """Accepts every message, optionally rejecting some addresses or dying after a number of sends."""
+
+    def __init__(self, reject=(), die_after=None):
+        self.reject = set(reject)
+        self.die_after = die_after
+        self.sent = []
+
+    def __call__(self, messages):
+        for msg in messages:
+            if self.die_after is not None and len(self.sent) >= self.die_after:
+                raise RuntimeError("provider outage")
+            if msg.to in self.reject:
+                yield SendResult(msg, False, "mailbox unavailable")
+                continue
+            self.sent.append(msg.to)
+            yield SendResult(msg, True)
+
+
+@contextmanager
+def _batch_env(*providers, commit_every=2, page_donors=4):
+    """Inline rendering, small pages and checkpoints; each batch run sends through the next provider."""
+    runs = iter(providers)
+    with patch.object(statements.render_pool, "PDF_RENDER_WORKERS", 0), \
+         patch.object(statements, "STATEMENT_PAGE_DONORS", page_donors), \
+         patch.object(statement_deliveries, "STATEMENT_PROGRESS_COMMIT_EVERY", commit_every), \
+         patch.object(statements, "generate_statement_pdf", side_effect=lambda st: f"%PDF {st.donor_id}".encode()), \
+         patch.object(statements, "send_emails", side_effect=lambda messages: next(runs)(messages)):
+        yield
+
+
+def _run(db, provider):
+    with _batch_env(provider):
+        return statements.batch_generate_statements(db, 2025)
+
+
+@pytest.mark.unit
+def test_statement_pages_cover_every_donor(seeded_db):
+    pages = list(statements.iter_statement_pages(seeded_db, 2025, page_donors=4))
+
+    assert [len(p) for p in pages] == [4, 2]
+    assert [st.donor_id for p in pages for st in p] == [st.donor_id for st in statements.iter_year_statements(seeded_db, 2025)]
+
+
+@pytest.mark.unit
+def test_rerun_after_a_crash_skips_donors_already_sent(seeded_db):
+    first = _Provider(die_after=3)
+    with pytest.raises(RuntimeError):
+        _run(seeded_db, first)
+    assert first.sent == ["donor0@example.com", "donor1@example.com", "donor2@example.com"]
+    assert [d for d, s in _statuses(seeded_db).items() if s == "sent"] == ["d_00", "d_01", "d_02"]
+
+    second = _Provider()
+    result = _run(seeded_db, second)
+
+    assert second.sent == ["donor3@example.com", "donor4@example.com"]
+    assert result["skipped"] == 3
+    assert result["generated"] == 3 and result["emailed"] == 2
+    assert _statuses(seeded_db) == {**{f"d_{i:02d}": "sent" for i in range(5)}, "d_05": "no_email"}
+
+    # Nothing is left to do
+    idle = _Provider()
+    assert _run(seeded_db, idle)["skipped"] == 6 and idle.sent == []
+
+
+@pytest.mark.unit
+def test_failed_donors_are_retried(seeded_db):
+    _run(seeded_db, _Provider(reject={"donor1@example.com"}))
+    assert _statuses(seeded_db)["d_01"] == "failed"
+    error = seeded_db.execute(select(StatementDelivery.error).where(StatementDelivery.donor_id == "d_01")).scalar()
+    assert error == "mailbox unavailable"
+
+    retry = _Provider()
+    result = _run(seeded_db, retry)
+    assert retry.sent == ["donor1@example.com"]
+    assert result["skipped"] == 5
+    assert _statuses(seeded_db)["d_01"] == "sent"
+
+
+@pytest.mark.unit
+def test_rerun_reuses_archived_pdfs(seeded_db, tmp_path):
+    with patch.object(statement_archive, "_store", FileStatementStore(str(tmp_path / "archive"))):
+        _run(seeded_db, _Provider(reject={"donor1@example.com"}))
+        with patch.object(statements, "render_statement_pdf") as render:
+            retry = _Provider()
+            result = _run(seeded_db, retry)
+
+    render.assert_not_called()
+    assert result["reused"] == 1 and result["emailed"] == 1
+
+
+@pytest.fixture
+async def shared_db(tmp_path, donors):
+    """A file database reached by the job's sync session and the route's async one."""
+    path = tmp_path / "batch.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(donors(6, no_email={5}))
+        db.commit()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)() as adb:
+        yield Session, adb
+    await async_engine.dispose()
+    engine.dispose()
+
+
+@pytest.mark.unit
+async def test_retried_restart_job_keeps_its_progress(shared_db):
+    Session, adb = shared_db
+    with Session() as db:
+        _run(db, _Provider())
+    backend = jobs.MemoryJobBackend()
+
+    with patch.object(jobs, "get_backend", return_value=backend):
+        response = await batch_statements_route(2025, restart=True, db=adb)
+    assert response.status_code == 202
+    with Session() as db:
+        assert _statuses(db) == {}
+
+    # The first attempt dies part way; the retry must not start over
+    first, retry = _Provider(die_after=3), _Provider()
+    with _batch_env(first, retry), patch.object(tasks, "SessionLocal", Session), \
+         patch.object(jobs, "backoff_delay", return_value=0):
+        jobs.run_one(backend)
+        jobs.run_one(backend)
+
+    job = jobs.get_job(json.loads(response.body)["job_id"], backend)
+    assert (job["status"], job["attempts"]) == (jobs.SUCCEEDED, 2)
+    assert first.sent == ["donor0@example.com", "donor1@example.com", "donor2@example.com"]
+    assert retry.sent == ["donor3@example.com", "donor4@example.com"]
+
+
+@pytest.fixture
+async def async_seeded(seed_async_db, donors):
+    now = datetime.utcnow()
+    return await seed_async_db([
+        *donors(10),
+        StatementDelivery(year=2025, donor_id="d_00", status="sent", updated_at=now - timedelta(hours=2)),
+        StatementDelivery(year=2025, donor_id="d_01", status="sent", updated_at=now - timedelta(seconds=120)),
+        StatementDelivery(year=2025, donor_id="d_02", status="sent", updated_at=now - timedelta(seconds=60)),
+        StatementDelivery(year=2025, donor_id="d_03", status="failed", error="bounced",
+                          updated_at=now - timedelta(seconds=60)),
+        StatementDelivery(year=2025, donor_id="d_04", status="rendered", updated_at=now),
+    ])
+
+
+@pytest.mark.unit
+async def test_progress_reports_throughput_and_eta(async_seeded):
+    progress = await batch_statements_progress(2025, db=async_seeded)
+
+    assert progress["total"] == 10
+    assert (progress["sent"], progress["failed"], progress["rendered"]) == (3, 1, 1)
+    assert progress["remaining"] == 6
+    assert progress["percent"] == 40.0
+    # Three donors finished in the last two minutes; the one from hours ago is outside the window
+    assert progress["throughput_per_min"] == pytest.approx(1.5, rel=0.05)
+    assert progress["eta_seconds"] == pytest.approx(240, rel=0.05)
+    assert progress["last_update"] is not None
+
+    empty = await batch_statements_progress(2024, db=async_seeded)
+    assert empty["total"] == 0 and empty["eta_seconds"] == 0 and empty["last_update"] is None
@@ -0,0 +1,94 @@
+"""Unit tests for the itemized, multi-page year-end statement renderer."""
+import io
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from PIL import Image
+from services import statement_pdf
+from services.statements import DonorStatement
+
+
+def _statement(gifts, designations=("General Fund", "Shipping Fund")):
+    st = DonorStatement(donor_id="d_1", donor_name="Alex Rivera", email="alex@example.com", year=2025)
+    for i in range(gifts):
+        st.add(f"g{i}", datetime(2025, 1, 1) + timedelta(hours=i), Decimal("10.50") + i,
+               designations[i % len(designations)])
+    return st
+
+
+def _render(st):
+    out = io.BytesIO()
+    with patch.object(statement_pdf, "_draw_footer", wraps=statement_pdf._draw_footer) as footer:
+        pages = statement_pdf.write_statement_pdf(st, out)
+    # (page, pages, count, subtotal, running) for every page
+    return pages, out.getvalue(), [c.args[2:7] for c in footer.call_args_list]
+
+
+@pytest.mark.unit
+def test_short_statement_fits_one_page():
+    st = _statement(3)
+    pages, pdf, footers = _render(st)
+
+    assert pages == 1
+    assert pdf.startswith(b"%PDF")
+    assert pdf.count(b"/Type /Page\n") == 1
+    assert footers == [(1, 1, 3, st.total, st.total)]
+
+
+@pytest.mark.unit
+def test_every_gift_is_listed_with_page_subtotals():
+    st = _statement(500)
+    pages, pdf, footers = _render(st)
+
+    assert pages > 10
+    assert pdf.count(b"/Type /Page\n") == pages
+    assert [f[0] for f in footers] == list(range(1, pages + 1))
+    assert all(f[1] == pages for f in footers)
+    assert sum(f[2] for f in footers) == 500
+    assert sum(f[3] for f in footers) == st.total
+    # Running totals accumulate page by page and end at the year's total
+    running = Decimal("0")
+    for _, _, _, subtotal, total in footers:
+        running += subtotal
+        assert total == running
+    assert footers[-1][4] == st.total
+    # Continuation pages are full; the first page also carries the summary
+    assert footers[0][2] < footers[1][2]
+    assert len({f[2] for f in footers[1:-1]}) == 1
+
+
+@pytest.mark.unit
+def test_header_and_logo_embedded_once(tmp_path):
+    from services import receipts
+    from services.render_assets import AssetRegistry
+
+    logo = tmp_path / "logo.png"
+    Image.new("RGB", (16, 16), (241, 151, 56)).save(logo)
+    with patch.object(receipts, "assets", AssetRegistry(str(logo))):
+        pages, pdf, _ = _render(_statement(200))
+
+    assert pages > 1
+    assert pdf.count(b"/Subtype /Form") == 1
+    assert pdf.count(b"/Subtype /Image") == 1
+
+
+@pytest.mark.unit
+def test_long_designation_lists_are_folded():
+    st = _statement(30, designations=[f"Fund {i:02d}" for i in range(30)])
+    rows = statement_pdf._summary_rows(st)
+
+    assert len(rows) == statement_pdf.MAX_SUMMARY_ROWS
+    assert rows[-1][0] == "19 other designations"
+    assert sum(v for _, v in rows) == st.total
+    assert _render(st)[0] >= 1
+
+
+@pytest.mark.unit
+def test_cache_key_follows_the_gifts():
+    st = _statement(5)
+    key = statement_pdf.statement_cache_key(st)
+
+    assert statement_pdf.statement_cache_key(_statement(5)) == key
+    st.add("g_late", datetime(2025, 12, 30), Decimal("1.00"), "General Fund")
+    assert statement_pdf.statement_cache_key(st) != key
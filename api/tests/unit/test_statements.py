@@ -0,0 +1,109 @@
+"""Unit tests for the year-end statement engine."""
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from models import Donor, Donation
+
+
+@pytest.fixture
+def seeded_db(db_session):
+    db_session.add_all([
+        Donor(donor_id="d_1", primary_contact_name="Alex Rivera", email="alex@example.com"),
+        Donor(donor_id="d_2", primary_contact_name="Jamie Lin", email=""),
+        Donor(donor_id="d_3", primary_contact_name="No Gifts", email="none@example.com"),
+    ])
+    db_session.add_all([
+        Donation(donation_id="g1", donor_id="d_1", receipt_id="R1", received_at=datetime(2025, 1, 1),
+                 amount=100.0, designation="Shipping Fund"),
+        Donation(donation_id="g2", donor_id="d_1", receipt_id="R2", received_at=datetime(2025, 12, 31, 23, 59),
+                 amount=50.0, designation="General Fund"),
+        Donation(donation_id="g3", donor_id="d_1", receipt_id="R3", received_at=datetime(2025, 6, 1),
+                 amount=25.0, designation="Shipping Fund"),
+        Donation(donation_id="g4", donor_id="d_2", receipt_id="R4", received_at=datetime(2025, 3, 1),
+                 amount=75.0, designation=""),
+        # Outside the year on both sides
+        Donation(donation_id="g5", donor_id="d_1", receipt_id="R5", received_at=datetime(2024, 12, 31, 23, 59),
+                 amount=999.0, designation="General Fund"),
+        Donation(donation_id="g6", donor_id="d_3", receipt_id="R6", received_at=datetime(2026, 1, 1),
+                 amount=999.0, designation="General Fund"),
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.mark.unit
+def test_iter_year_statements_groups_by_donor(seeded_db):
+    from services.statements import iter_year_statements
+
+    statements = list(iter_year_statements(seeded_db, 2025))
+
+    assert [s.donor_id for s in statements] == ["d_1", "d_2"]
+    alex, jamie = statements
+    assert alex.total == 175.0
+    assert [g["donation_id"] for g in alex.gifts] == ["g1", "g3", "g2"]
+    assert alex.line_items == [
+        {"designation": "General Fund", "amount": 50.0},
+        {"designation": "Shipping Fund", "amount": 125.0},
+    ]
+    assert alex.receipt_id == "YEAR-2025-d_1"
+    assert jamie.line_items == [{"designation": "General Fund", "amount": 75.0}]
+
+
+@pytest.mark.unit
+def test_iter_year_statements_single_donor(seeded_db):
+    from services.statements import iter_year_statements
+
+    statements = list(iter_year_statements(seeded_db, 2025, donor_id="d_2"))
+
+    assert len(statements) == 1
+    assert statements[0].total == 75.0
+
+
+_sent = []
+
+
+def _accept_all(messages):
+    from services.email_transport import SendResult
+    _sent.clear()
+    for msg in messages:
+        _sent.append(msg)
+        yield SendResult(msg, True)
+
+
+def _reject_all(messages):
+    from services.email_transport import SendResult
+    for msg in messages:
+        yield SendResult(msg, False, "406: Inactive recipient")
+
+
+@pytest.mark.unit
+def test_batch_generate_statements_reports_timings(seeded_db):
+    from services import statements
+
+    with patch.object(statements.render_pool, "PDF_RENDER_WORKERS", 0), \
+         patch.object(statements, "generate_statement_pdf", return_value=b"%PDF") as mock_pdf, \
+         patch.object(statements, "send_emails", side_effect=_accept_all) as mock_send:
+        result = statements.batch_generate_statements(seeded_db, 2025)
+
+    assert result["generated"] == 2
+    assert result["emailed"] == 1  # d_2 has no email on file
+    assert result["failed"] == 0
+    assert mock_pdf.call_count == 2
+    mock_send.assert_called_once()
+    assert [(m.to, m.filename) for m in _sent] == [("alex@example.com", "YEAR-2025-d_1.pdf")]
+    for phase in ("query_s", "render_s", "email_s", "total_s"):
+        assert phase in result["timings"]
+
+
+@pytest.mark.unit
+def test_batch_generate_statements_reports_failed_recipients(seeded_db):
+    from services import statements
+
+    with patch.object(statements.render_pool, "PDF_RENDER_WORKERS", 0), \
+         patch.object(statements, "generate_statement_pdf", return_value=b"%PDF"), \
+         patch.object(statements, "send_emails", side_effect=_reject_all):
+        result = statements.batch_generate_statements(seeded_db, 2025)
+
+    assert result["emailed"] == 0
+    assert result["failed"] == 1
+    assert result["failures"] == [{"email": "alex@example.com", "error": "406: Inactive recipient"}]
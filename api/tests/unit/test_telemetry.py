@@ -0,0 +1,128 @@
+"""Unit tests for application counters, histograms and the fleet view."""
+import os
+import pytest
+import redis
+from unittest.mock import MagicMock, patch
+from prometheus_client import REGISTRY
+from services import render_pool, telemetry
+from services.telemetry import FleetCounters
+
+
+@pytest.fixture
+def fleet():
+    client = MagicMock()
+    fleet = FleetCounters(client, key="telemetry:test", interval=3600)
+    with patch.object(telemetry, "_fleet", fleet):
+        yield fleet
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.unit
+def test_counter_feeds_prometheus_and_fleet_buffer(fleet):
+    before = _sample("emails_sent_total", provider="test", outcome="ok")
+    telemetry.EMAILS_SENT.inc(3, provider="test", outcome="ok")
+    telemetry.EMAILS_SENT.inc(provider="test", outcome="ok")
+
+    assert _sample("emails_sent_total", provider="test", outcome="ok") == before + 4
+    fleet.flush()
+    pipe = fleet.client.pipeline.return_value
+    pipe.hincrbyfloat.assert_called_once_with("telemetry:test", "emails_sent{outcome=ok,provider=test}", 4)
+    pipe.execute.assert_called_once()
+
+
+@pytest.mark.unit
+def test_failed_flush_keeps_deltas_for_the_next_one(fleet):
+    pipe = fleet.client.pipeline.return_value
+    pipe.execute.side_effect = [redis.exceptions.ConnectionError("down"), None]
+    telemetry.RECEIPTS_GENERATED.inc(2)
+    fleet.flush()
+    telemetry.RECEIPTS_GENERATED.inc()
+    fleet.flush()
+
+    assert pipe.hincrbyfloat.call_args_list[-1].args == ("telemetry:test", "receipts_generated", 3)
+
+
+@pytest.mark.unit
+def test_summary_prefers_fleet_totals(fleet):
+    fleet.client.hgetall.return_value = {
+        "receipts_generated": "12", "emails_sent{outcome=ok,provider=postmark}": "7",
+        "emails_sent{outcome=error,provider=postmark}": "2", "reconciliation_runs{mode=full,outcome=ok}": "1",
+    }
+    summary = telemetry.summary()
+    assert summary == {"receipts_generated": 12, "emails_sent": 7, "statements_generated": 0,
+                       "reconciliation_runs": 1, "scope": "fleet"}
+
+    fleet.client.hgetall.side_effect = redis.exceptions.ConnectionError("down")
+    assert telemetry.summary()["scope"] == "instance"
+
+
+@pytest.mark.unit
+def test_instance_summary_reads_the_registry():
+    with patch.object(telemetry, "_fleet", FleetCounters(None)):
+        before = telemetry.summary()
+        telemetry.EMAILS_SENT.inc(2, provider="test", outcome="ok")
+        telemetry.EMAILS_SENT.inc(provider="test", outcome="error")
+        after = telemetry.summary()
+    assert after["scope"] == "instance"
+    assert after["emails_sent"] == before["emails_sent"] + 2
+
+
+@pytest.mark.unit
+def test_renders_are_timed_and_counted():
+    def render_statement_pdf(st):
+        return b"%PDF"
+
+    def broken(st):
+        raise ValueError("bad")
+
+    generated = _sample("statements_generated_total")
+    timed = _sample("pdf_render_seconds_count", document="statement")
+    assert [pdf for _, pdf in render_pool.imap(render_statement_pdf, [1, 2])] == [b"%PDF", b"%PDF"]
+    with pytest.raises(ValueError):
+        render_pool.submit(broken, 1).result()
+
+    assert _sample("statements_generated_total") == generated + 2
+    assert _sample("pdf_render_seconds_count", document="statement") == timed + 2
+    assert _sample("pdf_render_seconds_count", document="broken") == 0
+
+
+@pytest.mark.unit
+async def test_bulk_receipts_count_every_page():
+    from services.pdf_response import render_to_temp_file
+    from services.receipts import render_receipts_to_file
+
+    fields = dict(receipt_id="R1", donor_name="A", donation_amount=1.0, donation_date="2025-01-01",
+                  designation="General Fund", restricted=False, payment_method="Square")
+    generated = _sample("receipts_generated_total")
+    timed = _sample("pdf_render_seconds_count", document="receipt")
+    path = await render_to_temp_file(render_receipts_to_file, [fields] * 3)
+    os.unlink(path)
+
+    assert _sample("receipts_generated_total") == generated + 3
+    assert _sample("pdf_render_seconds_count", document="receipt") == timed + 1
+    assert _sample("pdf_render_seconds_count", document="render_receipts_to_file") == 0
+
+
+@pytest.mark.unit
+def test_multiprocess_registry_when_configured(tmp_path):
+    with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}):
+        assert telemetry.registry() is not REGISTRY
+        assert isinstance(telemetry.exposition(), bytes)
+    assert telemetry.registry() is REGISTRY
+
+
+@pytest.mark.unit
+def test_metrics_endpoint_negotiates_format():
+    from routes.health_metrics import metrics
+
+    with patch.object(telemetry, "_fleet", FleetCounters(None)):
+        body = metrics(accept="application/json")
+    assert {"receipts_generated", "emails_sent", "uptime_seconds"} <= set(body)
+    assert body["scope"] == "instance"
+
+    scraped = metrics(accept="text/plain;version=0.0.4")
+    assert scraped.media_type.startswith("text/plain")
+    assert b"receipts_generated_total" in scraped.body